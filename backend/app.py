@@ -1,17 +1,34 @@
-from flask import Flask, jsonify, request, send_file
+from flask import Flask, Response, jsonify, request, send_file, g, stream_with_context
 from flask_cors import CORS
 from flask_bcrypt import Bcrypt
+import click
 import os
+import threading
 from datetime import datetime, timedelta
-from reportlab.lib.pagesizes import A4
-from reportlab.lib import colors
-from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
-from reportlab.lib.units import inch
-from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph, Spacer
-from reportlab.lib.enums import TA_CENTER, TA_LEFT, TA_RIGHT
-from pymongo import MongoClient
+from io import BytesIO
+import base64
+from pymongo import MongoClient, ASCENDING, DESCENDING
+from pymongo.errors import DuplicateKeyError, PyMongoError
+from bson import ObjectId
+from bson.errors import InvalidId
+from concurrent.futures.process import BrokenProcessPool
 from dotenv import load_dotenv
 import jwt
+import suitability_engine
+from auth import require_auth, token_cache, run_password_hash, defer_password_hash, hash_rounds
+import report_jobs
+import report_stats
+import report_store
+import report_export
+import pdf_cache
+import report_bundle
+import sweep
+import report_search
+import reevaluate
+import nearby
+import metrics
+import http_cache
+from metrics import phase
 
 
 load_dotenv()
@@ -27,44 +44,168 @@ CORS(
         ]
     }},
     supports_credentials=True,
-    allow_headers=["Content-Type", "Authorization"],
+    allow_headers=["Content-Type", "Authorization", "Idempotency-Key"],
+    expose_headers=["Idempotent-Replayed", "ETag"],
     methods=["GET", "POST", "PUT", "DELETE", "OPTIONS"]
 )
-bcrypt = Bcrypt(app)
 app.config['SECRET_KEY'] = os.getenv('SECRET_KEY', 'your-secret-key-here')
+# Stored hashes with a different cost are upgraded on the next login
+app.config['BCRYPT_LOG_ROUNDS'] = int(os.getenv('BCRYPT_LOG_ROUNDS', 12))
+bcrypt = Bcrypt(app)
+metrics.init_app(app)
+http_cache.init_app(app)
 
-# MongoDB connection
-mongo_uri = os.getenv('MONGODB_URI')
-if not mongo_uri:
-    print("ERROR: MONGODB_URI not found in .env file")
-    exit(1)
-
-try:
-    client = MongoClient(mongo_uri)
-    # Test connection
-    client.admin.command('ping')
-    print("MongoDB connected successfully")
-except Exception as e:
-    print(f"MongoDB connection error: {e}")
-    exit(1)
-
-db = client['soildata']  # Changed to 'soildata'
-users_collection = db['users']
-reports_collection = db['reports']
-
-def verify_token(token):
-    try:
-        payload = jwt.decode(token, app.config['SECRET_KEY'], algorithms=['HS256'])
-        return payload
-    except:
-        return None
+# MongoDB connection - created lazily, once per worker process, so nothing
+# blocks at import and gunicorn workers never share a client across fork
+MONGO_OPTIONS = {
+    'maxPoolSize': int(os.getenv('MONGO_MAX_POOL_SIZE', 50)),
+    'minPoolSize': int(os.getenv('MONGO_MIN_POOL_SIZE', 0)),
+    'waitQueueTimeoutMS': int(os.getenv('MONGO_WAIT_QUEUE_TIMEOUT_MS', 5000)),
+    'serverSelectionTimeoutMS': int(os.getenv('MONGO_SERVER_SELECTION_TIMEOUT_MS', 5000)),
+    'connectTimeoutMS': int(os.getenv('MONGO_CONNECT_TIMEOUT_MS', 5000)),
+}
+
+# Finished async report jobs are dropped after REPORT_JOB_TTL seconds
+REPORT_JOB_TTL = int(os.getenv('REPORT_JOB_TTL', 3600))
+
+_client = None
+_client_pid = None
+_client_lock = threading.Lock()
+_indexes_ready = False
+
+def connect(client=None):
+    """Create this process's MongoDB client, or install the given one.
+
+    MongoClient connects in the background, so this makes no round trips and
+    the client is kept even while the server is unreachable. Indexes are
+    created by the first get_db() call that reaches the server.
+    """
+    global _client, _client_pid, _indexes_ready
+    if client is None:
+        mongo_uri = os.getenv('MONGODB_URI')
+        if not mongo_uri:
+            raise RuntimeError("MONGODB_URI not found in .env file")
+        client = MongoClient(mongo_uri, event_listeners=[metrics.MongoCommandTimer()], **MONGO_OPTIONS)
+    _client, _client_pid = client, os.getpid()
+    _indexes_ready = False
+    return client
+
+def get_db():
+    global _indexes_ready
+    if _client is None or _client_pid != os.getpid() or not _indexes_ready:
+        with _client_lock:
+            if _client is None or _client_pid != os.getpid():
+                connect()
+            if not _indexes_ready:
+                # Once per process; a failure (server down) is retried on the next call
+                try:
+                    ensure_indexes(_client['soildata'])
+                    _indexes_ready = True
+                except PyMongoError as error:
+                    app.logger.warning('Could not create indexes yet: %s', error)
+    return _client['soildata']
+
+# Indexes created by earlier versions that no query uses any more. The
+# (user_id, created_at, _id) list index is a prefix of the general search
+# index, which now serves /api/my-reports and exports as well.
+OBSOLETE_REPORT_INDEXES = ('user_id_1_ruleset_1', 'user_id_1_created_at_-1__id_-1')
+
+def ensure_indexes(db):
+    db['report_jobs'].create_index('created_at', expireAfterSeconds=REPORT_JOB_TTL)
+    db['pdf_cache'].create_index('last_used')
+    # reports carries, besides _id:
+    # - two unique dedupe indexes, the only guard against concurrent duplicate submissions;
+    # - per scope, the search indexes (report_search.py), whose general index also
+    #   serves /api/my-reports pages and exports;
+    # - per scope, a 2dsphere index for /api/reports/nearby (nearby.py), holding
+    #   located reports only.
+    # The org_id indexes are partial, so reports outside an organization never touch them.
+    # One report per user and sample content / Idempotency-Key on /api/analyze-suitability
+    db['reports'].create_index([('user_id', ASCENDING), ('content_hash', ASCENDING)], unique=True,
+                               partialFilterExpression={'content_hash': {'$exists': True}})
+    db['reports'].create_index([('user_id', ASCENDING), ('idempotency_key', ASCENDING)], unique=True,
+                               partialFilterExpression={'idempotency_key': {'$exists': True}})
+    report_search.ensure_indexes(db['reports'])
+    nearby.ensure_indexes(db['reports'])
+
+def drop_obsolete_indexes(db):
+    """Drop the OBSOLETE_REPORT_INDEXES still present and return their names."""
+    existing = {index['name'] for index in db['reports'].list_indexes()}
+    dropped = [name for name in OBSOLETE_REPORT_INDEXES if name in existing]
+    for name in dropped:
+        db['reports'].drop_index(name)
+    return dropped
+
+class LazyCollection:
+    """Stands in for a collection until the first attribute access."""
+    def __init__(self, name):
+        self.name = name
+    
+    def __getattr__(self, attr):
+        return getattr(get_db()[self.name], attr)
+
+users_collection = LazyCollection('users')
+reports_collection = LazyCollection('reports')
+report_jobs_collection = LazyCollection('report_jobs')
+report_stats_collection = LazyCollection('report_stats')
 
-REPORT_PATH = os.path.join(os.path.dirname(__file__), 'reports')
-os.makedirs(REPORT_PATH, exist_ok=True)
+job_queue = report_jobs.ReportJobQueue()
+stored_pdfs = pdf_cache.PdfCache(LazyCollection('pdf_cache'))
+
+# Cache and queue state, read when /api/metrics is scraped
+metrics.register(metrics.Gauges('rule_cache', 'Suitability rule cache counters', ('stat',),
+                                lambda: {(k,): v for k, v in suitability_engine.cache_stats().items()}))
+metrics.register(metrics.Gauges('token_cache', 'Verified token cache counters', ('stat',),
+                                lambda: {(k,): v for k, v in token_cache.stats().items()}))
+metrics.register(metrics.Gauges('pdf_cache', 'Stored report PDF cache counters', ('stat',),
+                                lambda: {(k,): v for k, v in stored_pdfs.stats().items()}))
+metrics.register(metrics.Gauges('report_job_queue', 'Async PDF job queue state', ('stat',),
+                                lambda: {(k,): job_queue.stats()[k] for k in ('queue_depth', 'queue_limit', 'workers')}))
+REPORT_JOB_WAIT = metrics.register(metrics.Histogram('report_job_wait_seconds', 'Time async PDF jobs wait for a worker'))
+REPORT_JOB_RENDER = metrics.register(metrics.Histogram('report_job_render_seconds', 'Time spent rendering async PDF jobs'))
+
+# Batch analysis limits
+MAX_BATCH_SIZE = int(os.getenv('MAX_BATCH_SIZE', 5000))
+BATCH_CHUNK_SIZE = int(os.getenv('BATCH_CHUNK_SIZE', 500))
+MAX_UPLOAD_ERRORS = int(os.getenv('MAX_UPLOAD_ERRORS', 100))
+
+# /api/my-reports paging
+REPORTS_PAGE_SIZE = int(os.getenv('REPORTS_PAGE_SIZE', 50))
+MAX_REPORTS_PAGE_SIZE = int(os.getenv('MAX_REPORTS_PAGE_SIZE', 200))
+EXPORT_BATCH_SIZE = int(os.getenv('EXPORT_BATCH_SIZE', 1000))
+MAX_IDEMPOTENCY_KEY_LENGTH = 255
+# (user_id, created_at desc, _id desc, ...): walks a user's reports newest first
+REPORT_LIST_INDEX = report_search.index_keys('user_id')[1]
+# Stored report fields that never appear in API responses
+HIDDEN_REPORT_FIELDS = {'user_id': 0, 'org_id': 0, 'content_hash': 0, 'idempotency_key': 0, 'ruleset': 0}
+REPORT_LIST_FIELDS = {'classification', 'behavior', 'suitability', 'suitability_text',
+                      'risks', 'recommendations', 'parameters', 'user_email', 'location'}
 
 @app.route('/api/health', methods=['GET'])
 def health():
-    return jsonify({'status': 'healthy', 'message': 'Soil Data Management API is running'})
+    return jsonify({
+        'status': 'healthy',
+        'message': 'Soil Data Management API is running',
+        'rule_cache': suitability_engine.cache_stats(),
+        'token_cache': token_cache.stats()
+    })
+
+@app.route('/api/ready', methods=['GET'])
+def ready():
+    # Readiness probe: only report ready once MongoDB answers
+    try:
+        get_db().command('ping')
+    except Exception as e:
+        return jsonify({'status': 'unavailable', 'error': str(e)}), 503
+    return jsonify({'status': 'ready'}), 200
+
+@app.route('/api/metrics', methods=['GET'])
+def get_metrics():
+    # Prometheus scrape endpoint; set METRICS_TOKEN to require a bearer token
+    metrics_token = os.getenv('METRICS_TOKEN')
+    if metrics_token and request.headers.get('Authorization') != f'Bearer {metrics_token}':
+        return jsonify({'error': 'Unauthorized'}), 401
+    return metrics.render(), 200, {'Content-Type': 'text/plain; version=0.0.4; charset=utf-8'}
 
 @app.route('/api/register', methods=['POST'])
 def register():
@@ -79,7 +220,8 @@ def register():
     if users_collection.find_one({'email': email}):
         return jsonify({'error': 'Email already exists'}), 400
     
-    hashed_password = bcrypt.generate_password_hash(password).decode('utf-8')
+    hashed_password = run_password_hash(bcrypt.generate_password_hash, password,
+                                        app.config['BCRYPT_LOG_ROUNDS']).decode('utf-8')
     
     user = {
         'name': name,
@@ -103,14 +245,22 @@ def login():
     
     user = users_collection.find_one({'email': email})
     
-    if not user or not bcrypt.check_password_hash(user['password'], password):
+    if not user or not run_password_hash(bcrypt.check_password_hash, user['password'], password):
         return jsonify({'error': 'Invalid credentials'}), 401
     
-    token = jwt.encode({
+    if hash_rounds(user['password']) != app.config['BCRYPT_LOG_ROUNDS']:
+        rehash_password(user['_id'], password)
+    
+    claims = {
         'user_id': str(user['_id']),
         'email': user['email'],
         'exp': datetime.utcnow() + timedelta(days=7)
-    }, app.config['SECRET_KEY'], algorithm='HS256')
+    }
+    # Organization membership is assigned on the user document
+    if user.get('org_id'):
+        # Often an ObjectId reference, which JWTs cannot carry
+        claims['org_id'] = str(user['org_id'])
+    token = jwt.encode(claims, app.config['SECRET_KEY'], algorithm='HS256')
     
     return jsonify({
         'token': token,
@@ -120,436 +270,716 @@ def login():
         }
     }), 200
 
+def rehash_password(user_id, password):
+    """Re-hash a password at the configured cost in the background."""
+    def store(hashed):
+        users_collection.update_one({'_id': user_id}, {'$set': {'password': hashed.decode('utf-8')}})
+    
+    defer_password_hash(user_id, bcrypt.generate_password_hash, password, app.config['BCRYPT_LOG_ROUNDS'],
+                        on_done=store)
+
+def extract_parameters(soil_data):
+    """Pull the rule inputs out of a raw soil_data record."""
+    return {
+        'LL': soil_data.get('LL', 0),
+        'PL': soil_data.get('PL', 0),
+        'PI': soil_data.get('PI', 0),
+        'Gravel': soil_data.get('G', 0),
+        'Sand': soil_data.get('CS', 0) + soil_data.get('MS', 0) + soil_data.get('FS', 0),
+        'Fines': soil_data.get('F', 0),
+        'OMC': soil_data.get('OMC%', 0),
+        'MDD': soil_data.get('MDD (kN/m3)', 0),
+        'NMC': soil_data.get('NMC (%)', 0)
+    }
+
+def analyze_and_save(user, samples, location=None):
+    """Evaluate the rules for many parameter sets and store them as reports.
+
+    Reports are written with one insert_many per BATCH_CHUNK_SIZE samples,
+    all tagged with the optional site location.
+    Returns the results in input order, each with its report_id.
+    """
+    with phase('rules'):
+        outcomes = suitability_engine.evaluate_codes_many(samples)
+        results = [{**suitability_engine.expand(outcome, parameters), 'parameters': parameters}
+                   for outcome, parameters in zip(outcomes, samples)]
+    
+    created_at = datetime.utcnow()
+    for start in range(0, len(results), BATCH_CHUNK_SIZE):
+        chunk = results[start:start + BATCH_CHUNK_SIZE]
+        reports = [report_store.new_report(user, outcome, parameters, created_at, location) for outcome, parameters in
+                   zip(outcomes[start:start + BATCH_CHUNK_SIZE], samples[start:start + BATCH_CHUNK_SIZE])]
+        with phase('insert'):
+            inserted = reports_collection.insert_many(reports)
+        with phase('stats_rollup'):
+            report_stats.record(report_stats_collection, reports)
+        for result, inserted_id in zip(chunk, inserted.inserted_ids):
+            result['report_id'] = str(inserted_id)
+    
+    return results
+
 @app.route('/api/analyze-suitability', methods=['POST'])
+@require_auth
 def analyze_suitability():
-    # Verify token
-    token = request.headers.get('Authorization', '').replace('Bearer ', '')
-    user_data = verify_token(token)
-    if not user_data:
-        return jsonify({'error': 'Unauthorized'}), 401
+    user = g.user
     
-    data = request.json
+    data = request.json or {}
     soil_data = data.get('soil_data', {})
+    if not isinstance(soil_data, dict):
+        return jsonify({'error': 'soil_data must be an object'}), 400
     
-    # Extract parameters
-    LL = soil_data.get('LL', 0)
-    PL = soil_data.get('PL', 0)
-    PI = soil_data.get('PI', 0)
-    G = soil_data.get('G', 0)  # Gravel
-    CS = soil_data.get('CS', 0) + soil_data.get('MS', 0) + soil_data.get('FS', 0)  # Total Sand
-    F = soil_data.get('F', 0)  # Fines
-    OMC = soil_data.get('OMC%', 0)
-    MDD = soil_data.get('MDD (kN/m3)', 0)
-    NMC = soil_data.get('NMC (%)', 0)
-    
-    # 1. SOIL CLASSIFICATION (USCS/IS)
-    classification = ""
-    if F < 50:  # Coarse-grained
-        if G > CS:
-            if F < 5:
-                classification = "GW/GP - Well/Poorly graded Gravel"
-            elif PI < 4:
-                classification = "GM - Silty Gravel"
-            else:
-                classification = "GC - Clayey Gravel"
-        else:
-            if F < 5:
-                classification = "SW/SP - Well/Poorly graded Sand"
-            elif PI < 4:
-                classification = "SM - Silty Sand"
-            else:
-                classification = "SC - Clayey Sand"
-    else:  # Fine-grained
-        if LL < 35:
-            if PI < 7:
-                classification = "ML - Silt of Low Plasticity"
-            else:
-                classification = "CL - Clay of Low Plasticity"
-        elif LL < 50:
-            if PI < 7:
-                classification = "MI - Silt of Medium Plasticity"
-            else:
-                classification = "CI - Clay of Medium Plasticity"
-        else:
-            if PI < 7:
-                classification = "MH - Silt of High Plasticity"
-            else:
-                classification = "CH - Clay of High Plasticity"
-    
-    # 2. SOIL BEHAVIOR ANALYSIS
-    behavior = []
-    if PI > 17:
-        behavior.append("Highly plastic - prone to volume changes with moisture")
-    elif PI > 7:
-        behavior.append("Medium plasticity - moderate volume change potential")
-    else:
-        behavior.append("Low plasticity - minimal volume change")
-    
-    if F > 50:
-        behavior.append("Fine-grained soil - susceptible to moisture sensitivity")
-    else:
-        behavior.append("Coarse-grained soil - good drainage characteristics")
-    
-    if MDD > 18:
-        behavior.append("High density achievable - good compaction potential")
-    elif MDD > 16:
-        behavior.append("Moderate density - adequate compaction")
-    
-    # 3. SUITABILITY ASSESSMENT
-    suitability_score = 0
-    risks = []
-    
-    # Bearing capacity assessment
-    if PI < 12 and F < 50:
-        suitability_score += 3
-    elif PI < 20:
-        suitability_score += 2
-        risks.append("Moderate bearing capacity - may require deeper foundations")
-    else:
-        suitability_score += 0
-        risks.append("Low bearing capacity - deep foundations recommended")
-    
-    # Compressibility check
-    if LL > 50 or PI > 30:
-        risks.append("High compressibility - significant settlement expected")
-        suitability_score -= 2
-    elif LL > 35 or PI > 17:
-        risks.append("Moderate compressibility - monitor settlement")
-        suitability_score -= 1
-    
-    # Expansive soil check
-    if PI > 35 and F > 50:
-        risks.append("Highly expansive soil - severe swelling/shrinkage risk")
-        suitability_score -= 3
-    elif PI > 25 and F > 40:
-        risks.append("Moderately expansive - foundation movement possible")
-        suitability_score -= 2
-    
-    # Moisture sensitivity
-    if abs(NMC - OMC) > 4:
-        risks.append(f"Moisture content ({NMC}%) deviates from OMC ({OMC}%) - compaction issues")
-        suitability_score -= 1
-    
-    # Drainage assessment
-    if F > 50 and PI > 15:
-        risks.append("Poor drainage - waterlogging risk, drainage system essential")
-    
-    # Final suitability
-    if suitability_score >= 3:
-        suitability = "SUITABLE"
-        suitability_text = "Suitable for residential/light commercial construction"
-    elif suitability_score >= 0:
-        suitability = "MODERATELY SUITABLE"
-        suitability_text = "Moderately suitable - requires soil improvement measures"
-    else:
-        suitability = "UNSUITABLE"
-        suitability_text = "Not suitable without major ground improvement"
-    
-    # 4. RECOMMENDATIONS
-    recommendations = []
-    
-    if PI > 25:
-        recommendations.append("Use deep foundations (piles/piers) to reach stable strata")
-        recommendations.append("Provide moisture barrier around foundation perimeter")
-    
-    if F > 50:
-        recommendations.append("Install proper drainage system to control groundwater")
-        recommendations.append("Consider soil stabilization with lime/cement")
-    
-    if MDD < 16:
-        recommendations.append("Improve compaction through mechanical stabilization")
-    
-    if LL > 50:
-        recommendations.append("Conduct consolidation tests for settlement analysis")
-        recommendations.append("Consider preloading or ground improvement techniques")
-    
-    if suitability == "SUITABLE" and not recommendations:
-        recommendations.append("Proceed with standard foundation design as per IS codes")
-        recommendations.append("Maintain proper compaction at 95% of MDD")
-        recommendations.append("Ensure adequate drainage around structures")
-    
-    if not recommendations:
-        recommendations.append("Consult geotechnical engineer for detailed investigation")
-        recommendations.append("Perform additional tests: triaxial, consolidation, CBR")
-    
-    # Save report to database
-    report_data = {
-        'user_id': user_data['user_id'],
-        'user_email': user_data['email'],
-        'classification': classification,
-        'behavior': behavior,
-        'suitability': suitability,
-        'suitability_text': suitability_text,
-        'risks': risks if risks else ['No major risks identified'],
-        'recommendations': recommendations,
-        'parameters': {
-            'LL': LL,
-            'PL': PL,
-            'PI': PI,
-            'Gravel': G,
-            'Sand': CS,
-            'Fines': F,
-            'OMC': OMC,
-            'MDD': MDD,
-            'NMC': NMC
-        },
-        'created_at': datetime.utcnow()
-    }
+    idempotency_key = request.headers.get('Idempotency-Key')
+    if idempotency_key is not None and not 0 < len(idempotency_key) <= MAX_IDEMPOTENCY_KEY_LENGTH:
+        return jsonify({'error': f'Idempotency-Key must be 1-{MAX_IDEMPOTENCY_KEY_LENGTH} characters'}), 400
+    
+    try:
+        location = nearby.parse_location(data.get('location'))
+    except nearby.LocationError as e:
+        return jsonify({'error': str(e)}), 400
     
-    result = reports_collection.insert_one(report_data)
-    report_data['_id'] = str(result.inserted_id)
+    try:
+        parameters = extract_parameters(soil_data)
+    except (TypeError, ValueError):
+        return jsonify({'error': 'All soil parameters must be numeric'}), 400
+    content_hash = report_store.content_hash(parameters, location)
+    
+    # Retries and double submits get the stored report back
+    with phase('dedupe'):
+        existing = find_submitted_report(user, content_hash, idempotency_key)
+    if existing:
+        return existing
+    
+    # Run the suitability rules
+    with phase('rules'):
+        try:
+            outcome = suitability_engine.evaluate_codes(parameters)
+        except (TypeError, ValueError):
+            return jsonify({'error': 'All soil parameters must be numeric'}), 400
+        result = suitability_engine.expand(outcome, parameters)
+    
+    # Save report to database as rule codes; text is expanded on read
+    report_data = report_store.new_report(user, outcome, parameters, datetime.utcnow(), location)
+    report_data['content_hash'] = content_hash
+    if idempotency_key is not None:
+        report_data['idempotency_key'] = idempotency_key
+    
+    with phase('insert'):
+        try:
+            inserted = reports_collection.insert_one(report_data)
+        except DuplicateKeyError:
+            # A concurrent identical submission won the race
+            existing = find_submitted_report(user, content_hash, idempotency_key)
+            if existing:
+                return existing
+            raise
+    with phase('stats_rollup'):
+        report_stats.record(report_stats_collection, [report_data])
     
     return jsonify({
-        'report_id': str(result.inserted_id),
-        'classification': classification,
-        'behavior': behavior,
-        'suitability': suitability,
-        'suitability_text': suitability_text,
-        'risks': risks if risks else ['No major risks identified'],
-        'recommendations': recommendations,
-        'parameters': {
-            'LL': LL,
-            'PL': PL,
-            'PI': PI,
-            'Gravel': G,
-            'Sand': CS,
-            'Fines': F,
-            'OMC': OMC,
-            'MDD': MDD,
-            'NMC': NMC
-        }
+        'report_id': str(inserted.inserted_id),
+        **result,
+        'parameters': parameters
     })
 
+SUBMITTED_REPORT_FIELDS = ['classification', 'behavior', 'suitability', 'suitability_text', 'risks',
+                           'recommendations', 'parameters', 'catalog', 'content_hash', 'idempotency_key']
+
+def find_submitted_report(user, content_hash, idempotency_key=None):
+    """Response for an already stored submission, or None if this one is new."""
+    query = {'user_id': user.user_id, 'content_hash': content_hash}
+    if idempotency_key is not None:
+        query = {'user_id': user.user_id, '$or': [{'content_hash': content_hash},
+                                                  {'idempotency_key': idempotency_key}]}
+    # At most one match per unique index; the key's report takes precedence
+    matches = list(reports_collection.find(query, SUBMITTED_REPORT_FIELDS).limit(2))
+    if not matches:
+        return None
+    report = max(matches, key=lambda r: idempotency_key is not None and r.get('idempotency_key') == idempotency_key)
+    
+    if report.get('content_hash') != content_hash:
+        return jsonify({'error': 'Idempotency-Key was already used for different soil_data'}), 422
+    
+    report_store.to_api(report)
+    report['report_id'] = str(report.pop('_id'))
+    report.pop('content_hash', None)
+    report.pop('idempotency_key', None)
+    return jsonify(report), 200, {'Idempotent-Replayed': 'true'}
+
+@app.route('/api/analyze-suitability/batch', methods=['POST'])
+@require_auth
+def analyze_suitability_batch():
+    data = request.json or {}
+    records = data.get('soil_data', [])
+    
+    if not isinstance(records, list) or not records:
+        return jsonify({'error': 'soil_data must be a non-empty list'}), 400
+    if len(records) > MAX_BATCH_SIZE:
+        return jsonify({'error': f'Batch too large (max {MAX_BATCH_SIZE} samples)'}), 400
+    try:
+        location = nearby.parse_location(data.get('location'))
+    except nearby.LocationError as e:
+        return jsonify({'error': str(e)}), 400
+    
+    samples = []
+    for index, soil_data in enumerate(records):
+        if not isinstance(soil_data, dict):
+            return jsonify({'error': f'Sample {index} is not an object'}), 400
+        try:
+            samples.append(extract_parameters(soil_data))
+        except TypeError:
+            return jsonify({'error': f'Sample {index} has non-numeric parameters'}), 400
+    
+    try:
+        results = analyze_and_save(g.user, samples, location)
+    except (TypeError, ValueError):
+        return jsonify({'error': 'All soil parameters must be numeric'}), 400
+    
+    return jsonify({'count': len(results), 'results': results})
+
+@app.route('/api/analyze-suitability/sweep', methods=['POST'])
+@require_auth
+def analyze_suitability_sweep():
+    data = request.json or {}
+    soil_data = data.get('soil_data', {})
+    if not isinstance(soil_data, dict):
+        return jsonify({'error': 'soil_data must be an object'}), 400
+    
+    try:
+        axes = sweep.parse_axes(data.get('sweep'))
+        with phase('rules'):
+            result = sweep.run(extract_parameters(soil_data), axes)
+    except sweep.SweepError as e:
+        return jsonify({'error': str(e)}), 400
+    except (TypeError, ValueError):
+        return jsonify({'error': 'All soil parameters must be numeric'}), 400
+    
+    with phase('serialize'):
+        response = jsonify(result)
+    return response, 200
+
+@app.route('/api/upload-lab-sheet', methods=['POST'])
+@require_auth
+def upload_lab_sheet():
+    upload = request.files.get('file')
+    if not upload or not upload.filename:
+        return jsonify({'error': 'No file uploaded'}), 400
+    
+    summary = {'rows': 0, 'inserted': 0, 'failed': 0, 'suitability_counts': {}, 'errors': []}
+    
+    def valid_samples(rows):
+        # Count and collect row errors while passing good rows through
+        for row_number, soil_data, error in rows:
+            summary['rows'] += 1
+            if error:
+                summary['failed'] += 1
+                if len(summary['errors']) < MAX_UPLOAD_ERRORS:
+                    summary['errors'].append({'row': row_number, 'error': error})
+                continue
+            yield extract_parameters(soil_data)
+    
+    import lab_sheets
+    
+    try:
+        rows = lab_sheets.read_samples(upload.stream, upload.filename)
+        for chunk in lab_sheets.chunked(valid_samples(rows), BATCH_CHUNK_SIZE):
+            for result in analyze_and_save(g.user, chunk):
+                summary['inserted'] += 1
+                counts = summary['suitability_counts']
+                counts[result['suitability']] = counts.get(result['suitability'], 0) + 1
+    except lab_sheets.SheetError as e:
+        return jsonify({'error': str(e), **summary}), 400
+    
+    return jsonify(summary), 200
+
 @app.route('/api/generate-report', methods=['POST'])
+@require_auth
 def generate_report():
-    token = request.headers.get('Authorization', '').replace('Bearer ', '')
-    user_data = verify_token(token)
-    if not user_data:
-        return jsonify({'error': 'Unauthorized'}), 401
-    
     data = request.json
     result = data.get('result', {})
     
-    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+    report_date = datetime.now()
+    timestamp = report_date.strftime("%Y%m%d_%H%M%S")
     filename = f"soil_report_{timestamp}.pdf"
-    filepath = os.path.join(REPORT_PATH, filename)
-    
-    doc = SimpleDocTemplate(filepath, pagesize=A4, topMargin=0.6*inch, bottomMargin=0.6*inch, leftMargin=0.8*inch, rightMargin=0.8*inch)
-    story = []
-    styles = getSampleStyleSheet()
-    
-    # Professional styles
-    title_style = ParagraphStyle('Title', parent=styles['Heading1'], 
-        fontSize=24, textColor=colors.HexColor('#1e3a5f'), 
-        spaceAfter=6, alignment=TA_CENTER, fontName='Helvetica-Bold', leading=28)
-    
-    subtitle_style = ParagraphStyle('Subtitle', parent=styles['Normal'], 
-        fontSize=10, textColor=colors.HexColor('#4a5568'), 
-        alignment=TA_CENTER, spaceAfter=20)
-    
-    heading_style = ParagraphStyle('Heading', parent=styles['Heading2'], 
-        fontSize=12, textColor=colors.HexColor('#1e3a5f'), 
-        spaceAfter=8, spaceBefore=16, fontName='Helvetica-Bold', 
-        borderPadding=(5, 0, 5, 0), leftIndent=0)
-    
-    body_style = ParagraphStyle('Body', parent=styles['Normal'], 
-        fontSize=9.5, textColor=colors.HexColor('#1a1a1a'), 
-        spaceAfter=5, leading=13, leftIndent=0)
-    
-    # Professional Header
-    header_data = [[
-        Paragraph("<b>GEOTECHNICAL ANALYSIS REPORT</b>", title_style),
-    ]]
-    header_table = Table(header_data, colWidths=[6.7*inch])
-    header_table.setStyle(TableStyle([
-        ('BACKGROUND', (0, 0), (-1, -1), colors.HexColor('#f7fafc')),
-        ('TOPPADDING', (0, 0), (-1, -1), 20),
-        ('BOTTOMPADDING', (0, 0), (-1, -1), 15),
-        ('BOX', (0, 0), (-1, -1), 1, colors.HexColor('#e2e8f0')),
-    ]))
-    story.append(header_table)
-    story.append(Spacer(1, 0.15*inch))
-    
-    # Report Info
-    info_data = [[
-        Paragraph(f"<b>Report Date:</b> {datetime.now().strftime('%B %d, %Y')}", 
-                 ParagraphStyle('Info', parent=styles['Normal'], fontSize=9, textColor=colors.HexColor('#4a5568'))),
-        Paragraph(f"<b>Report ID:</b> {timestamp}", 
-                 ParagraphStyle('Info', parent=styles['Normal'], fontSize=9, textColor=colors.HexColor('#4a5568'), alignment=TA_RIGHT))
-    ]]
-    info_table = Table(info_data, colWidths=[3.35*inch, 3.35*inch])
-    info_table.setStyle(TableStyle([
-        ('TOPPADDING', (0, 0), (-1, -1), 5),
-        ('BOTTOMPADDING', (0, 0), (-1, -1), 5),
-    ]))
-    story.append(info_table)
-    story.append(Spacer(1, 0.2*inch))
-    
-    # Disclaimer
-    disclaimer_data = [[
-        Paragraph("<b>DISCLAIMER:</b> This report provides preliminary geotechnical analysis for reference purposes. "
-                 "Professional site investigation and licensed engineer review are required before construction.", 
-                 ParagraphStyle('Disc', parent=styles['Normal'], fontSize=8.5, textColor=colors.HexColor('#c0392b'), leading=11))
-    ]]
-    disclaimer_table = Table(disclaimer_data, colWidths=[6.7*inch])
-    disclaimer_table.setStyle(TableStyle([
-        ('BACKGROUND', (0, 0), (-1, -1), colors.HexColor('#fef5e7')),
-        ('BOX', (0, 0), (-1, -1), 1.5, colors.HexColor('#f39c12')),
-        ('LEFTPADDING', (0, 0), (-1, -1), 10),
-        ('RIGHTPADDING', (0, 0), (-1, -1), 10),
-        ('TOPPADDING', (0, 0), (-1, -1), 8),
-        ('BOTTOMPADDING', (0, 0), (-1, -1), 8),
-    ]))
-    story.append(disclaimer_table)
-    story.append(Spacer(1, 0.25*inch))
-    
-    # Section 1: Classification
-    story.append(Paragraph("1. SOIL CLASSIFICATION", heading_style))
-    class_data = [[Paragraph(result.get('classification', 'N/A'), 
-                   ParagraphStyle('Class', parent=styles['Normal'], fontSize=10.5, 
-                   textColor=colors.HexColor('#1a1a1a'), fontName='Helvetica-Bold', leading=14))]]
-    class_table = Table(class_data, colWidths=[6.7*inch])
-    class_table.setStyle(TableStyle([
-        ('BACKGROUND', (0, 0), (-1, -1), colors.HexColor('#edf2f7')),
-        ('BOX', (0, 0), (-1, -1), 1, colors.HexColor('#2c5f8d')),
-        ('LEFTPADDING', (0, 0), (-1, -1), 12),
-        ('TOPPADDING', (0, 0), (-1, -1), 10),
-        ('BOTTOMPADDING', (0, 0), (-1, -1), 10),
-    ]))
-    story.append(class_table)
-    story.append(Spacer(1, 0.18*inch))
-    
-    # Section 2: Parameters
-    story.append(Paragraph("2. LABORATORY TEST RESULTS", heading_style))
-    params = result.get('parameters', {})
-    param_data = [[
-        Paragraph('<b>Parameter</b>', ParagraphStyle('H', parent=styles['Normal'], fontSize=9.5, textColor=colors.white, fontName='Helvetica-Bold')),
-        Paragraph('<b>Value</b>', ParagraphStyle('H', parent=styles['Normal'], fontSize=9.5, textColor=colors.white, fontName='Helvetica-Bold', alignment=TA_CENTER)),
-        Paragraph('<b>Unit</b>', ParagraphStyle('H', parent=styles['Normal'], fontSize=9.5, textColor=colors.white, fontName='Helvetica-Bold', alignment=TA_CENTER))
-    ]]
-    
-    param_rows = [
-        ['Liquid Limit (LL)', params.get('LL', 'N/A'), '%'],
-        ['Plastic Limit (PL)', params.get('PL', 'N/A'), '%'],
-        ['Plasticity Index (PI)', params.get('PI', 'N/A'), '-'],
-        ['Gravel Content', params.get('Gravel', 'N/A'), '%'],
-        ['Sand Content', params.get('Sand', 'N/A'), '%'],
-        ['Fines Content', params.get('Fines', 'N/A'), '%'],
-        ['Optimum Moisture Content (OMC)', params.get('OMC', 'N/A'), '%'],
-        ['Maximum Dry Density (MDD)', params.get('MDD', 'N/A'), 'kN/m³'],
-        ['Natural Moisture Content (NMC)', params.get('NMC', 'N/A'), '%']
-    ]
-    
-    for row in param_rows:
-        param_data.append([str(row[0]), str(row[1]), str(row[2])])
-    
-    param_table = Table(param_data, colWidths=[3.8*inch, 1.8*inch, 1.1*inch])
-    param_table.setStyle(TableStyle([
-        ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#1e3a5f')),
-        ('TEXTCOLOR', (0, 0), (-1, 0), colors.white),
-        ('ALIGN', (0, 0), (0, -1), 'LEFT'),
-        ('ALIGN', (1, 0), (-1, -1), 'CENTER'),
-        ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-        ('FONTSIZE', (0, 0), (-1, -1), 9),
-        ('TOPPADDING', (0, 0), (-1, -1), 7),
-        ('BOTTOMPADDING', (0, 0), (-1, -1), 7),
-        ('LEFTPADDING', (0, 0), (-1, -1), 10),
-        ('RIGHTPADDING', (0, 0), (-1, -1), 10),
-        ('BACKGROUND', (0, 1), (-1, -1), colors.white),
-        ('ROWBACKGROUNDS', (0, 1), (-1, -1), [colors.white, colors.HexColor('#f7fafc')]),
-        ('GRID', (0, 0), (-1, -1), 0.5, colors.HexColor('#e2e8f0')),
-        ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
-    ]))
-    story.append(param_table)
-    story.append(Spacer(1, 0.18*inch))
-    
-    # Section 3: Suitability
-    story.append(Paragraph("3. SUITABILITY ASSESSMENT", heading_style))
-    suitability = result.get('suitability', 'N/A')
-    suit_color = '#2d6a4f' if suitability == 'SUITABLE' else ('#f39c12' if 'MODERATELY' in suitability else '#c0392b')
-    suit_bg = '#d5f4e6' if suitability == 'SUITABLE' else ('#fef5e7' if 'MODERATELY' in suitability else '#fadbd8')
-    
-    suit_data = [[
-        Paragraph(f"<b>{suitability}</b>", 
-                 ParagraphStyle('Suit', parent=styles['Normal'], fontSize=12, 
-                 textColor=colors.HexColor(suit_color), fontName='Helvetica-Bold', alignment=TA_CENTER)),
-        Paragraph(result.get('suitability_text', ''), 
-                 ParagraphStyle('SuitText', parent=body_style, fontSize=9.5, leading=13))
-    ]]
-    suit_table = Table(suit_data, colWidths=[1.6*inch, 5.1*inch])
-    suit_table.setStyle(TableStyle([
-        ('BACKGROUND', (0, 0), (-1, -1), colors.HexColor(suit_bg)),
-        ('BOX', (0, 0), (-1, -1), 1.5, colors.HexColor(suit_color)),
-        ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
-        ('LEFTPADDING', (0, 0), (-1, -1), 10),
-        ('RIGHTPADDING', (0, 0), (-1, -1), 10),
-        ('TOPPADDING', (0, 0), (-1, -1), 10),
-        ('BOTTOMPADDING', (0, 0), (-1, -1), 10),
-    ]))
-    story.append(suit_table)
-    story.append(Spacer(1, 0.18*inch))
-    
-    # Section 4: Behavior
-    story.append(Paragraph("4. SOIL BEHAVIOR CHARACTERISTICS", heading_style))
-    for behavior in result.get('behavior', []):
-        story.append(Paragraph(f"• {behavior}", body_style))
-    story.append(Spacer(1, 0.18*inch))
-    
-    # Section 5: Risks
-    story.append(Paragraph("5. CONSTRUCTION RISKS", heading_style))
-    for risk in result.get('risks', []):
-        story.append(Paragraph(f"• {risk}", 
-                     ParagraphStyle('Risk', parent=body_style, textColor=colors.HexColor('#c0392b'))))
-    story.append(Spacer(1, 0.18*inch))
-    
-    # Section 6: Recommendations
-    story.append(Paragraph("6. ENGINEERING RECOMMENDATIONS", heading_style))
-    for i, rec in enumerate(result.get('recommendations', []), 1):
-        story.append(Paragraph(f"<b>{i}.</b> {rec}", 
-                     ParagraphStyle('Rec', parent=body_style, textColor=colors.HexColor('#2d6a4f'), leftIndent=15)))
-    story.append(Spacer(1, 0.25*inch))
-    
-    # Professional Footer
-    footer_data = [[
-        Paragraph("<b>Geotechnical Analysis Platform</b>",
-                 ParagraphStyle('FooterTitle', parent=styles['Normal'], fontSize=9, 
-                 textColor=colors.HexColor('#1e3a5f'), alignment=TA_CENTER, fontName='Helvetica-Bold')),
-    ], [
-        Paragraph("This report is generated by automated analysis. For construction projects, consult a licensed geotechnical engineer.",
-                 ParagraphStyle('Footer', parent=styles['Normal'], fontSize=8, 
-                 textColor=colors.HexColor('#718096'), alignment=TA_CENTER))
-    ]]
-    footer_table = Table(footer_data, colWidths=[6.7*inch])
-    footer_table.setStyle(TableStyle([
-        ('BACKGROUND', (0, 0), (-1, -1), colors.HexColor('#f7fafc')),
-        ('BOX', (0, 0), (-1, -1), 1, colors.HexColor('#e2e8f0')),
-        ('TOPPADDING', (0, 0), (-1, -1), 8),
-        ('BOTTOMPADDING', (0, 0), (-1, -1), 8),
-    ]))
-    story.append(footer_table)
-    
-    doc.build(story)
-    return send_file(filepath, as_attachment=True, download_name=filename, mimetype='application/pdf')
+    
+    if request.args.get('async') in ('1', 'true'):
+        return queue_report_job(g.user, filename, lambda done: job_queue.submit(result, timestamp, report_date, done))
+    
+    with phase('pdf_setup'):
+        # First call imports ReportLab and builds the shared styles
+        import pdf_report
+    with phase('pdf_build'):
+        pdf = pdf_report.render_pdf(result, timestamp, report_date)
+    metrics.observe_pdf(pdf)
+    
+    return send_file(BytesIO(pdf), as_attachment=True, download_name=filename, mimetype='application/pdf')
+
+def queue_report_job(user, filename, submit, cache_key=None):
+    """Record a job and hand submit(done) to the queue; finished PDFs also go to stored_pdfs under cache_key."""
+    job_id = report_jobs_collection.insert_one({
+        'user_id': user.user_id,
+        'status': 'queued',
+        'filename': filename,
+        'created_at': datetime.utcnow()
+    }).inserted_id
+    
+    def done(pdf, error, wait_seconds, render_seconds):
+        update = {
+            'status': 'failed' if error else 'done',
+            'wait_ms': round(wait_seconds * 1000, 1),
+            'render_ms': round(render_seconds * 1000, 1)
+        }
+        if error:
+            update['error'] = str(error)
+        else:
+            update['pdf'] = pdf
+            metrics.observe_pdf(pdf)
+            REPORT_JOB_RENDER.observe(render_seconds)
+            if cache_key:
+                stored_pdfs.put(cache_key, pdf)
+        REPORT_JOB_WAIT.observe(wait_seconds)
+        report_jobs_collection.update_one({'_id': job_id}, {'$set': update})
+    
+    try:
+        submit(done)
+    except report_jobs.QueueFull:
+        report_jobs_collection.delete_one({'_id': job_id})
+        return jsonify({'error': 'Report queue is full, try again shortly'}), 503, {'Retry-After': '5'}
+    except Exception as error:
+        # Never leave a job that nothing will finish sitting in 'queued'
+        app.logger.error('Report job %s could not be submitted: %s', job_id, error)
+        report_jobs_collection.delete_one({'_id': job_id})
+        return jsonify({'error': 'Report rendering is unavailable, try again shortly'}), 503, {'Retry-After': '5'}
+    
+    return jsonify({
+        'job_id': str(job_id),
+        'status': 'queued',
+        'status_url': f'/api/report-jobs/{job_id}'
+    }), 202
+
+@app.route('/api/reports/<report_id>/pdf', methods=['GET'])
+@require_auth
+def get_report_pdf(report_id):
+    try:
+        report = reports_collection.find_one({'_id': ObjectId(report_id), 'user_id': g.user.user_id},
+                                             [*pdf_cache.PDF_FIELDS, 'catalog', 'created_at'])
+    except InvalidId:
+        report = None
+    if not report:
+        return jsonify({'error': 'Report not found'}), 404
+    report_store.to_api(report)
+    
+    with phase('pdf_setup'):
+        import pdf_report
+    key = pdf_cache.cache_key(report, report_id, report['created_at'], pdf_report.TEMPLATE_VERSION)
+    cached = http_cache.not_modified(key, weak=False)
+    if cached:
+        return cached
+    
+    with phase('pdf_cache'):
+        pdf = stored_pdfs.get(key)
+    if pdf is None:
+        with phase('pdf_build'):
+            pdf = pdf_report.render_pdf(report, report_id, report['created_at'])
+        metrics.observe_pdf(pdf)
+        with phase('pdf_cache'):
+            stored_pdfs.put(key, pdf)
+    
+    response = send_file(BytesIO(pdf), as_attachment=True, download_name=f"soil_report_{report_id}.pdf",
+                         mimetype='application/pdf')
+    return http_cache.with_etag(response, key, weak=False)
+
+@app.route('/api/reports/bundle', methods=['POST'])
+@require_auth
+def get_report_bundle():
+    data = request.get_json(silent=True) or {}
+    report_ids = data.get('report_ids')
+    bundle_format = data.get('format', 'pdf')
+    if bundle_format not in report_bundle.FORMATS:
+        return jsonify({'error': f'format must be one of {", ".join(report_bundle.FORMATS)}'}), 400
+    if not isinstance(report_ids, list) or not report_ids:
+        return jsonify({'error': 'report_ids must be a non-empty list'}), 400
+    # Keep the requested order, without repeats
+    report_ids = list(dict.fromkeys(str(report_id) for report_id in report_ids))
+    if len(report_ids) > report_bundle.MAX_BUNDLE_REPORTS:
+        return jsonify({'error': f'Too many reports (max {report_bundle.MAX_BUNDLE_REPORTS})'}), 400
+    try:
+        object_ids = [ObjectId(report_id) for report_id in report_ids]
+    except InvalidId:
+        return jsonify({'error': 'Invalid report id'}), 400
+    
+    with phase('query'):
+        found = {str(report['_id']): report for report in reports_collection.find(
+            {'_id': {'$in': object_ids}, 'user_id': g.user.user_id}, [*pdf_cache.PDF_FIELDS, 'catalog', 'created_at'])}
+    missing = [report_id for report_id in report_ids if report_id not in found]
+    if missing:
+        return jsonify({'error': 'Reports not found', 'missing': missing}), 404
+    
+    with phase('pdf_setup'):
+        import pdf_report
+    entries = []
+    for report_id in report_ids:
+        report = report_store.to_api(found[report_id])
+        key = pdf_cache.cache_key(report, report_id, report['created_at'], pdf_report.TEMPLATE_VERSION)
+        entries.append((report_id, report, key))
+    
+    timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+    if bundle_format == 'zip':
+        with phase('pdf_cache'):
+            cached = stored_pdfs.get_many([key for _, _, key in entries])
+        return Response(stream_with_context(report_bundle.zip_stream(bundle_pdfs(entries, cached))),
+                        mimetype='application/zip',
+                        headers={'Content-Disposition': f'attachment; filename=soil_reports_{timestamp}.zip'})
+    
+    key = report_bundle.bundle_key([key for _, _, key in entries])
+    filename = f"soil_reports_{timestamp}.pdf"
+    with phase('pdf_cache'):
+        pdf = stored_pdfs.get(key)
+    if pdf is None:
+        # ReportLab work never runs on the web worker; big bundles become async jobs
+        pdf_entries = [(report, report_id, report['created_at']) for report_id, report, _ in entries]
+        if len(entries) > report_bundle.BUNDLE_SYNC_LIMIT or request.args.get('async') in ('1', 'true'):
+            return queue_report_job(g.user, filename, lambda done: job_queue.submit_bundle(pdf_entries, done),
+                                    cache_key=key)
+        try:
+            with phase('pdf_build'):
+                pdf = job_queue.render_bundle(pdf_entries)
+        except report_jobs.QueueFull:
+            return jsonify({'error': 'Report queue is full, try again shortly'}), 503, {'Retry-After': '5'}
+        except BrokenProcessPool:
+            return jsonify({'error': 'Report rendering is unavailable, try again shortly'}), 503, {'Retry-After': '5'}
+        metrics.observe_pdf(pdf)
+        with phase('pdf_cache'):
+            stored_pdfs.put(key, pdf)
+    
+    return send_file(BytesIO(pdf), as_attachment=True, download_name=filename, mimetype='application/pdf')
+
+def bundle_pdfs(entries, cached):
+    """(report_id, report_date, pdf, error) per entry: cached PDFs first, then renders as they finish."""
+    misses = []
+    for report_id, report, key in entries:
+        if key in cached:
+            yield report_id, report['created_at'], cached[key], None
+        else:
+            misses.append((report_id, report, key))
+    
+    renders = job_queue.render_unordered(((report_id, report['created_at'], key), report, report_id, report['created_at'])
+                                         for report_id, report, key in misses)
+    for (report_id, report_date, key), pdf, error in renders:
+        if error:
+            app.logger.error('Bundle render failed for report %s: %s', report_id, error)
+        else:
+            metrics.observe_pdf(pdf)
+            stored_pdfs.put(key, pdf)
+        yield report_id, report_date, pdf, error
+
+@app.route('/api/report-jobs/<job_id>', methods=['GET'])
+@require_auth
+def get_report_job(job_id):
+    user = g.user
+    
+    try:
+        job = report_jobs_collection.find_one({'_id': ObjectId(job_id), 'user_id': user.user_id})
+    except InvalidId:
+        job = None
+    if not job:
+        return jsonify({'error': 'Job not found'}), 404
+    
+    if job['status'] == 'done':
+        # A finished job's PDF never changes
+        cached = http_cache.not_modified(job_id, weak=False)
+        if cached:
+            return cached
+        response = send_file(BytesIO(job['pdf']), as_attachment=True, download_name=job['filename'], mimetype='application/pdf')
+        return http_cache.with_etag(response, job_id, weak=False)
+    
+    return jsonify({
+        'job_id': job_id,
+        'status': job['status'],
+        'wait_ms': job.get('wait_ms'),
+        'render_ms': job.get('render_ms'),
+        'error': job.get('error')
+    }), 200
+
+@app.route('/api/report-jobs/stats', methods=['GET'])
+@require_auth
+def report_job_stats():
+    return jsonify(job_queue.stats()), 200
 
 @app.route('/api/my-reports', methods=['GET'])
+@require_auth
 def get_my_reports():
-    # Verify token
-    token = request.headers.get('Authorization', '').replace('Bearer ', '')
-    user_data = verify_token(token)
-    if not user_data:
-        return jsonify({'error': 'Unauthorized'}), 401
+    user = g.user
+    
+    try:
+        limit = min(max(int(request.args.get('limit', REPORTS_PAGE_SIZE)), 1), MAX_REPORTS_PAGE_SIZE)
+    except ValueError:
+        return jsonify({'error': 'limit must be a number'}), 400
+    
+    # Optional projection for list views
+    projection = HIDDEN_REPORT_FIELDS
+    requested = None
+    fields = request.args.get('fields')
+    if fields:
+        requested = {field.strip() for field in fields.split(',') if field.strip()}
+        unknown = requested - REPORT_LIST_FIELDS - {'_id', 'created_at'}
+        if unknown:
+            return jsonify({'error': f'Unknown fields: {", ".join(sorted(unknown))}'}), 400
+        requested |= {'_id', 'created_at'}
+        projection = {field: 1 for field in report_fields(requested)}
+    
+    # Keyset pagination on (created_at, _id), newest first
+    query = {'user_id': user.user_id}
+    cursor = request.args.get('cursor')
+    if cursor:
+        try:
+            created_at, last_id = decode_reports_cursor(cursor)
+        except (ValueError, InvalidId):
+            return jsonify({'error': 'Invalid cursor'}), 400
+        query['$or'] = [
+            {'created_at': {'$lt': created_at}},
+            {'created_at': created_at, '_id': {'$lt': last_id}}
+        ]
+    
+    # The list only changes when reports are added or re-evaluated, and both
+    # move the user's stats rollup, so revalidating is one _id lookup
+    with phase('etag'):
+        rollup = report_stats_collection.find_one({'_id': report_stats.user_key(user.user_id)},
+                                                  {'count': 1, 'modified_at': 1}) or {}
+        etag = http_cache.weak_etag(user.user_id, rollup.get('count'), rollup.get('modified_at'),
+                                    request.query_string.decode(), suitability_engine.CATALOG_VERSION,
+                                    suitability_engine.RULESET_VERSION)
+    cached = http_cache.not_modified(etag)
+    if cached:
+        return cached
+    
+    with phase('query'):
+        reports = list(reports_collection.find(query, projection)
+                       .sort([('created_at', DESCENDING), ('_id', DESCENDING)])
+                       .hint(REPORT_LIST_INDEX)
+                       .limit(limit + 1))
+    
+    next_cursor = None
+    if len(reports) > limit:
+        reports = reports[:limit]
+        next_cursor = encode_reports_cursor(reports[-1])
+    
+    with phase('serialize'):
+        for report in reports:
+            serialize_report(report)
+            if requested:
+                for field in report.keys() - requested:
+                    del report[field]
+        response = jsonify({'reports': reports, 'next': next_cursor})
+    
+    return http_cache.with_etag(response, etag), 200
+
+@app.route('/api/my-reports/export', methods=['GET'])
+@require_auth
+def export_my_reports():
+    export_format = request.args.get('format', 'ndjson')
+    if export_format not in report_export.FORMATS:
+        return jsonify({'error': f'format must be one of {", ".join(report_export.FORMATS)}'}), 400
+    writer, mimetype, extension = report_export.FORMATS[export_format]
+    
+    cursor = (reports_collection.find({'user_id': g.user.user_id}, HIDDEN_REPORT_FIELDS)
+              .sort([('created_at', DESCENDING), ('_id', DESCENDING)])
+              .hint(REPORT_LIST_INDEX)
+              .batch_size(EXPORT_BATCH_SIZE))
+    
+    def reports():
+        with cursor:
+            for report in cursor:
+                report_store.to_api(report)
+                if 'location' in report:
+                    report['location'] = nearby.lat_lon(report['location'])
+                yield report
+    
+    filename = f"soil_reports_{datetime.now().strftime('%Y%m%d_%H%M%S')}.{extension}"
+    return Response(stream_with_context(writer(reports())), mimetype=mimetype,
+                    headers={'Content-Disposition': f'attachment; filename={filename}'})
+
+def request_scope(user):
+    """(field, value, None) for ?scope=user|org, or (None, None, error response)."""
+    scope = request.args.get('scope', 'user')
+    if scope == 'user':
+        return 'user_id', user.user_id, None
+    if scope != 'org':
+        return None, None, (jsonify({'error': 'scope must be user or org'}), 400)
+    if not user.org_id:
+        return None, None, (jsonify({'error': 'You do not belong to an organization'}), 403)
+    return 'org_id', user.org_id, None
+
+@app.route('/api/reports/nearby', methods=['GET'])
+@require_auth
+def nearby_reports():
+    scope_field, scope_value, error = request_scope(g.user)
+    if error:
+        return error
+    
+    try:
+        center = nearby.point(request.args.get('lat'), request.args.get('lon'))
+        radius = float(request.args.get('radius', nearby.NEARBY_RADIUS))
+        limit = min(max(int(request.args.get('limit', nearby.NEARBY_LIMIT)), 1), nearby.MAX_NEARBY_LIMIT)
+    except nearby.LocationError as e:
+        return jsonify({'error': str(e)}), 400
+    except ValueError:
+        return jsonify({'error': 'radius and limit must be numbers'}), 400
+    if not 0 < radius <= nearby.MAX_NEARBY_RADIUS:
+        return jsonify({'error': f'radius must be between 0 and {nearby.MAX_NEARBY_RADIUS:g} metres'}), 400
+    
+    with phase('query'):
+        result = next(reports_collection.aggregate(
+            nearby.pipeline(center, radius, {scope_field: scope_value}, limit)))
+    
+    with phase('serialize'):
+        samples = []
+        for report in result['samples']:
+            serialize_report(report)
+            report['distance_m'] = round(report['distance_m'], 1)
+            samples.append(report)
+        total = sum(group['count'] for group in result['by_classification'])
+        response = jsonify({
+            'center': nearby.lat_lon(center),
+            'radius_m': radius,
+            'total': total,
+            # Only the nearest NEARBY_COUNT_LIMIT samples were counted
+            'approximate': total >= nearby.NEARBY_COUNT_LIMIT,
+            'by_classification': result['by_classification'],
+            'samples': samples
+        })
+    
+    return response, 200
+
+@app.route('/api/reports/search', methods=['GET'])
+@require_auth
+def search_reports():
+    scope_field, scope_value, error = request_scope(g.user)
+    if error:
+        return error
+    
+    try:
+        limit = min(max(int(request.args.get('limit', REPORTS_PAGE_SIZE)), 1), MAX_REPORTS_PAGE_SIZE)
+        query, index = report_search.build_query(request.args, scope_field, scope_value)
+    except report_search.SearchError as e:
+        return jsonify({'error': str(e)}), 400
+    except ValueError:
+        return jsonify({'error': 'limit must be a number'}), 400
+    
+    # Totals come with the first page only
+    counts = None
+    if not request.args.get('cursor'):
+        with phase('count'):
+            counts = report_search.counts(reports_collection, query, index)
+    
+    cursor = request.args.get('cursor')
+    if cursor:
+        try:
+            created_at, last_id = decode_reports_cursor(cursor)
+        except (ValueError, InvalidId):
+            return jsonify({'error': 'Invalid cursor'}), 400
+        # The $lte keeps the hinted index scan starting at the cursor
+        query.setdefault('created_at', {})['$lte'] = created_at
+        query['$or'] = [
+            {'created_at': {'$lt': created_at}},
+            {'created_at': created_at, '_id': {'$lt': last_id}}
+        ]
     
-    # Get user's reports
-    reports = list(reports_collection.find(
-        {'user_id': user_data['user_id']}
-    ).sort('created_at', -1))
+    with phase('query'):
+        reports = list(reports_collection.find(query, HIDDEN_REPORT_FIELDS)
+                       .sort([('created_at', DESCENDING), ('_id', DESCENDING)])
+                       .hint(index)
+                       .limit(limit + 1))
     
-    # Convert ObjectId to string
-    for report in reports:
-        report['_id'] = str(report['_id'])
-        report['created_at'] = report['created_at'].isoformat()
+    next_cursor = None
+    if len(reports) > limit:
+        reports = reports[:limit]
+        next_cursor = encode_reports_cursor(reports[-1])
     
-    return jsonify({'reports': reports}), 200
+    with phase('serialize'):
+        for report in reports:
+            serialize_report(report)
+        response = jsonify({'reports': reports, 'next': next_cursor, 'counts': counts})
+    
+    return response, 200
+
+def serialize_report(report):
+    """Shape a stored report for JSON in place: rule texts, string id, ISO date, lat/lon location."""
+    report_store.to_api(report)
+    report['_id'] = str(report['_id'])
+    report['created_at'] = report['created_at'].isoformat()
+    if 'location' in report:
+        report['location'] = nearby.lat_lon(report['location'])
+    return report
+
+def report_fields(requested):
+    """Stored fields needed to answer a projection over API fields."""
+    stored = set(requested) | {'catalog'}
+    if 'suitability_text' in requested:
+        stored.add('suitability')
+    if 'risks' in requested:
+        # The moisture risk message quotes NMC and OMC
+        stored.add('parameters')
+    return stored
+
+def encode_reports_cursor(report):
+    key = f"{report['created_at'].isoformat()}|{report['_id']}"
+    return base64.urlsafe_b64encode(key.encode()).decode()
+
+def decode_reports_cursor(cursor):
+    try:
+        key = base64.urlsafe_b64decode(cursor.encode()).decode()
+    except (ValueError, UnicodeDecodeError):
+        raise ValueError(cursor)
+    created_at, _, last_id = key.partition('|')
+    return datetime.fromisoformat(created_at), ObjectId(last_id)
+
+@app.route('/api/stats', methods=['GET'])
+@require_auth
+def get_stats():
+    # Both rollups are maintained on insert, so this is two _id lookups
+    docs = {doc['_id']: doc for doc in report_stats_collection.find(
+        {'_id': {'$in': [report_stats.user_key(g.user.user_id), report_stats.GLOBAL_KEY]}})}
+    
+    return jsonify({
+        'user': report_stats.summarize(docs.get(report_stats.user_key(g.user.user_id))),
+        'global': report_stats.summarize(docs.get(report_stats.GLOBAL_KEY))
+    }), 200
+
+@app.cli.command('drop-obsolete-indexes')
+def drop_obsolete_indexes_command():
+    """Drop report indexes left behind by earlier versions."""
+    dropped = drop_obsolete_indexes(get_db())
+    print(f"Dropped {len(dropped)} obsolete indexes" + (f": {', '.join(dropped)}" if dropped else ''))
+
+@app.cli.command('rebuild-stats')
+def rebuild_stats():
+    """Recompute the /api/stats rollups from all stored reports."""
+    count = report_stats.rebuild(reports_collection, report_stats_collection)
+    print(f"Rebuilt {count} statistics rollups")
+
+@app.cli.command('reevaluate-reports')
+@click.option('--workers', type=int, default=None, help='Evaluation processes (default: CPU count).')
+@click.option('--batch-size', type=int, default=reevaluate.REEVALUATE_BATCH_SIZE, show_default=True)
+@click.option('--checkpoint', default='reevaluate.checkpoint.json', show_default=True,
+              help='Progress file; a rerun resumes from it.')
+def reevaluate_reports(workers, batch_size, checkpoint):
+    """Re-run the current rules over every report on an older rule set."""
+    print(f"Re-evaluating reports with rule set {suitability_engine.RULESET_VERSION}")
+    result = reevaluate.run(reports_collection, workers, batch_size, checkpoint)
+    print(f"{result['processed']} reports in {result['seconds']}s ({result['per_second']}/s): "
+          f"{result['changed']} changed classification or suitability, {result['failed']} could not be evaluated")
+    
+    # Classification and suitability counts moved with the reports
+    count = report_stats.rebuild(reports_collection, report_stats_collection)
+    print(f"Rebuilt {count} statistics rollups")
+    if os.path.exists(checkpoint):
+        os.remove(checkpoint)
+
+@app.cli.command('compact-reports')
+def compact_reports():
+    """Rewrite reports stored as text into rule codes plus the catalog version."""
+    migrated, skipped = report_store.migrate(reports_collection)
+    print(f"Compacted {migrated} reports, skipped {skipped} with text outside the message catalog")
 
 '''if __name__ == '__main__':
     app.run(debug=True, port=5000)'''
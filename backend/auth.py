@@ -0,0 +1,161 @@
+"""Authentication shared by the API views: JWTs and password hashing.
+
+Verified tokens are kept in a bounded cache until their `exp` claim, so a
+dashboard polling with the same token skips jwt.decode on every request.
+bcrypt releases the GIL, so request threads could hash directly; running
+the calls on password_pool instead caps how many hashes a process computes
+at once. bcrypt is CPU-bound, so the cap defaults to the CPU count: more
+concurrent hashes would only make every login slower. Cost upgrades of
+stored hashes are optional work and go to a single background thread
+(defer_password_hash), never ahead of logins on password_pool.
+"""
+import os
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from functools import wraps
+
+import jwt
+from flask import current_app, g, jsonify, request
+
+from metrics import phase
+
+TOKEN_CACHE_SIZE = int(os.getenv('TOKEN_CACHE_SIZE', 10000))
+PASSWORD_HASH_THREADS = int(os.getenv('PASSWORD_HASH_THREADS', os.cpu_count() or 4))
+# Deferred hashes beyond this are dropped; the next login asks again
+REHASH_QUEUE_LIMIT = int(os.getenv('REHASH_QUEUE_LIMIT', 100))
+
+password_pool = ThreadPoolExecutor(max_workers=PASSWORD_HASH_THREADS, thread_name_prefix='bcrypt')
+rehash_pool = ThreadPoolExecutor(max_workers=1, thread_name_prefix='bcrypt-rehash')
+_rehash_pending = set()
+_rehash_lock = threading.Lock()
+
+
+class UserContext:
+    """The authenticated caller, available to views as `g.user`."""
+    __slots__ = ('user_id', 'email', 'org_id', 'claims')
+
+    def __init__(self, claims):
+        self.user_id = claims['user_id']
+        self.email = claims.get('email')
+        self.org_id = claims.get('org_id')
+        self.claims = claims
+
+
+class TokenCache:
+    """LRU cache of verified token claims; entries expire at the token's exp."""
+
+    def __init__(self, maxsize=TOKEN_CACHE_SIZE):
+        self.maxsize = maxsize
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            expires_at, claims = entry
+            if expires_at <= time.time():
+                del self._entries[key]
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return claims
+
+    def put(self, key, claims, expires_at):
+        with self._lock:
+            self._entries[key] = (expires_at, claims)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        with self._lock:
+            return {'hits': self.hits, 'misses': self.misses, 'size': len(self._entries), 'maxsize': self.maxsize}
+
+
+token_cache = TokenCache()
+
+
+def verify_token(token, secret_key=None):
+    """Return the token's claims, or None if it is missing, invalid or expired."""
+    if not token:
+        return None
+    secret_key = secret_key or current_app.config['SECRET_KEY']
+    key = (secret_key, token)
+
+    claims = token_cache.get(key)
+    if claims is not None:
+        return claims
+
+    try:
+        claims = jwt.decode(token, secret_key, algorithms=['HS256'])
+    except jwt.InvalidTokenError:
+        return None
+
+    # Only tokens that expire are cached, and never past their expiry
+    if 'exp' in claims:
+        token_cache.put(key, claims, claims['exp'])
+    return claims
+
+
+def bearer_token():
+    return request.headers.get('Authorization', '').replace('Bearer ', '')
+
+
+def require_auth(view):
+    """Reject the request with 401 unless it carries a valid bearer token."""
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        with phase('verify_token'):
+            claims = verify_token(bearer_token())
+        if not claims or 'user_id' not in claims:
+            return jsonify({'error': 'Unauthorized'}), 401
+        g.user = UserContext(claims)
+        return view(*args, **kwargs)
+    return wrapper
+
+
+def run_password_hash(fn, *args):
+    """Run a bcrypt call on the password pool and wait for its result."""
+    return password_pool.submit(fn, *args).result()
+
+
+def defer_password_hash(key, fn, *args, on_done):
+    """Run an optional bcrypt call on the background thread, then on_done(result).
+
+    At most one call per key is pending, and none is queued once
+    REHASH_QUEUE_LIMIT are waiting. Returns whether the call was queued.
+    """
+    with _rehash_lock:
+        if key in _rehash_pending or len(_rehash_pending) >= REHASH_QUEUE_LIMIT:
+            return False
+        _rehash_pending.add(key)
+
+    def run():
+        try:
+            on_done(fn(*args))
+        finally:
+            with _rehash_lock:
+                _rehash_pending.discard(key)
+
+    rehash_pool.submit(run)
+    return True
+
+
+def hash_rounds(hashed):
+    """The cost factor stored in a bcrypt hash ("$2b$12$..." -> 12), or None."""
+    try:
+        return int(hashed.split('$')[2])
+    except (AttributeError, IndexError, ValueError):
+        return None
@@ -0,0 +1,63 @@
+"""Shared setup for benchmarks: the Flask app on an in-process mongomock database."""
+import statistics
+import time
+
+import mongomock
+
+import app as backend
+
+BENCH_EMAIL = 'bench@example.com'
+BENCH_PASSWORD = 'benchmark-password'
+
+
+def offline_app():
+    """Return the app module, connected to mongomock unless already connected."""
+    if backend._client is None:
+        backend.connect(mongomock.MongoClient())
+        # get_db() creates the indexes. mongomock checks unique indexes by
+        # scanning the whole collection on every write, which makes seeding
+        # large report sets quadratic. The benchmarks never submit duplicate
+        # samples, so drop them.
+        reports = backend.get_db()['reports']
+        for index in list(reports.list_indexes()):
+            if index.get('unique'):
+                reports.drop_index(index['name'])
+    return backend
+
+
+def create_user(email=BENCH_EMAIL, password=BENCH_PASSWORD, rounds=4):
+    backend.users_collection.delete_many({'email': email})
+    backend.users_collection.insert_one({
+        'name': 'Benchmark', 'email': email,
+        'password': backend.bcrypt.generate_password_hash(password, rounds).decode('utf-8')
+    })
+
+
+def auth_headers(email=BENCH_EMAIL, password=BENCH_PASSWORD):
+    """Create a user with a cheap hash and return Authorization headers for it."""
+    rounds = backend.app.config['BCRYPT_LOG_ROUNDS']
+    create_user(email, password, rounds)
+    response = backend.app.test_client().post('/api/login', json={'email': email, 'password': password})
+    return {'Authorization': f"Bearer {response.get_json()['token']}"}
+
+
+def percentile(values, fraction):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(round(fraction * (len(values) - 1))))]
+
+
+def timed(fn, iterations):
+    """Call fn() `iterations` times; return per-call seconds."""
+    latencies = []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        fn()
+        latencies.append(time.perf_counter() - start)
+    return latencies
+
+
+def latency_summary(latencies):
+    return {
+        'p50_ms': round(statistics.median(latencies) * 1000, 2),
+        'p99_ms': round(percentile(latencies, 0.99) * 1000, 2)
+    }
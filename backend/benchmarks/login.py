@@ -0,0 +1,66 @@
+"""Login throughput and latency (p50/p99) at several bcrypt costs.
+
+Logins run through the Flask test client against an in-process mongomock
+database, from several client threads at once, so the figures show how
+the bcrypt pool overlaps hashes under concurrent load.
+
+Run from the backend directory:
+    pip install -r benchmarks/requirements.txt
+    python -m benchmarks.login --rounds 4 8 10 12 --logins 100 --concurrency 8
+"""
+import argparse
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from benchmarks.common import BENCH_PASSWORD, create_user, latency_summary, offline_app
+
+backend = offline_app()
+
+
+def measure(rounds, logins, concurrency):
+    backend.app.config['BCRYPT_LOG_ROUNDS'] = rounds
+    email = f'bench-{rounds}@example.com'
+    create_user(email, BENCH_PASSWORD, rounds)
+
+    def login(_):
+        client = backend.app.test_client()
+        start = time.perf_counter()
+        response = client.post('/api/login', json={'email': email, 'password': BENCH_PASSWORD})
+        elapsed = time.perf_counter() - start
+        assert response.status_code == 200, response.get_json()
+        return elapsed
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        latencies = list(pool.map(login, range(logins)))
+    total = time.perf_counter() - start
+
+    return {
+        'rounds': rounds,
+        'logins_per_second': round(logins / total, 1),
+        **latency_summary(latencies)
+    }
+
+
+def run(rounds=(4, 8, 10, 12), logins=100, concurrency=8):
+    configured = backend.app.config['BCRYPT_LOG_ROUNDS']
+    try:
+        return [measure(cost, logins, concurrency) for cost in rounds]
+    finally:
+        backend.app.config['BCRYPT_LOG_ROUNDS'] = configured
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rounds', type=int, nargs='+', default=[4, 8, 10, 12], help='bcrypt costs to try')
+    parser.add_argument('--logins', type=int, default=100, help='logins per cost')
+    parser.add_argument('--concurrency', type=int, default=8, help='client threads')
+    args = parser.parse_args()
+
+    for result in run(args.rounds, args.logins, args.concurrency):
+        print(f"rounds={result['rounds']:>2}  {result['logins_per_second']:8.1f} logins/s  "
+              f"p50={result['p50_ms']:7.1f} ms  p99={result['p99_ms']:7.1f} ms")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,77 @@
+"""PDFs per second before and after the in-memory render path.
+
+"before" rebuilds every style per report and writes the PDF to a file, as
+generate_report used to; "after" uses the prebuilt styles and a BytesIO.
+
+Run from the backend directory:
+    python -m benchmarks.pdf_render --seconds 5
+"""
+import argparse
+import os
+import tempfile
+import time
+from datetime import datetime
+
+from reportlab.platypus import SimpleDocTemplate
+
+import pdf_report
+import suitability_engine
+
+SAMPLE_PARAMETERS = {
+    'LL': 45, 'PL': 25, 'PI': 20, 'Gravel': 10, 'Sand': 45, 'Fines': 45,
+    'OMC': 18, 'MDD': 17.5, 'NMC': 15
+}
+
+
+def sample_result():
+    return {**suitability_engine.evaluate(SAMPLE_PARAMETERS), 'parameters': SAMPLE_PARAMETERS}
+
+
+def render_to_disk(result, directory):
+    report_date = datetime.now()
+    timestamp = report_date.strftime("%Y%m%d_%H%M%S")
+    filepath = os.path.join(directory, f"soil_report_{timestamp}.pdf")
+    doc = SimpleDocTemplate(filepath, **pdf_report.PAGE_OPTIONS)
+    doc.build(pdf_report.build_story(result, timestamp, report_date, pdf_report.build_styles()))
+    with open(filepath, 'rb') as f:
+        return f.read()
+
+
+def render_in_memory(result):
+    return pdf_report.render_pdf(result)
+
+
+def measure(render, seconds):
+    count, size = 0, 0
+    start = time.perf_counter()
+    while time.perf_counter() - start < seconds:
+        size = len(render())
+        count += 1
+    elapsed = time.perf_counter() - start
+    return {'pdfs_per_second': count / elapsed, 'bytes': size}
+
+
+def run(seconds=3.0):
+    result = sample_result()
+    with tempfile.TemporaryDirectory() as directory:
+        render_to_disk(result, directory)
+        render_in_memory(result)
+        before = measure(lambda: render_to_disk(result, directory), seconds)
+    after = measure(lambda: render_in_memory(result), seconds)
+    return {'before': before, 'after': after,
+            'speedup': after['pdfs_per_second'] / before['pdfs_per_second']}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--seconds', type=float, default=3.0, help='time spent on each variant')
+    args = parser.parse_args()
+
+    results = run(args.seconds)
+    for name in ('before', 'after'):
+        print(f"{name:>6}: {results[name]['pdfs_per_second']:8.1f} PDFs/s  ({results[name]['bytes']} bytes)")
+    print(f"speedup: {results['speedup']:.2f}x")
+
+
+if __name__ == '__main__':
+    main()
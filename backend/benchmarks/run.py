@@ -0,0 +1,178 @@
+"""Offline benchmark suite with a JSON baseline for regression checks.
+
+Everything runs in-process against mongomock, so no network or MongoDB
+server is needed. Absolute numbers depend on the machine (and mongomock has
+no real indexes); compare baselines taken on the same box.
+
+Run from the backend directory:
+    pip install -r benchmarks/requirements.txt
+    python -m benchmarks.run                       # writes benchmarks/baseline.json
+    python -m benchmarks.run --compare benchmarks/baseline.json   # writes latest.json
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import sys
+import time
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+
+import report_store
+import suitability_engine
+from benchmarks import login, pdf_render
+from benchmarks.common import auth_headers, latency_summary, offline_app, timed
+
+BASELINE_PATH = os.path.join(os.path.dirname(__file__), 'baseline.json')
+LATEST_PATH = os.path.join(os.path.dirname(__file__), 'latest.json')
+REPORT_COUNTS = (10, 1000, 100000)
+
+
+def random_soil_data(rng):
+    return {
+        'LL': rng.randint(20, 75), 'PL': rng.randint(10, 30), 'PI': rng.randint(2, 40),
+        'G': rng.randint(0, 50), 'CS': rng.randint(0, 30), 'MS': rng.randint(0, 20), 'FS': rng.randint(0, 20),
+        'F': rng.randint(2, 90), 'OMC%': rng.randint(10, 22),
+        'MDD (kN/m3)': round(rng.uniform(15, 20), 1), 'NMC (%)': rng.randint(8, 28)
+    }
+
+
+def bench_analyze(backend, headers, requests):
+    client = backend.app.test_client()
+    rng = random.Random(1)
+    samples = [random_soil_data(rng) for _ in range(requests)]
+    it = iter(samples)
+
+    latencies = timed(lambda: client.post('/api/analyze-suitability', json={'soil_data': next(it)}, headers=headers),
+                      requests)
+    single = {'requests_per_second': round(requests / sum(latencies), 1), **latency_summary(latencies)}
+
+    start = time.perf_counter()
+    client.post('/api/analyze-suitability/batch', json={'soil_data': samples}, headers=headers)
+    batch = {'samples_per_second': round(requests / (time.perf_counter() - start), 1)}
+    return single, batch
+
+
+def bench_generate_report(backend, headers, seconds):
+    client = backend.app.test_client()
+    result = pdf_render.sample_result()
+    count, size = 0, 0
+    start = time.perf_counter()
+    while time.perf_counter() - start < seconds:
+        size = len(client.post('/api/generate-report', json={'result': result}, headers=headers).data)
+        count += 1
+    return {'pdfs_per_second': round(count / (time.perf_counter() - start), 1), 'bytes': size}
+
+
+def seed_reports(backend, user_id, count):
+    """Insert `count` synthetic reports for user_id directly into the collection."""
+    rng = random.Random(count)
+    user = SimpleNamespace(user_id=user_id, email='bench@example.com', org_id=None)
+    backend.reports_collection.delete_many({'user_id': user_id})
+    start = datetime(2024, 1, 1)
+    for offset in range(0, count, 5000):
+        chunk = [backend.extract_parameters(random_soil_data(rng)) for _ in range(min(5000, count - offset))]
+        backend.reports_collection.insert_many([
+            report_store.new_report(user, outcome, parameters, start + timedelta(minutes=offset + i))
+            for i, (outcome, parameters) in enumerate(zip(suitability_engine.evaluate_codes_many(chunk), chunk))])
+
+
+def bench_my_reports(backend, counts):
+    client = backend.app.test_client()
+    results = {}
+    for count in counts:
+        email = f'reports-{count}@example.com'
+        headers = auth_headers(email)
+        user_id = str(backend.users_collection.find_one({'email': email})['_id'])
+        seed_reports(backend, user_id, count)
+        # mongomock scans without indexes, so keep iterations low for big sets
+        iterations = 50 if count <= 1000 else 3
+        results[str(count)] = latency_summary(timed(lambda: client.get('/api/my-reports', headers=headers), iterations))
+    return results
+
+
+def run(quick=False):
+    backend = offline_app()
+    headers = auth_headers()
+
+    analyze, analyze_batch = bench_analyze(backend, headers, 200 if quick else 1000)
+    return {
+        'meta': {
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'created_at': datetime.utcnow().isoformat(),
+            'quick': quick
+        },
+        'analyze_suitability': analyze,
+        'analyze_suitability_batch': analyze_batch,
+        'generate_report': bench_generate_report(backend, headers, 1 if quick else 3),
+        'my_reports': bench_my_reports(backend, REPORT_COUNTS[:2] if quick else REPORT_COUNTS),
+        'login': login.run(rounds=(backend.app.config['BCRYPT_LOG_ROUNDS'],),
+                           logins=10 if quick else 40, concurrency=4)[0]
+    }
+
+
+def _flatten(results, prefix=''):
+    for key, value in results.items():
+        if key == 'meta':
+            continue
+        if isinstance(value, dict):
+            yield from _flatten(value, f'{prefix}{key}.')
+        else:
+            yield f'{prefix}{key}', value
+
+
+def compare(baseline, current, tolerance):
+    """Return (metric, baseline, current) for metrics that got worse by more than tolerance."""
+    base = dict(_flatten(baseline))
+    regressions = []
+    for metric, value in _flatten(current):
+        before = base.get(metric)
+        if not before or not isinstance(value, (int, float)):
+            continue
+        if metric.endswith('_per_second'):
+            worse = value < before * (1 - tolerance)
+        elif metric.endswith('_ms'):
+            worse = value > before * (1 + tolerance)
+        else:
+            continue
+        if worse:
+            regressions.append((metric, before, value))
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--output', help='where to write the results JSON '
+                        '(default baseline.json, or latest.json with --compare)')
+    parser.add_argument('--compare', help='baseline JSON to check the results against')
+    parser.add_argument('--tolerance', type=float, default=0.25, help='allowed relative slowdown (default 0.25)')
+    parser.add_argument('--quick', action='store_true', help='smaller workloads, skips the 100k report set')
+    args = parser.parse_args()
+
+    baseline = None
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+
+    results = run(args.quick)
+    for metric, value in _flatten(results):
+        print(f'{metric:45} {value}')
+
+    output = args.output or (LATEST_PATH if baseline else BASELINE_PATH)
+    with open(output, 'w') as f:
+        json.dump(results, f, indent=2)
+    print(f'\nResults written to {output}')
+
+    if baseline:
+        regressions = compare(baseline, results, args.tolerance)
+        for metric, before, after in regressions:
+            print(f'REGRESSION {metric}: {before} -> {after}')
+        if regressions:
+            sys.exit(1)
+        print('No regressions beyond tolerance')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,50 @@
+"""Import-to-first-request time for the Flask app.
+
+Each run starts a fresh interpreter, imports app, and serves /api/health
+through the test client, so the figures include every import-time cost a
+newly forked or autoscaled worker pays before it can answer a request.
+
+Run from the backend directory:
+    python -m benchmarks.startup --runs 10
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+PROBE = """
+import json, time
+start = time.perf_counter()
+import app
+imported = time.perf_counter()
+app.app.test_client().get('/api/health')
+served = time.perf_counter()
+print(json.dumps({'import_ms': (imported - start) * 1000, 'first_request_ms': (served - start) * 1000}))
+"""
+
+
+def run(runs=10):
+    backend = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    samples = []
+    for _ in range(runs):
+        output = subprocess.run([sys.executable, '-c', PROBE], cwd=backend,
+                                capture_output=True, text=True, check=True).stdout
+        samples.append(json.loads(output.strip().splitlines()[-1]))
+    return {key: round(statistics.median(s[key] for s in samples), 1)
+            for key in ('import_ms', 'first_request_ms')}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--runs', type=int, default=10, help='fresh interpreters to start')
+    args = parser.parse_args()
+
+    results = run(args.runs)
+    print(f"import:        {results['import_ms']:7.1f} ms (median)")
+    print(f"first request: {results['first_request_ms']:7.1f} ms (median)")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,77 @@
+"""Response compression and conditional-GET helpers.
+
+JSON (and other text) responses are compressed with brotli when the client
+accepts it and the optional `brotli` package is installed, otherwise gzip.
+GET views compute cheap ETags and answer If-None-Match with 304 before doing
+the expensive part of the request.
+"""
+import gzip
+import hashlib
+import json
+import os
+
+from flask import current_app, request
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+COMPRESS_MIN_SIZE = int(os.getenv('COMPRESS_MIN_SIZE', 1024))
+COMPRESSIBLE_TYPES = {'application/json', 'text/plain', 'text/csv', 'application/x-ndjson'}
+
+
+def _encoding():
+    accepted = request.accept_encodings
+    if brotli is not None and accepted['br']:
+        return 'br'
+    if accepted['gzip']:
+        return 'gzip'
+    return None
+
+
+def compress_response(response):
+    if (response.status_code < 200 or response.status_code >= 300 or response.status_code == 204
+            or response.direct_passthrough or response.is_streamed
+            or 'Content-Encoding' in response.headers
+            or response.mimetype not in COMPRESSIBLE_TYPES):
+        return response
+
+    response.vary.add('Accept-Encoding')
+    data = response.get_data()
+    encoding = _encoding()
+    if encoding is None or len(data) < COMPRESS_MIN_SIZE:
+        return response
+
+    if encoding == 'br':
+        response.set_data(brotli.compress(data, quality=5))
+    else:
+        response.set_data(gzip.compress(data, compresslevel=6))
+    response.headers['Content-Encoding'] = encoding
+    return response
+
+
+def init_app(app):
+    app.after_request(compress_response)
+
+
+def weak_etag(*parts):
+    """A weak ETag value derived from the given JSON-serializable parts."""
+    digest = hashlib.sha1(json.dumps(parts, default=str, sort_keys=True).encode()).hexdigest()
+    return digest[:20]
+
+
+def not_modified(etag, weak=True):
+    """Return a 304 response if the request's If-None-Match covers this ETag, else None."""
+    matched = request.if_none_match.contains_weak(etag) if weak else request.if_none_match.contains(etag)
+    if not matched:
+        return None
+    response = current_app.response_class(status=304)
+    return with_etag(response, etag, weak)
+
+
+def with_etag(response, etag, weak=True):
+    """Attach the ETag and make clients revalidate before reusing the response."""
+    response.set_etag(etag, weak=weak)
+    response.headers['Cache-Control'] = 'private, no-cache'
+    return response
@@ -0,0 +1,130 @@
+"""Streaming readers for laboratory result sheets (.xlsx and .csv).
+
+Rows are read lazily - openpyxl in read-only mode for workbooks, the csv
+module for text files - so an upload is never loaded into memory at once.
+"""
+import csv
+import io
+import re
+import zipfile
+
+from openpyxl import load_workbook
+from openpyxl.utils.exceptions import InvalidFileException
+
+# Normalized column header -> soil_data key
+COLUMN_ALIASES = {
+    'll': 'LL', 'liquid limit': 'LL',
+    'pl': 'PL', 'plastic limit': 'PL',
+    'pi': 'PI', 'plasticity index': 'PI',
+    'g': 'G', 'gravel': 'G',
+    'cs': 'CS', 'coarse sand': 'CS',
+    'ms': 'MS', 'medium sand': 'MS',
+    'fs': 'FS', 'fine sand': 'FS',
+    'f': 'F', 'fines': 'F',
+    'omc%': 'OMC%', 'omc (%)': 'OMC%', 'omc': 'OMC%',
+    'mdd (kn/m3)': 'MDD (kN/m3)', 'mdd': 'MDD (kN/m3)',
+    'nmc (%)': 'NMC (%)', 'nmc%': 'NMC (%)', 'nmc': 'NMC (%)',
+}
+
+REQUIRED_KEYS = ('LL', 'PI', 'OMC%', 'MDD (kN/m3)', 'NMC (%)')
+
+
+class SheetError(ValueError):
+    """The upload cannot be read as a lab sheet at all."""
+
+
+def _normalize_header(value):
+    return re.sub(r'\s+', ' ', str(value or '')).strip().lower()
+
+
+def _iter_xlsx(stream):
+    try:
+        workbook = load_workbook(stream, read_only=True, data_only=True)
+    except (InvalidFileException, zipfile.BadZipFile, KeyError) as e:
+        raise SheetError(f'Could not open workbook: {e}')
+    try:
+        yield from workbook.active.iter_rows(values_only=True)
+    finally:
+        workbook.close()
+
+
+def _iter_csv(stream):
+    text = io.TextIOWrapper(stream, encoding='utf-8-sig', newline='')
+    try:
+        yield from csv.reader(text)
+    except (UnicodeDecodeError, csv.Error) as e:
+        raise SheetError(f'Could not read CSV: {e}')
+    finally:
+        text.detach()
+
+
+def _map_header(header):
+    if not header:
+        raise SheetError('Sheet is empty')
+    columns = {}
+    for index, title in enumerate(header):
+        key = COLUMN_ALIASES.get(_normalize_header(title))
+        if key and key not in columns.values():
+            columns[index] = key
+    missing = [key for key in REQUIRED_KEYS if key not in columns.values()]
+    if missing:
+        raise SheetError(f'Missing required columns: {", ".join(missing)}')
+    return columns
+
+
+def _parse_value(value):
+    if isinstance(value, bool):
+        raise ValueError(value)
+    if isinstance(value, (int, float)):
+        return value
+    number = float(str(value).strip())
+    return int(number) if number.is_integer() and '.' not in str(value) else number
+
+
+def _samples(rows, columns):
+    for row_number, row in enumerate(rows, start=2):
+        cells = {key: row[index] for index, key in columns.items()
+                 if index < len(row) and row[index] not in (None, '')}
+        if not cells:
+            continue
+
+        soil_data, errors = {}, []
+        for key, value in cells.items():
+            try:
+                soil_data[key] = _parse_value(value)
+            except ValueError:
+                errors.append(f'{key} is not a number ({value!r})')
+        errors += [f'{key} is missing' for key in REQUIRED_KEYS if key not in cells]
+
+        if errors:
+            yield row_number, None, '; '.join(errors)
+        else:
+            yield row_number, soil_data, None
+
+
+def read_samples(stream, filename):
+    """Open a lab sheet and return a generator of (row_number, soil_data, error).
+
+    Exactly one of soil_data and error is set for each row. Blank rows are
+    skipped. Raises SheetError if the file or its header row is unusable.
+    """
+    if filename.lower().endswith(('.xlsx', '.xlsm')):
+        rows = _iter_xlsx(stream)
+    elif filename.lower().endswith('.csv'):
+        rows = _iter_csv(stream)
+    else:
+        raise SheetError('Unsupported file type (expected .xlsx or .csv)')
+
+    return _samples(rows, _map_header(next(rows, None)))
+
+
+def chunked(iterable, size):
+    """Yield lists of up to `size` items from an iterable."""
+    chunk = []
+    for item in iterable:
+        chunk.append(item)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
@@ -0,0 +1,187 @@
+"""In-process metrics in the Prometheus text format.
+
+Counters and histograms are kept per worker process and exposed on
+/api/metrics. Request timing comes from Flask hooks (see init_app), named
+phases inside views use `with phase('name'):`, and MongoDB command timings
+come from a pymongo CommandListener.
+"""
+import cProfile
+import os
+import random
+import threading
+import time
+from contextlib import contextmanager
+
+from flask import g, has_request_context, request
+from pymongo import monitoring
+
+LATENCY_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+BYTES_BUCKETS = (2048, 4096, 8192, 16384, 32768, 65536, 131072, 262144)
+
+# Optional sampled profiling: PROFILE_SAMPLE_RATE=0.01 profiles 1% of requests
+PROFILE_SAMPLE_RATE = float(os.getenv('PROFILE_SAMPLE_RATE', 0))
+PROFILE_DIR = os.getenv('PROFILE_DIR', os.path.join(os.path.dirname(__file__), 'profiles'))
+
+
+def _label_text(names, values):
+    if not names:
+        return ''
+    pairs = ','.join('{}="{}"'.format(name, str(value).replace('\\', '\\\\').replace('"', '\\"'))
+                     for name, value in zip(names, values))
+    return '{' + pairs + '}'
+
+
+class Counter:
+    def __init__(self, name, help, labels=()):
+        self.name, self.help, self.labels = name, help, tuple(labels)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *label_values, amount=1):
+        with self._lock:
+            self._values[label_values] = self._values.get(label_values, 0) + amount
+
+    def render(self):
+        lines = [f'# HELP {self.name} {self.help}', f'# TYPE {self.name} counter']
+        with self._lock:
+            for values, total in sorted(self._values.items()):
+                lines.append(f'{self.name}{_label_text(self.labels, values)} {total}')
+        return lines
+
+
+class Histogram:
+    def __init__(self, name, help, labels=(), buckets=LATENCY_BUCKETS):
+        self.name, self.help, self.labels = name, help, tuple(labels)
+        self.buckets = tuple(buckets)
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value, *label_values):
+        with self._lock:
+            series = self._series.setdefault(label_values, [[0] * len(self.buckets), 0, 0.0])
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series[0][i] += 1
+            series[1] += 1
+            series[2] += value
+
+    def render(self):
+        lines = [f'# HELP {self.name} {self.help}', f'# TYPE {self.name} histogram']
+        label_names = self.labels + ('le',)
+        with self._lock:
+            for values, (counts, count, total) in sorted(self._series.items()):
+                for bound, bucket_count in zip(self.buckets, counts):
+                    lines.append(f'{self.name}_bucket{_label_text(label_names, values + (bound,))} {bucket_count}')
+                lines.append(f'{self.name}_bucket{_label_text(label_names, values + ("+Inf",))} {count}')
+                lines.append(f'{self.name}_sum{_label_text(self.labels, values)} {total}')
+                lines.append(f'{self.name}_count{_label_text(self.labels, values)} {count}')
+        return lines
+
+
+class Gauges:
+    """Gauges read from a callback at scrape time: fn() -> {label_values: value}."""
+
+    def __init__(self, name, help, labels, fn):
+        self.name, self.help, self.labels, self.fn = name, help, tuple(labels), fn
+
+    def render(self):
+        lines = [f'# HELP {self.name} {self.help}', f'# TYPE {self.name} gauge']
+        for values, value in sorted(self.fn().items()):
+            lines.append(f'{self.name}{_label_text(self.labels, values)} {value}')
+        return lines
+
+
+REGISTRY = []
+
+
+def register(metric):
+    REGISTRY.append(metric)
+    return metric
+
+
+REQUESTS = register(Counter('http_requests_total', 'HTTP requests by route, method and status',
+                            ('route', 'method', 'status')))
+REQUEST_SECONDS = register(Histogram('http_request_duration_seconds', 'HTTP request latency',
+                                     ('route', 'method')))
+PHASE_SECONDS = register(Histogram('phase_duration_seconds', 'Time spent in named phases of a request',
+                                   ('route', 'phase')))
+MONGO_SECONDS = register(Histogram('mongo_command_duration_seconds', 'MongoDB command latency', ('command',)))
+MONGO_FAILURES = register(Counter('mongo_command_failures_total', 'Failed MongoDB commands', ('command',)))
+PDF_BYTES = register(Histogram('pdf_bytes', 'Size of rendered PDF reports', (), BYTES_BUCKETS))
+PDF_BYTES_TOTAL = register(Counter('pdf_bytes_total', 'Bytes of PDF reports rendered'))
+PROFILED = register(Counter('profiled_requests_total', 'Requests captured by the sampling profiler', ('route',)))
+
+
+def _route():
+    if has_request_context() and request.url_rule is not None:
+        return request.url_rule.rule
+    return 'none'
+
+
+@contextmanager
+def phase(name):
+    """Time a block of work as a named phase of the current request."""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        PHASE_SECONDS.observe(time.perf_counter() - start, _route(), name)
+
+
+def observe_pdf(pdf):
+    PDF_BYTES.observe(len(pdf))
+    PDF_BYTES_TOTAL.inc(amount=len(pdf))
+
+
+def render():
+    lines = []
+    for metric in REGISTRY:
+        lines.extend(metric.render())
+    return '\n'.join(lines) + '\n'
+
+
+class MongoCommandTimer(monitoring.CommandListener):
+    """Feeds MongoDB command timings into the metrics; pass to MongoClient(event_listeners=...)."""
+
+    def started(self, event):
+        pass
+
+    def succeeded(self, event):
+        MONGO_SECONDS.observe(event.duration_micros / 1e6, event.command_name)
+
+    def failed(self, event):
+        MONGO_SECONDS.observe(event.duration_micros / 1e6, event.command_name)
+        MONGO_FAILURES.inc(event.command_name)
+
+
+def init_app(app):
+    """Install request timing and the optional sampling profiler on a Flask app."""
+
+    @app.before_request
+    def start_timer():
+        g.request_start = time.perf_counter()
+        if PROFILE_SAMPLE_RATE and random.random() < PROFILE_SAMPLE_RATE:
+            profiler = cProfile.Profile()
+            try:
+                profiler.enable()
+            except ValueError:
+                # Another request on this process is already being profiled
+                return
+            g.profiler = profiler
+
+    @app.after_request
+    def record_request(response):
+        route = _route()
+        start = g.pop('request_start', None)
+        if start is not None:
+            REQUEST_SECONDS.observe(time.perf_counter() - start, route, request.method)
+        REQUESTS.inc(route, request.method, response.status_code)
+
+        profiler = g.pop('profiler', None)
+        if profiler is not None:
+            profiler.disable()
+            os.makedirs(PROFILE_DIR, exist_ok=True)
+            name = route.strip('/').replace('/', '_').replace('<', '').replace('>', '') or 'root'
+            profiler.dump_stats(os.path.join(PROFILE_DIR, f'{name}-{time.time():.6f}.prof'))
+            PROFILED.inc(route)
+        return response
@@ -0,0 +1,106 @@
+"""Site locations on reports and nearest-sample lookups.
+
+Submissions may carry a location, stored on the report as a GeoJSON point.
+Reports are indexed per scope with compound (user_id / org_id, 2dsphere)
+indexes; 2dsphere indexes skip documents without a location, so untagged
+reports cost nothing. A lookup is a single $geoNear aggregation that walks
+the index outward from the site and, in the same pass, returns the nearest
+samples and counts by classification. The walk stops after the nearest
+NEARBY_COUNT_LIMIT samples, so a dense area costs no more than that; when it
+is reached the counts cover only those samples and are flagged approximate.
+"""
+import math
+import os
+
+from pymongo import ASCENDING, GEOSPHERE
+
+NEARBY_RADIUS = float(os.getenv('NEARBY_RADIUS', 1000))
+MAX_NEARBY_RADIUS = float(os.getenv('MAX_NEARBY_RADIUS', 50000))
+NEARBY_LIMIT = 20
+MAX_NEARBY_LIMIT = 100
+NEARBY_COUNT_LIMIT = int(os.getenv('NEARBY_COUNT_LIMIT', 5000))
+
+SAMPLE_FIELDS = ('classification', 'suitability', 'behavior', 'risks', 'recommendations',
+                 'parameters', 'location', 'created_at', 'catalog', 'distance_m')
+
+
+class LocationError(ValueError):
+    """A latitude/longitude is missing or out of range."""
+
+
+def point(lat, lon):
+    """GeoJSON point for a latitude/longitude pair in degrees."""
+    try:
+        lat, lon = float(lat), float(lon)
+    except (TypeError, ValueError):
+        raise LocationError('lat and lon must be numbers')
+    if not (math.isfinite(lat) and -90 <= lat <= 90 and math.isfinite(lon) and -180 <= lon <= 180):
+        raise LocationError('lat must be within -90..90 and lon within -180..180')
+    # GeoJSON order is longitude, latitude
+    return {'type': 'Point', 'coordinates': [lon, lat]}
+
+
+def parse_location(value):
+    """GeoJSON point from an optional {"lat": .., "lon": ..} object, or None."""
+    if value is None:
+        return None
+    if not isinstance(value, dict):
+        raise LocationError('location must be an object with lat and lon')
+    return point(value.get('lat'), value.get('lon'))
+
+
+def lat_lon(location):
+    lon, lat = location['coordinates']
+    return {'lat': lat, 'lon': lon}
+
+
+def ensure_indexes(reports_collection):
+    reports_collection.create_index([('user_id', ASCENDING), ('location', GEOSPHERE)])
+    reports_collection.create_index([('org_id', ASCENDING), ('location', GEOSPHERE)],
+                                    partialFilterExpression={'org_id': {'$exists': True}})
+
+
+def pipeline(center, radius, scope_filter, limit):
+    """$geoNear aggregation: nearest `limit` samples plus per-classification counts.
+
+    Counts cover at most the nearest NEARBY_COUNT_LIMIT samples within radius.
+    """
+    classification = {'$arrayElemAt': [{'$split': ['$classification', ' - ']}, 0]}
+    return [
+        {'$geoNear': {
+            'near': center,
+            'key': 'location',
+            'distanceField': 'distance_m',
+            'maxDistance': radius,
+            'spherical': True,
+            'query': scope_filter
+        }},
+        {'$limit': NEARBY_COUNT_LIMIT},
+        {'$project': {field: 1 for field in SAMPLE_FIELDS}},
+        {'$facet': {
+            'samples': [
+                {'$limit': limit}
+            ],
+            'by_classification': [
+                {'$group': {
+                    '_id': {'classification': classification, 'suitability': '$suitability'},
+                    'count': {'$sum': 1},
+                    'nearest_m': {'$min': '$distance_m'}
+                }},
+                {'$group': {
+                    '_id': '$_id.classification',
+                    'count': {'$sum': '$count'},
+                    'nearest_m': {'$min': '$nearest_m'},
+                    'suitability': {'$push': {'k': '$_id.suitability', 'v': '$count'}}
+                }},
+                {'$project': {
+                    '_id': 0,
+                    'classification': '$_id',
+                    'count': 1,
+                    'nearest_m': {'$round': ['$nearest_m', 1]},
+                    'suitability': {'$arrayToObject': '$suitability'}
+                }},
+                {'$sort': {'count': -1, 'nearest_m': 1}}
+            ]
+        }}
+    ]
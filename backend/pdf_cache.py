@@ -0,0 +1,127 @@
+"""Content-addressed cache of rendered report PDFs, shared by all workers.
+
+Entries live in the `pdf_cache` collection keyed by a hash of everything the
+PDF depends on: the report's text and parameters, its id and date, and
+pdf_report.TEMPLATE_VERSION. A changed report or template simply misses.
+PDFs are a few tens of KB, well inside a single document (report_jobs stores
+them the same way), so a hit is one find_one_and_update that also refreshes
+the entry's last_used time. The cache's size is kept in a counter document
+that every new entry $inc's, so a put costs two small writes however big
+the cache is. Only when the counter passes PDF_CACHE_MAX_BYTES are the least
+recently used entries removed, until the cache is back under
+PDF_CACHE_LOW_WATER of the limit; that pass also re-measures the cache and
+corrects any drift in the counter.
+"""
+import hashlib
+import json
+import os
+import threading
+from datetime import datetime
+
+from pymongo import ASCENDING, ReturnDocument
+
+PDF_CACHE_MAX_BYTES = int(os.getenv('PDF_CACHE_MAX_BYTES', 256 * 1024 * 1024))
+PDF_CACHE_LOW_WATER = 0.9
+# _id of the running byte total; entry keys are hex digests, so never clash
+TOTAL_ID = 'total'
+ENTRIES = {'size': {'$exists': True}}
+
+# Report fields that end up in the PDF
+PDF_FIELDS = ('classification', 'behavior', 'suitability', 'suitability_text', 'risks',
+              'recommendations', 'parameters')
+
+
+def cache_key(report, report_id, report_date, template_version):
+    """Hash of the report content, id, date and template version."""
+    content = {field: report.get(field) for field in PDF_FIELDS}
+    payload = json.dumps([template_version, report_id, report_date.isoformat(), content],
+                         sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+class PdfCache:
+    def __init__(self, collection, max_bytes=PDF_CACHE_MAX_BYTES):
+        self.collection = collection
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._evicting = threading.Lock()
+
+    def _count(self, hit):
+        with self._lock:
+            if hit:
+                self.hits += 1
+            else:
+                self.misses += 1
+
+    def get(self, key):
+        """The cached PDF bytes for key, or None."""
+        entry = self.collection.find_one_and_update(
+            {'_id': key}, {'$set': {'last_used': datetime.utcnow()}},
+            projection={'pdf': 1}, return_document=ReturnDocument.AFTER)
+        self._count(entry is not None)
+        return bytes(entry['pdf']) if entry else None
+
+    def get_many(self, keys):
+        """{key: PDF bytes} for the keys that are cached, in one query."""
+        found = {entry['_id']: bytes(entry['pdf'])
+                 for entry in self.collection.find({'_id': {'$in': list(keys)}}, {'pdf': 1})}
+        if found:
+            self.collection.update_many({'_id': {'$in': list(found)}}, {'$set': {'last_used': datetime.utcnow()}})
+        with self._lock:
+            self.hits += len(found)
+            self.misses += len(set(keys)) - len(found)
+        return found
+
+    def put(self, key, pdf):
+        result = self.collection.update_one({'_id': key}, {
+            '$setOnInsert': {'pdf': pdf, 'size': len(pdf)},
+            '$set': {'last_used': datetime.utcnow()}
+        }, upsert=True)
+        if result.upserted_id is None:
+            # Same key, same content: another worker already stored it
+            return
+        total = self.collection.find_one_and_update(
+            {'_id': TOTAL_ID}, {'$inc': {'bytes': len(pdf)}},
+            upsert=True, return_document=ReturnDocument.AFTER)['bytes']
+        if total > self.max_bytes:
+            self.evict()
+
+    def total_bytes(self):
+        """Exact size of all entries; a scan of the collection, so only used when evicting."""
+        totals = list(self.collection.aggregate([{'$match': ENTRIES},
+                                                 {'$group': {'_id': None, 'bytes': {'$sum': '$size'}}}]))
+        return totals[0]['bytes'] if totals else 0
+
+    def evict(self):
+        """Drop least recently used entries once the cache is over its size limit."""
+        # One eviction pass per process at a time; a put that finds one running skips it
+        if not self._evicting.acquire(blocking=False):
+            return 0
+        try:
+            total = self.total_bytes()
+            evicted = []
+            if total > self.max_bytes:
+                target = self.max_bytes * PDF_CACHE_LOW_WATER
+                for entry in self.collection.find(ENTRIES, {'size': 1}).sort('last_used', ASCENDING):
+                    if total <= target:
+                        break
+                    evicted.append(entry['_id'])
+                    total -= entry['size']
+                deleted = self.collection.delete_many({'_id': {'$in': evicted}}).deleted_count
+                if deleted != len(evicted):
+                    # Another worker evicted some of the same entries
+                    total = self.total_bytes()
+            self.collection.update_one({'_id': TOTAL_ID}, {'$set': {'bytes': total}}, upsert=True)
+        finally:
+            self._evicting.release()
+        with self._lock:
+            self.evictions += len(evicted)
+        return len(evicted)
+
+    def stats(self):
+        with self._lock:
+            return {'hits': self.hits, 'misses': self.misses, 'evictions': self.evictions,
+                    'max_bytes': self.max_bytes}
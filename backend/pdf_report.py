@@ -0,0 +1,328 @@
+"""PDF rendering for geotechnical analysis reports.
+
+Paragraph and table styles are built once at import and shared by every
+render; documents are written to an in-memory buffer rather than to disk.
+"""
+from datetime import datetime
+from io import BytesIO
+from types import SimpleNamespace
+
+from reportlab.lib.pagesizes import A4
+from reportlab.lib import colors
+from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
+from reportlab.lib.units import inch
+from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph, Spacer, PageBreak
+from reportlab.lib.enums import TA_CENTER, TA_RIGHT
+
+# Bump whenever the layout changes so cached PDFs (see pdf_cache) are rebuilt
+TEMPLATE_VERSION = 1
+
+PAGE_OPTIONS = dict(pagesize=A4, topMargin=0.6*inch, bottomMargin=0.6*inch, leftMargin=0.8*inch, rightMargin=0.8*inch)
+
+# Box color and background per suitability band
+SUITABILITY_COLORS = {
+    'SUITABLE': ('#2d6a4f', '#d5f4e6'),
+    'MODERATELY': ('#f39c12', '#fef5e7'),
+    'UNSUITABLE': ('#c0392b', '#fadbd8'),
+}
+
+
+def suitability_band(suitability):
+    if suitability == 'SUITABLE':
+        return 'SUITABLE'
+    return 'MODERATELY' if 'MODERATELY' in suitability else 'UNSUITABLE'
+
+
+def build_styles():
+    """Create every paragraph and table style used by the report."""
+    styles = getSampleStyleSheet()
+    body = ParagraphStyle('Body', parent=styles['Normal'],
+        fontSize=9.5, textColor=colors.HexColor('#1a1a1a'),
+        spaceAfter=5, leading=13, leftIndent=0)
+    table_header = ParagraphStyle('H', parent=styles['Normal'], fontSize=9.5, textColor=colors.white, fontName='Helvetica-Bold')
+
+    return SimpleNamespace(
+        # Professional styles
+        title=ParagraphStyle('Title', parent=styles['Heading1'],
+            fontSize=24, textColor=colors.HexColor('#1e3a5f'),
+            spaceAfter=6, alignment=TA_CENTER, fontName='Helvetica-Bold', leading=28),
+        heading=ParagraphStyle('Heading', parent=styles['Heading2'],
+            fontSize=12, textColor=colors.HexColor('#1e3a5f'),
+            spaceAfter=8, spaceBefore=16, fontName='Helvetica-Bold',
+            borderPadding=(5, 0, 5, 0), leftIndent=0),
+        body=body,
+        info=ParagraphStyle('Info', parent=styles['Normal'], fontSize=9, textColor=colors.HexColor('#4a5568')),
+        info_right=ParagraphStyle('Info', parent=styles['Normal'], fontSize=9, textColor=colors.HexColor('#4a5568'), alignment=TA_RIGHT),
+        disclaimer=ParagraphStyle('Disc', parent=styles['Normal'], fontSize=8.5, textColor=colors.HexColor('#c0392b'), leading=11),
+        classification=ParagraphStyle('Class', parent=styles['Normal'], fontSize=10.5,
+            textColor=colors.HexColor('#1a1a1a'), fontName='Helvetica-Bold', leading=14),
+        table_header=table_header,
+        table_header_center=ParagraphStyle('H', parent=table_header, alignment=TA_CENTER),
+        suitability={band: ParagraphStyle('Suit', parent=styles['Normal'], fontSize=12,
+                         textColor=colors.HexColor(color), fontName='Helvetica-Bold', alignment=TA_CENTER)
+                     for band, (color, _) in SUITABILITY_COLORS.items()},
+        suitability_text=ParagraphStyle('SuitText', parent=body, fontSize=9.5, leading=13),
+        risk=ParagraphStyle('Risk', parent=body, textColor=colors.HexColor('#c0392b')),
+        recommendation=ParagraphStyle('Rec', parent=body, textColor=colors.HexColor('#2d6a4f'), leftIndent=15),
+        footer_title=ParagraphStyle('FooterTitle', parent=styles['Normal'], fontSize=9,
+            textColor=colors.HexColor('#1e3a5f'), alignment=TA_CENTER, fontName='Helvetica-Bold'),
+        footer=ParagraphStyle('Footer', parent=styles['Normal'], fontSize=8,
+            textColor=colors.HexColor('#718096'), alignment=TA_CENTER),
+        summary_cell=ParagraphStyle('SummaryCell', parent=styles['Normal'], fontSize=8.5, leading=10.5),
+        summary_suitability={band: ParagraphStyle('SummarySuit', parent=styles['Normal'], fontSize=8.5, leading=10.5,
+                                 textColor=colors.HexColor(color), fontName='Helvetica-Bold')
+                             for band, (color, _) in SUITABILITY_COLORS.items()},
+
+        # Table styles
+        header_table=TableStyle([
+            ('BACKGROUND', (0, 0), (-1, -1), colors.HexColor('#f7fafc')),
+            ('TOPPADDING', (0, 0), (-1, -1), 20),
+            ('BOTTOMPADDING', (0, 0), (-1, -1), 15),
+            ('BOX', (0, 0), (-1, -1), 1, colors.HexColor('#e2e8f0')),
+        ]),
+        info_table=TableStyle([
+            ('TOPPADDING', (0, 0), (-1, -1), 5),
+            ('BOTTOMPADDING', (0, 0), (-1, -1), 5),
+        ]),
+        disclaimer_table=TableStyle([
+            ('BACKGROUND', (0, 0), (-1, -1), colors.HexColor('#fef5e7')),
+            ('BOX', (0, 0), (-1, -1), 1.5, colors.HexColor('#f39c12')),
+            ('LEFTPADDING', (0, 0), (-1, -1), 10),
+            ('RIGHTPADDING', (0, 0), (-1, -1), 10),
+            ('TOPPADDING', (0, 0), (-1, -1), 8),
+            ('BOTTOMPADDING', (0, 0), (-1, -1), 8),
+        ]),
+        class_table=TableStyle([
+            ('BACKGROUND', (0, 0), (-1, -1), colors.HexColor('#edf2f7')),
+            ('BOX', (0, 0), (-1, -1), 1, colors.HexColor('#2c5f8d')),
+            ('LEFTPADDING', (0, 0), (-1, -1), 12),
+            ('TOPPADDING', (0, 0), (-1, -1), 10),
+            ('BOTTOMPADDING', (0, 0), (-1, -1), 10),
+        ]),
+        param_table=TableStyle([
+            ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#1e3a5f')),
+            ('TEXTCOLOR', (0, 0), (-1, 0), colors.white),
+            ('ALIGN', (0, 0), (0, -1), 'LEFT'),
+            ('ALIGN', (1, 0), (-1, -1), 'CENTER'),
+            ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+            ('FONTSIZE', (0, 0), (-1, -1), 9),
+            ('TOPPADDING', (0, 0), (-1, -1), 7),
+            ('BOTTOMPADDING', (0, 0), (-1, -1), 7),
+            ('LEFTPADDING', (0, 0), (-1, -1), 10),
+            ('RIGHTPADDING', (0, 0), (-1, -1), 10),
+            ('BACKGROUND', (0, 1), (-1, -1), colors.white),
+            ('ROWBACKGROUNDS', (0, 1), (-1, -1), [colors.white, colors.HexColor('#f7fafc')]),
+            ('GRID', (0, 0), (-1, -1), 0.5, colors.HexColor('#e2e8f0')),
+            ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
+        ]),
+        suit_table={band: TableStyle([
+                        ('BACKGROUND', (0, 0), (-1, -1), colors.HexColor(background)),
+                        ('BOX', (0, 0), (-1, -1), 1.5, colors.HexColor(color)),
+                        ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
+                        ('LEFTPADDING', (0, 0), (-1, -1), 10),
+                        ('RIGHTPADDING', (0, 0), (-1, -1), 10),
+                        ('TOPPADDING', (0, 0), (-1, -1), 10),
+                        ('BOTTOMPADDING', (0, 0), (-1, -1), 10),
+                    ])
+                    for band, (color, background) in SUITABILITY_COLORS.items()},
+        summary_table=TableStyle([
+            ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#1e3a5f')),
+            ('FONTSIZE', (0, 0), (-1, -1), 8.5),
+            ('TOPPADDING', (0, 0), (-1, -1), 4),
+            ('BOTTOMPADDING', (0, 0), (-1, -1), 4),
+            ('ROWBACKGROUNDS', (0, 1), (-1, -1), [colors.white, colors.HexColor('#f7fafc')]),
+            ('GRID', (0, 0), (-1, -1), 0.5, colors.HexColor('#e2e8f0')),
+            ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
+        ]),
+        footer_table=TableStyle([
+            ('BACKGROUND', (0, 0), (-1, -1), colors.HexColor('#f7fafc')),
+            ('BOX', (0, 0), (-1, -1), 1, colors.HexColor('#e2e8f0')),
+            ('TOPPADDING', (0, 0), (-1, -1), 8),
+            ('BOTTOMPADDING', (0, 0), (-1, -1), 8),
+        ]),
+    )
+
+
+STYLES = build_styles()
+
+
+def build_story(result, report_id, report_date, styles=STYLES):
+    """Return the flowables for one analysis result."""
+    story = []
+
+    # Professional Header
+    header_table = Table([[Paragraph("<b>GEOTECHNICAL ANALYSIS REPORT</b>", styles.title)]], colWidths=[6.7*inch])
+    header_table.setStyle(styles.header_table)
+    story.append(header_table)
+    story.append(Spacer(1, 0.15*inch))
+
+    # Report Info
+    info_table = Table([[
+        Paragraph(f"<b>Report Date:</b> {report_date.strftime('%B %d, %Y')}", styles.info),
+        Paragraph(f"<b>Report ID:</b> {report_id}", styles.info_right)
+    ]], colWidths=[3.35*inch, 3.35*inch])
+    info_table.setStyle(styles.info_table)
+    story.append(info_table)
+    story.append(Spacer(1, 0.2*inch))
+
+    # Disclaimer
+    disclaimer_table = Table([[
+        Paragraph("<b>DISCLAIMER:</b> This report provides preliminary geotechnical analysis for reference purposes. "
+                  "Professional site investigation and licensed engineer review are required before construction.",
+                  styles.disclaimer)
+    ]], colWidths=[6.7*inch])
+    disclaimer_table.setStyle(styles.disclaimer_table)
+    story.append(disclaimer_table)
+    story.append(Spacer(1, 0.25*inch))
+
+    # Section 1: Classification
+    story.append(Paragraph("1. SOIL CLASSIFICATION", styles.heading))
+    class_table = Table([[Paragraph(result.get('classification', 'N/A'), styles.classification)]], colWidths=[6.7*inch])
+    class_table.setStyle(styles.class_table)
+    story.append(class_table)
+    story.append(Spacer(1, 0.18*inch))
+
+    # Section 2: Parameters
+    story.append(Paragraph("2. LABORATORY TEST RESULTS", styles.heading))
+    params = result.get('parameters', {})
+    param_data = [[
+        Paragraph('<b>Parameter</b>', styles.table_header),
+        Paragraph('<b>Value</b>', styles.table_header_center),
+        Paragraph('<b>Unit</b>', styles.table_header_center)
+    ]]
+
+    param_rows = [
+        ['Liquid Limit (LL)', params.get('LL', 'N/A'), '%'],
+        ['Plastic Limit (PL)', params.get('PL', 'N/A'), '%'],
+        ['Plasticity Index (PI)', params.get('PI', 'N/A'), '-'],
+        ['Gravel Content', params.get('Gravel', 'N/A'), '%'],
+        ['Sand Content', params.get('Sand', 'N/A'), '%'],
+        ['Fines Content', params.get('Fines', 'N/A'), '%'],
+        ['Optimum Moisture Content (OMC)', params.get('OMC', 'N/A'), '%'],
+        ['Maximum Dry Density (MDD)', params.get('MDD', 'N/A'), 'kN/m³'],
+        ['Natural Moisture Content (NMC)', params.get('NMC', 'N/A'), '%']
+    ]
+
+    for row in param_rows:
+        param_data.append([str(row[0]), str(row[1]), str(row[2])])
+
+    param_table = Table(param_data, colWidths=[3.8*inch, 1.8*inch, 1.1*inch])
+    param_table.setStyle(styles.param_table)
+    story.append(param_table)
+    story.append(Spacer(1, 0.18*inch))
+
+    # Section 3: Suitability
+    story.append(Paragraph("3. SUITABILITY ASSESSMENT", styles.heading))
+    suitability = result.get('suitability', 'N/A')
+    band = suitability_band(suitability)
+
+    suit_table = Table([[
+        Paragraph(f"<b>{suitability}</b>", styles.suitability[band]),
+        Paragraph(result.get('suitability_text', ''), styles.suitability_text)
+    ]], colWidths=[1.6*inch, 5.1*inch])
+    suit_table.setStyle(styles.suit_table[band])
+    story.append(suit_table)
+    story.append(Spacer(1, 0.18*inch))
+
+    # Section 4: Behavior
+    story.append(Paragraph("4. SOIL BEHAVIOR CHARACTERISTICS", styles.heading))
+    for behavior in result.get('behavior', []):
+        story.append(Paragraph(f"• {behavior}", styles.body))
+    story.append(Spacer(1, 0.18*inch))
+
+    # Section 5: Risks
+    story.append(Paragraph("5. CONSTRUCTION RISKS", styles.heading))
+    for risk in result.get('risks', []):
+        story.append(Paragraph(f"• {risk}", styles.risk))
+    story.append(Spacer(1, 0.18*inch))
+
+    # Section 6: Recommendations
+    story.append(Paragraph("6. ENGINEERING RECOMMENDATIONS", styles.heading))
+    for i, rec in enumerate(result.get('recommendations', []), 1):
+        story.append(Paragraph(f"<b>{i}.</b> {rec}", styles.recommendation))
+    story.append(Spacer(1, 0.25*inch))
+
+    # Professional Footer
+    footer_table = Table([
+        [Paragraph("<b>Geotechnical Analysis Platform</b>", styles.footer_title)],
+        [Paragraph("This report is generated by automated analysis. For construction projects, consult a licensed geotechnical engineer.",
+                   styles.footer)]
+    ], colWidths=[6.7*inch])
+    footer_table.setStyle(styles.footer_table)
+    story.append(footer_table)
+
+    return story
+
+
+def render_pdf(result, report_id=None, report_date=None, styles=STYLES):
+    """Render one analysis result and return the PDF as bytes."""
+    report_date = report_date or datetime.now()
+    report_id = report_id or report_date.strftime("%Y%m%d_%H%M%S")
+
+    buffer = BytesIO()
+    doc = SimpleDocTemplate(buffer, **PAGE_OPTIONS)
+    doc.build(build_story(result, report_id, report_date, styles))
+    return buffer.getvalue()
+
+
+def build_bundle_story(entries, styles=STYLES):
+    """Return the flowables for several results: a summary table, then each report from a new page.
+
+    entries is a sequence of (result, report_id, report_date).
+    """
+    story = []
+
+    header_table = Table([[Paragraph("<b>GEOTECHNICAL ANALYSIS SUMMARY</b>", styles.title)]], colWidths=[6.7*inch])
+    header_table.setStyle(styles.header_table)
+    story.append(header_table)
+    story.append(Spacer(1, 0.15*inch))
+
+    totals = {}
+    for result, _, _ in entries:
+        suitability = result.get('suitability', 'N/A')
+        totals[suitability] = totals.get(suitability, 0) + 1
+    info_table = Table([[
+        Paragraph(f"<b>Generated:</b> {datetime.now().strftime('%B %d, %Y')}", styles.info),
+        Paragraph(f"<b>Samples:</b> {len(entries)} &nbsp; "
+                  + ", ".join(f"{count} {suitability}" for suitability, count in sorted(totals.items())),
+                  styles.info_right)
+    ]], colWidths=[2.2*inch, 4.5*inch])
+    info_table.setStyle(styles.info_table)
+    story.append(info_table)
+    story.append(Spacer(1, 0.2*inch))
+
+    summary_data = [[
+        Paragraph('<b>#</b>', styles.table_header),
+        Paragraph('<b>Report ID</b>', styles.table_header),
+        Paragraph('<b>Date</b>', styles.table_header),
+        Paragraph('<b>Classification</b>', styles.table_header),
+        Paragraph('<b>Suitability</b>', styles.table_header)
+    ]]
+    for i, (result, report_id, report_date) in enumerate(entries, 1):
+        suitability = result.get('suitability', 'N/A')
+        summary_data.append([
+            str(i),
+            Paragraph(str(report_id), styles.summary_cell),
+            report_date.strftime('%Y-%m-%d'),
+            Paragraph(result.get('classification', 'N/A'), styles.summary_cell),
+            Paragraph(suitability, styles.summary_suitability[suitability_band(suitability)])
+        ])
+
+    # The header row repeats on every page of a long summary
+    summary_table = Table(summary_data, colWidths=[0.35*inch, 1.75*inch, 0.8*inch, 2.3*inch, 1.5*inch], repeatRows=1)
+    summary_table.setStyle(styles.summary_table)
+    story.append(summary_table)
+
+    for result, report_id, report_date in entries:
+        story.append(PageBreak())
+        story.extend(build_story(result, report_id, report_date, styles))
+
+    return story
+
+
+def render_bundle_pdf(entries, styles=STYLES):
+    """Render several results into one PDF and return it as bytes."""
+    buffer = BytesIO()
+    doc = SimpleDocTemplate(buffer, **PAGE_OPTIONS)
+    doc.build(build_bundle_story(entries, styles))
+    return buffer.getvalue()
@@ -0,0 +1,145 @@
+"""Bulk re-evaluation of stored reports after the rules change.
+
+Every report records the RULESET_VERSION it was evaluated with. run() walks
+the reports collection in _id order, hands batches that are on an older rule
+set to a process pool, and writes the new outcomes back with unordered bulk
+writes while later batches are still being evaluated. Progress is saved to a
+checkpoint file after every batch that has been written, so an interrupted
+run picks up where it stopped.
+"""
+import json
+import multiprocessing
+import os
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+from bson import ObjectId
+from pymongo import UpdateOne
+
+import suitability_engine
+
+REEVALUATE_BATCH_SIZE = 2000
+REPORT_EVERY_SECONDS = 5
+
+
+def _outcome_fields(outcome):
+    return {
+        'classification': outcome.classification,
+        'behavior': list(outcome.behavior),
+        'suitability': outcome.suitability,
+        'risks': list(outcome.risks),
+        'recommendations': list(outcome.recommendations)
+    }
+
+
+def evaluate_batch(parameters):
+    """Pool worker: outcome fields per parameters dict, None where they are not numeric."""
+    try:
+        return [_outcome_fields(outcome) for outcome in suitability_engine.evaluate_codes_many(parameters)]
+    except (TypeError, ValueError):
+        pass
+    results = []
+    for params in parameters:
+        try:
+            results.append(_outcome_fields(suitability_engine.evaluate_codes(params)))
+        except (TypeError, ValueError):
+            results.append(None)
+    return results
+
+
+def _changed(report, fields):
+    # Legacy reports hold "CH - Clay ..." where compact ones hold "CH"
+    return (report.get('classification', '').split(' - ')[0] != fields['classification']
+            or report.get('suitability') != fields['suitability'])
+
+
+def _load_checkpoint(path):
+    if not path or not os.path.exists(path):
+        return None
+    with open(path) as f:
+        checkpoint = json.load(f)
+    if checkpoint.get('ruleset') != suitability_engine.RULESET_VERSION:
+        return None
+    return checkpoint
+
+
+def _save_checkpoint(path, checkpoint):
+    if not path:
+        return
+    tmp = path + '.tmp'
+    with open(tmp, 'w') as f:
+        json.dump(checkpoint, f)
+    os.replace(tmp, path)
+
+
+def _batches(reports_collection, last_id, batch_size):
+    outdated = {'ruleset': {'$ne': suitability_engine.RULESET_VERSION}}
+    while True:
+        query = dict(outdated, _id={'$gt': last_id}) if last_id is not None else outdated
+        batch = list(reports_collection.find(query, ['parameters', 'classification', 'suitability'])
+                     .sort('_id', 1).limit(batch_size))
+        if not batch:
+            return
+        last_id = batch[-1]['_id']
+        yield batch
+
+
+def run(reports_collection, workers=None, batch_size=REEVALUATE_BATCH_SIZE, checkpoint_path=None, log=print):
+    """Re-evaluate every report not on the current RULESET_VERSION.
+
+    Returns counters: processed, changed (classification or suitability
+    differs), failed (parameters that cannot be evaluated) and seconds.
+    """
+    workers = workers or os.cpu_count() or 1
+    checkpoint = _load_checkpoint(checkpoint_path) or {
+        'ruleset': suitability_engine.RULESET_VERSION, 'last_id': None, 'processed': 0, 'changed': 0, 'failed': 0}
+    if checkpoint['last_id']:
+        log(f"Resuming after {checkpoint['last_id']} ({checkpoint['processed']} reports already done)")
+    last_id = ObjectId(checkpoint['last_id']) if checkpoint['last_id'] else None
+
+    start = last_report = time.perf_counter()
+    processed_here = 0
+
+    def write(batch, results):
+        nonlocal processed_here
+        operations = []
+        for report, fields in zip(batch, results):
+            if fields is None:
+                checkpoint['failed'] += 1
+                continue
+            if _changed(report, fields):
+                checkpoint['changed'] += 1
+            operations.append(UpdateOne({'_id': report['_id']}, {
+                '$set': {**fields, 'ruleset': suitability_engine.RULESET_VERSION,
+                         'catalog': suitability_engine.CATALOG_VERSION},
+                '$unset': {'suitability_text': ''}
+            }))
+        if operations:
+            reports_collection.bulk_write(operations, ordered=False)
+        checkpoint['processed'] += len(batch)
+        checkpoint['last_id'] = str(batch[-1]['_id'])
+        processed_here += len(batch)
+        _save_checkpoint(checkpoint_path, checkpoint)
+
+    # Spawned workers only need the rule tables, not this process's MongoDB client
+    with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context('spawn')) as pool:
+        pending = deque()
+        for batch in _batches(reports_collection, last_id, batch_size):
+            pending.append((batch, pool.submit(evaluate_batch, [r.get('parameters') or {} for r in batch])))
+            # Keep every worker busy while writing results back in _id order
+            while len(pending) > workers * 2 or (pending and pending[0][1].done()):
+                batch, future = pending.popleft()
+                write(batch, future.result())
+
+            now = time.perf_counter()
+            if now - last_report >= REPORT_EVERY_SECONDS:
+                log(f"{checkpoint['processed']} reports, {processed_here / (now - start):.0f}/s")
+                last_report = now
+        while pending:
+            batch, future = pending.popleft()
+            write(batch, future.result())
+
+    seconds = time.perf_counter() - start
+    return {**{key: checkpoint[key] for key in ('processed', 'changed', 'failed')}, 'seconds': round(seconds, 1),
+            'per_second': round(processed_here / seconds, 1) if seconds else 0}
@@ -0,0 +1,66 @@
+"""Several stored reports delivered in one download.
+
+A bundle is either one combined PDF (pdf_report.render_bundle_pdf: a summary
+table of every sample, then each report from a new page, all built with the
+shared styles in a single document) or a ZIP archive holding one PDF per
+report. Combined PDFs are rendered on the report process pool: up to
+BUNDLE_SYNC_LIMIT reports in the request, larger ones as async report jobs.
+The archive is written to the response as each PDF becomes available: cached
+PDFs first, then fresh renders in the order the process pool finishes them.
+A report that fails to render is written as a soil_report_<id>.error.txt
+entry, so the archive stays valid and says which reports are missing. ZIP
+entries carry their sizes in trailing data descriptors, so nothing has to be
+seeked back and rewritten.
+"""
+import hashlib
+import os
+import zipfile
+
+MAX_BUNDLE_REPORTS = int(os.getenv('MAX_BUNDLE_REPORTS', 200))
+# Larger combined PDFs are rendered as async report jobs
+BUNDLE_SYNC_LIMIT = int(os.getenv('BUNDLE_SYNC_LIMIT', 20))
+FORMATS = ('pdf', 'zip')
+
+
+def bundle_key(report_keys):
+    """Cache key of a combined PDF from the pdf_cache keys of its reports, in order."""
+    return hashlib.sha256('\n'.join(['bundle', *report_keys]).encode()).hexdigest()
+
+
+def report_filename(report_id, extension='pdf'):
+    return f"soil_report_{report_id}.{extension}"
+
+
+class _Chunks:
+    """Write-only file object that hands back whatever has been written since the last take()."""
+
+    def __init__(self):
+        self._parts = []
+
+    def write(self, data):
+        self._parts.append(bytes(data))
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def take(self):
+        data = b''.join(self._parts)
+        self._parts = []
+        return data
+
+
+def zip_stream(pdfs):
+    """Yield a ZIP archive piece by piece from (report_id, report_date, pdf, error) as they arrive."""
+    sink = _Chunks()
+    # Stored, not deflated: ReportLab already compresses the page streams
+    with zipfile.ZipFile(sink, 'w', compression=zipfile.ZIP_STORED) as archive:
+        for report_id, report_date, pdf, error in pdfs:
+            date_time = report_date.timetuple()[:6]
+            if error:
+                message = f"The PDF for report {report_id} could not be rendered: {error}\n"
+                archive.writestr(zipfile.ZipInfo(report_filename(report_id, 'error.txt'), date_time), message)
+            else:
+                archive.writestr(zipfile.ZipInfo(report_filename(report_id), date_time), pdf)
+            yield sink.take()
+    yield sink.take()
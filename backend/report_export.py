@@ -0,0 +1,107 @@
+"""Streaming exports of a user's report history (NDJSON, CSV, XLSX).
+
+Each writer takes an iterable of API-shaped reports (see report_store.to_api)
+and yields the file in pieces, so an export never holds more than a cursor
+batch of reports in memory. NDJSON and CSV go out as the rows are read, the
+first row on its own so the download starts at once. An .xlsx file is a zip
+archive that can only be finished after the last row, so openpyxl's
+write-only mode spools the rows to a temporary file and the finished workbook
+is streamed from there.
+"""
+import csv
+import io
+import json
+import tempfile
+
+# Rows per chunk for the text formats
+EXPORT_CHUNK_ROWS = 200
+FILE_CHUNK_SIZE = 64 * 1024
+
+PARAMETER_COLUMNS = ('LL', 'PL', 'PI', 'Gravel', 'Sand', 'Fines', 'OMC', 'MDD', 'NMC')
+COLUMNS = ('report_id', 'created_at', 'classification', 'suitability', 'suitability_text',
+           'behavior', 'risks', 'recommendations', *PARAMETER_COLUMNS, 'lat', 'lon')
+
+
+def _row(report):
+    parameters = report.get('parameters') or {}
+    location = report.get('location') or {}
+    return [
+        str(report['_id']),
+        report['created_at'].isoformat(),
+        report.get('classification'),
+        report.get('suitability'),
+        report.get('suitability_text'),
+        '; '.join(report.get('behavior') or []),
+        '; '.join(report.get('risks') or []),
+        '; '.join(report.get('recommendations') or []),
+        *(parameters.get(name) for name in PARAMETER_COLUMNS),
+        location.get('lat'),
+        location.get('lon')
+    ]
+
+
+def _chunked_text(lines):
+    lines = iter(lines)
+    first = next(lines, None)
+    if first is not None:
+        yield first
+    buffer = []
+    for line in lines:
+        buffer.append(line)
+        if len(buffer) >= EXPORT_CHUNK_ROWS:
+            yield ''.join(buffer)
+            buffer = []
+    if buffer:
+        yield ''.join(buffer)
+
+
+def ndjson(reports):
+    """One JSON object per line."""
+    def lines():
+        for report in reports:
+            report = dict(report, _id=str(report['_id']), created_at=report['created_at'].isoformat())
+            yield json.dumps(report, default=str) + '\n'
+    return _chunked_text(lines())
+
+
+def csv_text(reports):
+    """A header row, then one row per report with list fields joined by '; '."""
+    def lines():
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        writer.writerow(COLUMNS)
+        for report in reports:
+            writer.writerow(_row(report))
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+        yield buffer.getvalue()
+    return _chunked_text(lines())
+
+
+def xlsx(reports):
+    """The CSV layout as a single-sheet workbook."""
+    from openpyxl import Workbook
+
+    workbook = Workbook(write_only=True)
+    sheet = workbook.create_sheet('Reports')
+    sheet.append(COLUMNS)
+    for report in reports:
+        sheet.append(_row(report))
+
+    with tempfile.TemporaryFile() as spool:
+        workbook.save(spool)
+        spool.seek(0)
+        while True:
+            chunk = spool.read(FILE_CHUNK_SIZE)
+            if not chunk:
+                break
+            yield chunk
+
+
+# format -> (writer, mimetype, file extension)
+FORMATS = {
+    'ndjson': (ndjson, 'application/x-ndjson', 'ndjson'),
+    'csv': (csv_text, 'text/csv', 'csv'),
+    'xlsx': (xlsx, 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet', 'xlsx'),
+}
@@ -0,0 +1,186 @@
+"""Background PDF rendering on a process pool.
+
+ReportLab's doc.build is CPU-bound, so async report requests are handed to a
+ProcessPoolExecutor instead of occupying a web worker. The pool is created
+lazily in each process (after gunicorn forks) and admits at most
+REPORT_QUEUE_LIMIT outstanding jobs. Combined bundle PDFs are rendered on
+the same pool (submit_bundle / render_bundle), and ZIP bundles stream their
+PDFs from it with render_unordered, which keeps a bounded window in flight.
+Workers are started with the spawn method (as in reevaluate) so they never
+inherit the web process's Mongo client or locks, and a pool broken by a
+crashed worker is replaced on the next submit.
+"""
+import itertools
+import multiprocessing
+import os
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+REPORT_WORKERS = int(os.getenv('REPORT_WORKERS', 2))
+REPORT_QUEUE_LIMIT = int(os.getenv('REPORT_QUEUE_LIMIT', 32))
+
+
+class QueueFull(Exception):
+    """Raised when the job queue already holds REPORT_QUEUE_LIMIT jobs."""
+
+
+def _render(result, report_id, report_date, submitted_at):
+    # Runs in a pool process; ReportLab is only imported once a job arrives
+    import pdf_report
+    started_at = time.time()
+    pdf = pdf_report.render_pdf(result, report_id, report_date)
+    return pdf, started_at - submitted_at, time.time() - started_at
+
+
+def _render_bundle(entries, submitted_at):
+    import pdf_report
+    started_at = time.time()
+    pdf = pdf_report.render_bundle_pdf(entries)
+    return pdf, started_at - submitted_at, time.time() - started_at
+
+
+class _Timing:
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def add(self, seconds):
+        self.count += 1
+        self.total += seconds
+        self.max = max(self.max, seconds)
+
+    def as_dict(self):
+        return {
+            'avg_ms': round(self.total / self.count * 1000, 1) if self.count else 0,
+            'max_ms': round(self.max * 1000, 1)
+        }
+
+
+class ReportJobQueue:
+    def __init__(self, workers=REPORT_WORKERS, limit=REPORT_QUEUE_LIMIT):
+        self.workers = workers
+        self.limit = limit
+        self._executor = None
+        self._pid = None
+        self._lock = threading.Lock()
+        self.depth = 0
+        self.completed = 0
+        self.failed = 0
+        self.wait = _Timing()
+        self.render = _Timing()
+
+    def _pool(self):
+        # A pool inherited across fork is unusable, so build one per process,
+        # and one whose worker died (OOM kill, segfault) refuses all work
+        if self._executor is None or self._pid != os.getpid() or self._executor._broken:
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.workers, mp_context=multiprocessing.get_context('spawn'))
+            self._pid = os.getpid()
+        return self._executor
+
+    def submit(self, result, report_id, report_date, on_done):
+        """Queue a render. on_done(pdf, error, wait_seconds, render_seconds) runs when it finishes."""
+        self._submit(_render, (result, report_id, report_date), on_done)
+
+    def submit_bundle(self, entries, on_done):
+        """Queue a combined PDF of (result, report_id, report_date) entries; on_done as for submit."""
+        self._submit(_render_bundle, (entries,), on_done)
+
+    def render_bundle(self, entries):
+        """Render a combined PDF on the pool and wait for it; raises QueueFull like submit."""
+        pdf, _, _ = self._submit(_render_bundle, (entries,)).result()
+        return pdf
+
+    def _submit(self, render, args, on_done=None):
+        with self._lock:
+            if self.depth >= self.limit:
+                raise QueueFull()
+            self.depth += 1
+            pool = self._pool()
+
+        submitted_at = time.time()
+        try:
+            future = pool.submit(render, *args, submitted_at)
+        except Exception:
+            with self._lock:
+                self.depth -= 1
+            raise
+
+        def finished(future):
+            self._record(future)
+            if on_done is None:
+                return
+            error = future.exception()
+            if error:
+                on_done(None, error, time.time() - submitted_at, 0)
+            else:
+                pdf, wait_seconds, render_seconds = future.result()
+                on_done(pdf, None, wait_seconds, render_seconds)
+
+        future.add_done_callback(finished)
+        return future
+
+    def _record(self, future):
+        with self._lock:
+            self.depth -= 1
+            if future.cancelled():
+                return
+            if future.exception():
+                self.failed += 1
+            else:
+                _, wait_seconds, render_seconds = future.result()
+                self.completed += 1
+                self.wait.add(wait_seconds)
+                self.render.add(render_seconds)
+
+    def render_unordered(self, jobs):
+        """Render (tag, result, report_id, report_date) jobs, yielding (tag, pdf, error) as each finishes.
+
+        At most two renders per worker are in flight at a time. They count
+        towards queue_depth but are never refused with QueueFull, since the
+        caller is already waiting on them; renders not yet started are
+        cancelled if the caller stops early. A failed render yields its
+        exception as error (and None as pdf) instead of stopping the others,
+        and so does a job that could not be submitted at all.
+        """
+        jobs = iter(jobs)
+        pending = {}
+        try:
+            while True:
+                for tag, result, report_id, report_date in itertools.islice(jobs, self.workers * 2 - len(pending)):
+                    with self._lock:
+                        self.depth += 1
+                        pool = self._pool()
+                    try:
+                        future = pool.submit(_render, result, report_id, report_date, time.time())
+                    except Exception as error:
+                        with self._lock:
+                            self.depth -= 1
+                        yield tag, None, error
+                        continue
+                    future.add_done_callback(self._record)
+                    pending[future] = tag
+                if not pending:
+                    return
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    tag = pending.pop(future)
+                    error = future.exception()
+                    yield tag, None if error else future.result()[0], error
+        finally:
+            for future in pending:
+                future.cancel()
+
+    def stats(self):
+        with self._lock:
+            return {
+                'workers': self.workers,
+                'queue_limit': self.limit,
+                'queue_depth': self.depth,
+                'completed': self.completed,
+                'failed': self.failed,
+                'wait': self.wait.as_dict(),
+                'render': self.render.as_dict()
+            }
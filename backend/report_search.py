@@ -0,0 +1,117 @@
+"""Filtered report search over a declared set of indexed query shapes.
+
+Every search is scoped to one user (user_id) or one organization (org_id)
+and returns reports newest first. Two compound indexes per scope serve all
+supported filters:
+
+- (scope, suitability, created_at, _id) for suitability filters, walked in
+  sort order for each requested suitability;
+- (scope, created_at, _id, classification, suitability, parameters.*) for
+  everything else: the newest-first walk tests classification prefixes and
+  parameter ranges on the index keys and only fetches matching reports.
+
+Queries are always run with an explicit hint, and any filter outside the
+declared set is rejected, so a search can never fall back to a collection
+scan.
+"""
+import re
+from datetime import datetime
+
+from pymongo import ASCENDING, DESCENDING
+
+import suitability_engine
+
+SCOPES = ('user_id', 'org_id')
+SEARCH_PARAMETERS = ('LL', 'PI', 'Fines', 'NMC')
+# Query-string names other than the filters
+CONTROL_ARGS = {'scope', 'limit', 'cursor'}
+FILTER_ARGS = {'suitability', 'classification', 'from', 'to'} | {
+    f'{name}_{bound}' for name in SEARCH_PARAMETERS for bound in ('min', 'max')}
+
+
+class SearchError(ValueError):
+    """The search uses an unsupported filter or an invalid value."""
+
+
+def index_keys(scope):
+    """The (suitability, general) index key patterns for a scope field."""
+    by_suitability = [(scope, ASCENDING), ('suitability', ASCENDING),
+                      ('created_at', DESCENDING), ('_id', DESCENDING)]
+    general = [(scope, ASCENDING), ('created_at', DESCENDING), ('_id', DESCENDING),
+               ('classification', ASCENDING), ('suitability', ASCENDING),
+               *((f'parameters.{name}', ASCENDING) for name in SEARCH_PARAMETERS)]
+    return by_suitability, general
+
+
+def ensure_indexes(reports_collection):
+    for scope in SCOPES:
+        # Organization indexes only hold reports that belong to one
+        options = {} if scope == 'user_id' else {'partialFilterExpression': {scope: {'$exists': True}}}
+        for keys in index_keys(scope):
+            reports_collection.create_index(keys, **options)
+
+
+def _number(name, value):
+    try:
+        return float(value)
+    except ValueError:
+        raise SearchError(f'{name} must be a number')
+
+
+def _date(name, value):
+    try:
+        return datetime.fromisoformat(value)
+    except ValueError:
+        raise SearchError(f'{name} must be an ISO date, e.g. 2024-02-06')
+
+
+def build_query(args, scope, scope_value):
+    """Return (filter, index key pattern) for the search arguments, or raise SearchError."""
+    unknown = set(args) - FILTER_ARGS - CONTROL_ARGS
+    if unknown:
+        raise SearchError(f'Unsupported filters: {", ".join(sorted(unknown))}. '
+                          f'Supported: {", ".join(sorted(FILTER_ARGS))}')
+
+    query = {scope: scope_value}
+    by_suitability, general = index_keys(scope)
+    index = general
+
+    if args.get('suitability'):
+        wanted = [value.strip() for value in args['suitability'].split(',') if value.strip()]
+        invalid = set(wanted) - set(suitability_engine.SUITABILITY_CODES)
+        if invalid:
+            raise SearchError(f'Unknown suitability: {", ".join(sorted(invalid))}')
+        query['suitability'] = {'$in': wanted}
+        index = by_suitability
+
+    if args.get('classification'):
+        # Anchored prefix: matches codes ("CH") and legacy text ("CH - Clay ...")
+        query['classification'] = {'$regex': '^' + re.escape(args['classification'])}
+
+    created_at = {}
+    if args.get('from'):
+        created_at['$gte'] = _date('from', args['from'])
+    if args.get('to'):
+        created_at['$lt'] = _date('to', args['to'])
+    if created_at:
+        query['created_at'] = created_at
+
+    for name in SEARCH_PARAMETERS:
+        bounds = {}
+        if args.get(f'{name}_min'):
+            bounds['$gte'] = _number(f'{name}_min', args[f'{name}_min'])
+        if args.get(f'{name}_max'):
+            bounds['$lte'] = _number(f'{name}_max', args[f'{name}_max'])
+        if bounds:
+            query[f'parameters.{name}'] = bounds
+
+    return query, index
+
+
+def counts(reports_collection, query, index):
+    """Number of matching reports, in total and per suitability."""
+    by_suitability = {group['_id']: group['n'] for group in reports_collection.aggregate([
+        {'$match': query},
+        {'$group': {'_id': '$suitability', 'n': {'$sum': 1}}}
+    ], hint=index)}
+    return {'total': sum(by_suitability.values()), 'suitability': by_suitability}
@@ -0,0 +1,196 @@
+"""Materialized statistics over stored reports.
+
+One rollup document per user ("user:<id>") plus one "global" document hold
+report counts by classification and suitability and, for each parameter, a
+fixed-width histogram with running sum, sum of squares, min and max. Every
+insert updates them with $inc/$min/$max, so reading a dashboard is a single
+document fetch; rebuild() recomputes them from scratch. Each rollup also
+keeps modified_at, the last time its reports changed, which together with
+count makes a cheap validator for a user's report list.
+"""
+import math
+from collections import defaultdict
+from datetime import datetime
+
+from pymongo import UpdateOne
+
+GLOBAL_KEY = 'global'
+
+# Histogram bucket width per stored parameter
+BUCKET_WIDTHS = {
+    'LL': 5, 'PL': 5, 'PI': 2, 'Gravel': 5, 'Sand': 5, 'Fines': 5,
+    'OMC': 1, 'MDD': 0.5, 'NMC': 1
+}
+
+PERCENTILES = (10, 25, 50, 75, 90)
+
+
+def user_key(user_id):
+    return f'user:{user_id}'
+
+
+def classification_code(classification):
+    # "CH - Clay of High Plasticity" -> "CH"
+    return classification.split(' - ')[0]
+
+
+def _bucket(name, value):
+    return str(math.floor(value / BUCKET_WIDTHS[name]))
+
+
+def _is_number(value):
+    return isinstance(value, (int, float)) and not isinstance(value, bool) and math.isfinite(value)
+
+
+def _increments(reports):
+    """Fold reports into {rollup_id: (inc, min, max)} update documents."""
+    updates = defaultdict(lambda: (defaultdict(float), {}, {}))
+    for report in reports:
+        for key in (GLOBAL_KEY, user_key(report['user_id'])):
+            inc, low, high = updates[key]
+            inc['count'] += 1
+            inc[f"classification.{classification_code(report['classification'])}"] += 1
+            inc[f"suitability.{report['suitability']}"] += 1
+            for name, value in report.get('parameters', {}).items():
+                if name not in BUCKET_WIDTHS or not _is_number(value):
+                    continue
+                field = f'parameters.{name}'
+                inc[f'{field}.n'] += 1
+                inc[f'{field}.sum'] += value
+                inc[f'{field}.sumsq'] += value * value
+                inc[f'{field}.hist.{_bucket(name, value)}'] += 1
+                low[f'{field}.min'] = min(low.get(f'{field}.min', value), value)
+                high[f'{field}.max'] = max(high.get(f'{field}.max', value), value)
+    return updates
+
+
+def record(stats_collection, reports):
+    """Add newly inserted reports to the rollups in one bulk write."""
+    operations = []
+    now = datetime.utcnow()
+    for key, (inc, low, high) in _increments(reports).items():
+        update = {'$inc': {field: _whole(value) for field, value in inc.items()},
+                  '$max': {**high, 'modified_at': now}}
+        if low:
+            update['$min'] = low
+        operations.append(UpdateOne({'_id': key}, update, upsert=True))
+    if operations:
+        stats_collection.bulk_write(operations, ordered=False)
+
+
+def _whole(value):
+    return int(value) if float(value).is_integer() else value
+
+
+def _percentile(hist, width, n, fraction):
+    # Linear interpolation inside the bucket holding the target rank
+    target = fraction * n
+    seen = 0
+    for bucket in sorted(hist, key=int):
+        count = hist[bucket]
+        if seen + count >= target:
+            return round((int(bucket) + (target - seen) / count) * width, 3)
+        seen += count
+    return None
+
+
+def summarize(doc):
+    """Turn a rollup document into the /api/stats response shape."""
+    if not doc:
+        return {'count': 0, 'classification': {}, 'suitability': {}, 'parameters': {}}
+
+    parameters = {}
+    for name, stats in doc.get('parameters', {}).items():
+        n = stats.get('n', 0)
+        if not n:
+            continue
+        mean = stats['sum'] / n
+        summary = {
+            'n': n,
+            'mean': round(mean, 3),
+            'std': round(math.sqrt(max(stats['sumsq'] / n - mean * mean, 0)), 3),
+            'min': stats.get('min'),
+            'max': stats.get('max')
+        }
+        for p in PERCENTILES:
+            value = _percentile(stats.get('hist', {}), BUCKET_WIDTHS[name], n, p / 100)
+            if value is not None:
+                # Clamp interpolated values to the observed range
+                value = min(max(value, summary['min']), summary['max'])
+            summary[f'p{p}'] = value
+        parameters[name] = summary
+
+    return {
+        'count': doc.get('count', 0),
+        'classification': doc.get('classification', {}),
+        'suitability': doc.get('suitability', {}),
+        'parameters': parameters
+    }
+
+
+def rebuild(reports_collection, stats_collection):
+    """Recompute every rollup from the reports collection with aggregation pipelines.
+
+    The new rollups are written to a scratch collection and swapped in with a
+    rename, so readers never see a half-built state. Reports inserted while the
+    rebuild runs may be missed; run it while writes are quiet. Every rollup's
+    modified_at is set to now, since a rebuild follows bulk changes to reports.
+    """
+    docs = defaultdict(lambda: {'count': 0, 'classification': {}, 'suitability': {}, 'parameters': {}})
+
+    def add(user_id, fn):
+        fn(docs[GLOBAL_KEY])
+        fn(docs[user_key(user_id)])
+
+    for group in reports_collection.aggregate([
+        {'$group': {
+            '_id': {
+                'user_id': '$user_id',
+                'classification': {'$arrayElemAt': [{'$split': ['$classification', ' - ']}, 0]},
+                'suitability': '$suitability'
+            },
+            'n': {'$sum': 1}
+        }}
+    ], allowDiskUse=True):
+        key, n = group['_id'], group['n']
+
+        def count(doc, key=key, n=n):
+            doc['count'] += n
+            doc['classification'][key['classification']] = doc['classification'].get(key['classification'], 0) + n
+            doc['suitability'][key['suitability']] = doc['suitability'].get(key['suitability'], 0) + n
+        add(key['user_id'], count)
+
+    for name, width in BUCKET_WIDTHS.items():
+        field = f'$parameters.{name}'
+        for group in reports_collection.aggregate([
+            {'$match': {f'parameters.{name}': {'$type': 'number'}}},
+            {'$group': {
+                '_id': {'user_id': '$user_id', 'bucket': {'$floor': {'$divide': [field, width]}}},
+                'n': {'$sum': 1},
+                'sum': {'$sum': field},
+                'sumsq': {'$sum': {'$multiply': [field, field]}},
+                'min': {'$min': field},
+                'max': {'$max': field}
+            }}
+        ], allowDiskUse=True):
+            key = group['_id']
+
+            def histogram(doc, group=group, bucket=str(int(key['bucket']))):
+                stats = doc['parameters'].setdefault(name, {'n': 0, 'sum': 0, 'sumsq': 0, 'hist': {}})
+                stats['n'] += group['n']
+                stats['sum'] += group['sum']
+                stats['sumsq'] += group['sumsq']
+                stats['min'] = min(stats.get('min', group['min']), group['min'])
+                stats['max'] = max(stats.get('max', group['max']), group['max'])
+                stats['hist'][bucket] = stats['hist'].get(bucket, 0) + group['n']
+            add(key['user_id'], histogram)
+
+    scratch = stats_collection.database[stats_collection.name + '_rebuild']
+    scratch.drop()
+    if docs:
+        now = datetime.utcnow()
+        scratch.insert_many([{'_id': key, **doc, 'modified_at': now} for key, doc in docs.items()])
+        scratch.rename(stats_collection.name, dropTarget=True)
+    else:
+        stats_collection.delete_many({})
+    return len(docs)
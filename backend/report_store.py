@@ -0,0 +1,128 @@
+"""Stored report documents.
+
+Reports keep the rule outcome as message codes next to the numeric
+parameters, tagged with the catalog version the codes belong to:
+
+    {'classification': 'CL', 'behavior': ['BEH_MEDIUM_PLASTICITY', ...],
+     'suitability': 'MODERATELY SUITABLE', 'risks': [...],
+     'recommendations': [...], 'parameters': {...}, 'catalog': 1, ...}
+
+to_api() expands them to the text the API has always returned. Reports
+written before this schema have no 'catalog' field and hold the text itself;
+they are returned as they are, and migrate() rewrites them in bulk.
+"""
+import hashlib
+import json
+
+from pymongo import UpdateOne
+
+import suitability_engine
+
+OUTCOME_LISTS = ('behavior', 'risks', 'recommendations')
+MIGRATE_BATCH_SIZE = 1000
+
+
+def new_report(user, outcome, parameters, created_at, location=None):
+    """The document stored for one evaluated sample; location is an optional GeoJSON point."""
+    report = {
+        'user_id': user.user_id,
+        'user_email': user.email,
+        'classification': outcome.classification,
+        'behavior': list(outcome.behavior),
+        'suitability': outcome.suitability,
+        'risks': list(outcome.risks),
+        'recommendations': list(outcome.recommendations),
+        'parameters': parameters,
+        'catalog': suitability_engine.CATALOG_VERSION,
+        'ruleset': suitability_engine.RULESET_VERSION,
+        'created_at': created_at
+    }
+    if user.org_id:
+        report['org_id'] = user.org_id
+    if location:
+        report['location'] = location
+    return report
+
+
+def content_hash(parameters, location=None):
+    """Hash of a sample's parameters and location; equal numbers hash alike whether sent as int or float."""
+    normalized = {key: float(value) if isinstance(value, (int, float)) else value
+                  for key, value in parameters.items()}
+    if location:
+        # The same results from another site are a different sample
+        normalized = [normalized, location['coordinates']]
+    return hashlib.sha256(json.dumps(normalized, sort_keys=True, default=str).encode()).hexdigest()
+
+
+def to_api(report):
+    """Expand a stored report's codes to text in place; projected fields may be missing."""
+    catalog = report.pop('catalog', None)
+    if catalog is None:
+        return report
+
+    def text(code, params=None):
+        return suitability_engine.message(code, params, catalog)
+
+    if 'classification' in report:
+        report['classification'] = text(report['classification'])
+    if 'suitability' in report:
+        report['suitability_text'] = text(report['suitability'])
+    for field in ('behavior', 'recommendations'):
+        if field in report:
+            report[field] = [text(code) for code in report[field]]
+    if 'risks' in report:
+        report['risks'] = [text(code, report.get('parameters')) for code in report['risks']]
+    return report
+
+
+def compact_fields(report):
+    """Codes for a legacy report's text fields, or None if any text is not in the catalog."""
+    lookup = suitability_engine.lookup_code
+    params = report.get('parameters') or {}
+
+    fields = {
+        'classification': lookup(report.get('classification')),
+        # suitability was always stored as its code
+        'suitability': report.get('suitability') if report.get('suitability') in suitability_engine.MESSAGES else None
+    }
+    for field in OUTCOME_LISTS:
+        fields[field] = [lookup(text, params) for text in report.get(field) or []]
+
+    if fields['classification'] is None or fields['suitability'] is None:
+        return None
+    if any(None in fields[field] for field in OUTCOME_LISTS):
+        return None
+    return fields
+
+
+def migrate(reports_collection, batch_size=MIGRATE_BATCH_SIZE):
+    """Rewrite legacy text reports into the compact schema.
+
+    Walks the legacy reports in _id order and writes each batch with one
+    unordered bulk_write. Safe to interrupt and rerun: migrated reports no
+    longer match. Reports with text outside the catalog are left as they are.
+    Returns (migrated, skipped).
+    """
+    legacy = {'catalog': {'$exists': False}}
+    projection = ['classification', 'suitability', 'parameters', *OUTCOME_LISTS]
+    migrated = skipped = 0
+    last_id = None
+
+    while True:
+        query = dict(legacy, _id={'$gt': last_id}) if last_id is not None else legacy
+        batch = list(reports_collection.find(query, projection).sort('_id', 1).limit(batch_size))
+        if not batch:
+            return migrated, skipped
+        last_id = batch[-1]['_id']
+
+        operations = []
+        for report in batch:
+            fields = compact_fields(report)
+            if fields is None:
+                skipped += 1
+                continue
+            fields['catalog'] = suitability_engine.CATALOG_VERSION
+            operations.append(UpdateOne(dict(legacy, _id=report['_id']),
+                                        {'$set': fields, '$unset': {'suitability_text': ''}}))
+        if operations:
+            migrated += reports_collection.bulk_write(operations, ordered=False).modified_count
@@ -0,0 +1,332 @@
+"""Decision-table engine for soil classification and construction suitability.
+
+All thresholds, score deltas and messages used by the analysis endpoints live
+here as data. The same tables are evaluated either one sample at a time
+(memoized on the normalized parameters) or over NumPy arrays for batches.
+"""
+import os
+from collections import namedtuple
+from functools import lru_cache
+from types import SimpleNamespace
+
+import numpy as np
+
+RULE_CACHE_SIZE = int(os.getenv('RULE_CACHE_SIZE', 4096))
+
+# Stored on every report. Bump it with any change to the tables below and run
+# `flask reevaluate-reports` to bring stored reports up to date.
+RULESET_VERSION = 1
+
+# Inputs the rules depend on, in cache-key order. Keys are the names used in
+# the stored 'parameters' block of a report.
+PARAMETER_KEYS = ('LL', 'PI', 'Gravel', 'Sand', 'Fines', 'OMC', 'MDD', 'NMC')
+_FIELDS = ('LL', 'PI', 'G', 'sand', 'F', 'OMC', 'MDD', 'NMC')
+
+# A rule fires when `when(p)` is true; `p` holds either floats or arrays, so
+# conditions must use & and | rather than and/or.
+Rule = namedtuple('Rule', 'when code score', defaults=(0,))
+# First matching rule wins, otherwise the default applies (an if/elif chain).
+Group = namedtuple('Group', 'rules default')
+
+Outcome = namedtuple('Outcome', 'classification behavior suitability risks recommendations score')
+
+# Message catalog. Stored reports keep message codes plus the catalog version
+# they were written with and are expanded to text on read, so reword a message
+# by adding a new version to CATALOGS rather than editing a published one.
+CATALOG_VERSION = 1
+MESSAGES = {
+    # Classification (USCS/IS)
+    'GW/GP': "GW/GP - Well/Poorly graded Gravel",
+    'GM': "GM - Silty Gravel",
+    'GC': "GC - Clayey Gravel",
+    'SW/SP': "SW/SP - Well/Poorly graded Sand",
+    'SM': "SM - Silty Sand",
+    'SC': "SC - Clayey Sand",
+    'ML': "ML - Silt of Low Plasticity",
+    'CL': "CL - Clay of Low Plasticity",
+    'MI': "MI - Silt of Medium Plasticity",
+    'CI': "CI - Clay of Medium Plasticity",
+    'MH': "MH - Silt of High Plasticity",
+    'CH': "CH - Clay of High Plasticity",
+
+    # Behavior
+    'BEH_HIGH_PLASTICITY': "Highly plastic - prone to volume changes with moisture",
+    'BEH_MEDIUM_PLASTICITY': "Medium plasticity - moderate volume change potential",
+    'BEH_LOW_PLASTICITY': "Low plasticity - minimal volume change",
+    'BEH_FINE_GRAINED': "Fine-grained soil - susceptible to moisture sensitivity",
+    'BEH_COARSE_GRAINED': "Coarse-grained soil - good drainage characteristics",
+    'BEH_HIGH_DENSITY': "High density achievable - good compaction potential",
+    'BEH_MODERATE_DENSITY': "Moderate density - adequate compaction",
+
+    # Suitability
+    'SUITABLE': "Suitable for residential/light commercial construction",
+    'MODERATELY SUITABLE': "Moderately suitable - requires soil improvement measures",
+    'UNSUITABLE': "Not suitable without major ground improvement",
+
+    # Risks
+    'RISK_BEARING_MODERATE': "Moderate bearing capacity - may require deeper foundations",
+    'RISK_BEARING_LOW': "Low bearing capacity - deep foundations recommended",
+    'RISK_COMPRESSIBILITY_HIGH': "High compressibility - significant settlement expected",
+    'RISK_COMPRESSIBILITY_MODERATE': "Moderate compressibility - monitor settlement",
+    'RISK_EXPANSIVE_HIGH': "Highly expansive soil - severe swelling/shrinkage risk",
+    'RISK_EXPANSIVE_MODERATE': "Moderately expansive - foundation movement possible",
+    'RISK_MOISTURE': "Moisture content ({NMC}%) deviates from OMC ({OMC}%) - compaction issues",
+    'RISK_DRAINAGE': "Poor drainage - waterlogging risk, drainage system essential",
+    'RISK_NONE': "No major risks identified",
+
+    # Recommendations
+    'REC_DEEP_FOUNDATIONS': "Use deep foundations (piles/piers) to reach stable strata",
+    'REC_MOISTURE_BARRIER': "Provide moisture barrier around foundation perimeter",
+    'REC_DRAINAGE_SYSTEM': "Install proper drainage system to control groundwater",
+    'REC_STABILIZATION': "Consider soil stabilization with lime/cement",
+    'REC_MECHANICAL_COMPACTION': "Improve compaction through mechanical stabilization",
+    'REC_CONSOLIDATION_TESTS': "Conduct consolidation tests for settlement analysis",
+    'REC_PRELOADING': "Consider preloading or ground improvement techniques",
+    'REC_STANDARD_DESIGN': "Proceed with standard foundation design as per IS codes",
+    'REC_COMPACTION_95': "Maintain proper compaction at 95% of MDD",
+    'REC_SITE_DRAINAGE': "Ensure adequate drainage around structures",
+    'REC_CONSULT_ENGINEER': "Consult geotechnical engineer for detailed investigation",
+    'REC_ADDITIONAL_TESTS': "Perform additional tests: triaxial, consolidation, CBR",
+}
+CATALOGS = {1: MESSAGES}
+
+# 1. SOIL CLASSIFICATION (USCS/IS)
+CLASSIFICATION = Group([
+    # Coarse-grained, gravel dominant
+    Rule(lambda p: (p.F < 50) & (p.G > p.sand) & (p.F < 5), 'GW/GP'),
+    Rule(lambda p: (p.F < 50) & (p.G > p.sand) & (p.PI < 4), 'GM'),
+    Rule(lambda p: (p.F < 50) & (p.G > p.sand), 'GC'),
+    # Coarse-grained, sand dominant
+    Rule(lambda p: (p.F < 50) & (p.F < 5), 'SW/SP'),
+    Rule(lambda p: (p.F < 50) & (p.PI < 4), 'SM'),
+    Rule(lambda p: p.F < 50, 'SC'),
+    # Fine-grained
+    Rule(lambda p: (p.LL < 35) & (p.PI < 7), 'ML'),
+    Rule(lambda p: p.LL < 35, 'CL'),
+    Rule(lambda p: (p.LL < 50) & (p.PI < 7), 'MI'),
+    Rule(lambda p: p.LL < 50, 'CI'),
+    Rule(lambda p: p.PI < 7, 'MH'),
+], Rule(None, 'CH'))
+
+# 2. SOIL BEHAVIOR ANALYSIS
+BEHAVIOR = [
+    Group([
+        Rule(lambda p: p.PI > 17, 'BEH_HIGH_PLASTICITY'),
+        Rule(lambda p: p.PI > 7, 'BEH_MEDIUM_PLASTICITY'),
+    ], Rule(None, 'BEH_LOW_PLASTICITY')),
+    Group([
+        Rule(lambda p: p.F > 50, 'BEH_FINE_GRAINED'),
+    ], Rule(None, 'BEH_COARSE_GRAINED')),
+    Group([
+        Rule(lambda p: p.MDD > 18, 'BEH_HIGH_DENSITY'),
+        Rule(lambda p: p.MDD > 16, 'BEH_MODERATE_DENSITY'),
+    ], Rule(None, None)),
+]
+
+# 3. SUITABILITY ASSESSMENT - each group adds its score and at most one risk
+RISKS = [
+    # Bearing capacity
+    Group([
+        Rule(lambda p: (p.PI < 12) & (p.F < 50), None, 3),
+        Rule(lambda p: p.PI < 20, 'RISK_BEARING_MODERATE', 2),
+    ], Rule(None, 'RISK_BEARING_LOW', 0)),
+    # Compressibility
+    Group([
+        Rule(lambda p: (p.LL > 50) | (p.PI > 30), 'RISK_COMPRESSIBILITY_HIGH', -2),
+        Rule(lambda p: (p.LL > 35) | (p.PI > 17), 'RISK_COMPRESSIBILITY_MODERATE', -1),
+    ], Rule(None, None)),
+    # Expansive soil
+    Group([
+        Rule(lambda p: (p.PI > 35) & (p.F > 50), 'RISK_EXPANSIVE_HIGH', -3),
+        Rule(lambda p: (p.PI > 25) & (p.F > 40), 'RISK_EXPANSIVE_MODERATE', -2),
+    ], Rule(None, None)),
+    # Moisture sensitivity
+    Group([
+        Rule(lambda p: abs(p.NMC - p.OMC) > 4, 'RISK_MOISTURE', -1),
+    ], Rule(None, None)),
+    # Drainage
+    Group([
+        Rule(lambda p: (p.F > 50) & (p.PI > 15), 'RISK_DRAINAGE'),
+    ], Rule(None, None)),
+]
+
+SUITABILITY = Group([
+    Rule(lambda p: p.score >= 3, 'SUITABLE'),
+    Rule(lambda p: p.score >= 0, 'MODERATELY SUITABLE'),
+], Rule(None, 'UNSUITABLE'))
+
+# 4. RECOMMENDATIONS - every matching rule applies
+RECOMMENDATIONS = [
+    Rule(lambda p: p.PI > 25, 'REC_DEEP_FOUNDATIONS'),
+    Rule(lambda p: p.PI > 25, 'REC_MOISTURE_BARRIER'),
+    Rule(lambda p: p.F > 50, 'REC_DRAINAGE_SYSTEM'),
+    Rule(lambda p: p.F > 50, 'REC_STABILIZATION'),
+    Rule(lambda p: p.MDD < 16, 'REC_MECHANICAL_COMPACTION'),
+    Rule(lambda p: p.LL > 50, 'REC_CONSOLIDATION_TESTS'),
+    Rule(lambda p: p.LL > 50, 'REC_PRELOADING'),
+]
+SUITABLE_DEFAULT_RECOMMENDATIONS = ('REC_STANDARD_DESIGN', 'REC_COMPACTION_95', 'REC_SITE_DRAINAGE')
+FALLBACK_RECOMMENDATIONS = ('REC_CONSULT_ENGINEER', 'REC_ADDITIONAL_TESTS')
+
+
+def normalize(params):
+    """Return the cache key for a parameters dict: a tuple of floats in PARAMETER_KEYS order."""
+    return tuple(float(params.get(key, 0)) for key in PARAMETER_KEYS)
+
+
+def _first_match(group, p):
+    for rule in group.rules:
+        if rule.when(p):
+            return rule
+    return group.default
+
+
+def _finish_recommendations(codes, suitability):
+    if not codes:
+        if suitability == 'SUITABLE':
+            return SUITABLE_DEFAULT_RECOMMENDATIONS
+        return FALLBACK_RECOMMENDATIONS
+    return tuple(codes)
+
+
+@lru_cache(maxsize=RULE_CACHE_SIZE)
+def _evaluate_key(key):
+    p = SimpleNamespace(**dict(zip(_FIELDS, key)))
+
+    classification = _first_match(CLASSIFICATION, p).code
+    behavior = tuple(code for code in (_first_match(g, p).code for g in BEHAVIOR) if code)
+
+    fired = [_first_match(g, p) for g in RISKS]
+    p.score = sum(rule.score for rule in fired)
+    risks = tuple(rule.code for rule in fired if rule.code) or ('RISK_NONE',)
+    suitability = _first_match(SUITABILITY, p).code
+
+    recommendations = [rule.code for rule in RECOMMENDATIONS if rule.when(p)]
+    return Outcome(classification, behavior, suitability, risks,
+                   _finish_recommendations(recommendations, suitability), p.score)
+
+
+def evaluate_codes(params):
+    """Evaluate the rules for one sample and return an Outcome of message codes (memoized)."""
+    return _evaluate_key(normalize(params))
+
+
+def evaluate_codes_many(samples):
+    """Evaluate the rules over a list of parameter dicts in one vectorized pass."""
+    if not samples:
+        return []
+    columns = np.array([normalize(s) for s in samples], dtype=float).T
+    p = SimpleNamespace(**dict(zip(_FIELDS, columns)))
+    return _evaluate_arrays(p, len(samples))
+
+
+def _select(group, p):
+    # Index of the first matching rule per sample, len(rules) for the default
+    rules = list(group.rules) + [group.default]
+    conditions = [np.broadcast_to(rule.when(p), p.LL.shape) for rule in group.rules]
+    return rules, np.select(conditions, np.arange(len(group.rules)), default=len(group.rules))
+
+
+def _evaluate_arrays(p, n):
+    class_rules, class_idx = _select(CLASSIFICATION, p)
+    behavior = [_select(g, p) for g in BEHAVIOR]
+    risks = [_select(g, p) for g in RISKS]
+
+    p.score = sum(np.array([rule.score for rule in rules])[idx] for rules, idx in risks)
+    suit_rules, suit_idx = _select(SUITABILITY, p)
+    rec_masks = [np.broadcast_to(rule.when(p), (n,)) for rule in RECOMMENDATIONS]
+
+    outcomes = []
+    for i in range(n):
+        suitability = suit_rules[suit_idx[i]].code
+        risk_codes = tuple(code for code in (rules[idx[i]].code for rules, idx in risks) if code)
+        recommendations = [rule.code for rule, mask in zip(RECOMMENDATIONS, rec_masks) if mask[i]]
+        outcomes.append(Outcome(
+            class_rules[class_idx[i]].code,
+            tuple(code for code in (rules[idx[i]].code for rules, idx in behavior) if code),
+            suitability,
+            risk_codes or ('RISK_NONE',),
+            _finish_recommendations(recommendations, suitability),
+            int(p.score[i])
+        ))
+    return outcomes
+
+
+# Codes in the order of the indices returned by evaluate_arrays()
+CLASSIFICATION_CODES = tuple(rule.code for rule in (*CLASSIFICATION.rules, CLASSIFICATION.default))
+SUITABILITY_CODES = tuple(rule.code for rule in (*SUITABILITY.rules, SUITABILITY.default))
+
+
+def evaluate_arrays(columns):
+    """Classification, suitability and score over whole parameter arrays.
+
+    `columns` maps PARAMETER_KEYS to arrays or scalars that broadcast
+    together (missing keys are 0). Returns three arrays of the broadcast
+    shape: indices into CLASSIFICATION_CODES, indices into SUITABILITY_CODES,
+    and scores. Nothing is built per sample, so grids of millions of points
+    stay fast.
+    """
+    arrays = np.broadcast_arrays(*(np.asarray(columns.get(key, 0), dtype=float) for key in PARAMETER_KEYS))
+    p = SimpleNamespace(**dict(zip(_FIELDS, arrays)))
+
+    _, classification = _select(CLASSIFICATION, p)
+    risks = [_select(g, p) for g in RISKS]
+    p.score = sum(np.array([rule.score for rule in rules])[idx] for rules, idx in risks)
+    _, suitability = _select(SUITABILITY, p)
+    return classification, suitability, p.score
+
+
+def message(code, params=None, catalog=CATALOG_VERSION):
+    """Expand a message code to its text, filling in parameter values where needed."""
+    text = CATALOGS[catalog][code]
+    if params is not None and '{' in text:
+        text = text.format(**params)
+    return text
+
+
+def expand(outcome, params, catalog=CATALOG_VERSION):
+    """Turn an Outcome into the result fields returned by the API."""
+    return {
+        'classification': message(outcome.classification, catalog=catalog),
+        'behavior': [message(code, catalog=catalog) for code in outcome.behavior],
+        'suitability': outcome.suitability,
+        'suitability_text': message(outcome.suitability, catalog=catalog),
+        'risks': [message(code, params, catalog) for code in outcome.risks],
+        'recommendations': [message(code, catalog=catalog) for code in outcome.recommendations]
+    }
+
+
+def lookup_code(text, params=None, catalog=CATALOG_VERSION):
+    """Reverse of message(): the code whose text is `text`, or None if no message matches."""
+    messages = CATALOGS[catalog]
+    code = _codes_by_text(catalog).get(text)
+    if code is None and params is not None:
+        # Parameterized messages only match once filled in with this sample's values
+        for candidate, template in messages.items():
+            try:
+                if '{' in template and message(candidate, params, catalog) == text:
+                    return candidate
+            except KeyError:
+                continue
+    return code
+
+
+@lru_cache(maxsize=None)
+def _codes_by_text(catalog):
+    return {text: code for code, text in CATALOGS[catalog].items() if '{' not in text}
+
+
+def evaluate(params):
+    """Evaluate the suitability rules for one parameters dict."""
+    return expand(evaluate_codes(params), params)
+
+
+def evaluate_many(samples):
+    """Vectorized counterpart of evaluate() for a list of parameters dicts."""
+    return [expand(outcome, params) for outcome, params in zip(evaluate_codes_many(samples), samples)]
+
+
+def cache_stats():
+    """Hit/miss counters for the single-sample evaluation cache."""
+    info = _evaluate_key.cache_info()
+    return {'hits': info.hits, 'misses': info.misses, 'size': info.currsize, 'maxsize': info.maxsize}
@@ -0,0 +1,142 @@
+"""What-if sensitivity sweeps around one soil sample.
+
+One or two parameters are varied over a grid while the rest stay at the
+sample's values, and the decision tables are evaluated over the whole grid
+in a single NumPy pass (suitability_engine.evaluate_arrays). The response
+carries the classification and suitability grids, the cells where either
+changes, and for each swept parameter how far it can move before the
+sample's suitability changes.
+
+Grids are sent as strings of hex digits, one string per value of the first
+axis and one digit per value of the second, each digit an index into the
+matching code list. A million-point grid then serializes in milliseconds
+instead of as a million-element nested JSON list.
+"""
+import math
+import os
+
+import numpy as np
+
+import suitability_engine
+
+MAX_SWEEP_POINTS = int(os.getenv('MAX_SWEEP_POINTS', 1000000))
+MAX_SWEEP_AXES = 2
+DEFAULT_STEPS = 101
+# Resolution of the per-parameter margin search
+MARGIN_STEPS = 10001
+
+# Both code lists have at most 16 entries, so one hex digit per cell
+HEX_DIGITS = np.frombuffer(b'0123456789abcdef', dtype=np.uint8)
+
+
+class SweepError(ValueError):
+    """The sweep specification is invalid."""
+
+
+def parse_axes(spec):
+    """[(parameter, values)] from {"PI": {"min": 5, "max": 40, "steps": 101}, ...}."""
+    if not isinstance(spec, dict) or not 1 <= len(spec) <= MAX_SWEEP_AXES:
+        raise SweepError(f'sweep must give ranges for 1 to {MAX_SWEEP_AXES} parameters')
+
+    ranges = []
+    for name, bounds in spec.items():
+        if name not in suitability_engine.PARAMETER_KEYS:
+            raise SweepError(f'Cannot sweep {name}; use one of {", ".join(suitability_engine.PARAMETER_KEYS)}')
+        try:
+            low, high = float(bounds['min']), float(bounds['max'])
+            steps = int(bounds.get('steps', DEFAULT_STEPS))
+        except (KeyError, TypeError, ValueError, AttributeError, OverflowError):
+            raise SweepError(f'{name} needs numeric min, max and steps')
+        if not (math.isfinite(low) and math.isfinite(high)) or high <= low or steps < 2:
+            raise SweepError(f'{name} needs min < max and at least 2 steps')
+        ranges.append((name, low, high, steps))
+
+    # Check the size before allocating anything
+    points = math.prod(steps for *_, steps in ranges)
+    if points > MAX_SWEEP_POINTS:
+        raise SweepError(f'Sweep too large ({points} points, max {MAX_SWEEP_POINTS})')
+    return [(name, np.linspace(low, high, steps)) for name, low, high, steps in ranges]
+
+
+def _columns(parameters):
+    return {key: float(parameters.get(key, 0)) for key in suitability_engine.PARAMETER_KEYS}
+
+
+def hex_rows(grid):
+    """A 1-D grid as one hex string, a 2-D grid as one hex string per row."""
+    digits = HEX_DIGITS[grid]
+    if digits.ndim == 1:
+        return digits.tobytes().decode()
+    return [row.tobytes().decode() for row in digits]
+
+
+def boundaries(grid, axes, codes):
+    """Points midway between neighbouring cells whose codes differ, grouped by (from, to)."""
+    values = [axis_values for _, axis_values in axes]
+    found = {}
+    for axis in range(grid.ndim):
+        before = [slice(None)] * grid.ndim
+        after = [slice(None)] * grid.ndim
+        before[axis], after[axis] = slice(None, -1), slice(1, None)
+        low, high = grid[tuple(before)], grid[tuple(after)]
+
+        cells = np.nonzero(low != high)
+        coordinates = np.stack([
+            (values[d][index] + values[d][index + 1]) / 2 if d == axis else values[d][index]
+            for d, index in enumerate(cells)
+        ], axis=-1)
+        for key, point in zip(zip(low[cells].tolist(), high[cells].tolist()), coordinates.round(6).tolist()):
+            found.setdefault(key, []).append(point)
+
+    return [{'from': codes[a], 'to': codes[b], 'points': points} for (a, b), points in sorted(found.items())]
+
+
+def margins(parameters, axes, suitability):
+    """For each swept parameter, the nearest values in its range that change the suitability."""
+    result = {}
+    for name, values in axes:
+        line = np.linspace(values[0], values[-1], MARGIN_STEPS)
+        columns = _columns(parameters)
+        columns[name] = line
+        _, line_suitability, _ = suitability_engine.evaluate_arrays(columns)
+        changed = line_suitability != suitability_engine.SUITABILITY_CODES.index(suitability)
+
+        base = float(parameters.get(name, 0))
+        below = np.nonzero(changed & (line < base))[0]
+        above = np.nonzero(changed & (line > base))[0]
+        result[name] = {
+            'value': base,
+            'below': _margin(line, line_suitability, below[-1]) if below.size else None,
+            'above': _margin(line, line_suitability, above[0]) if above.size else None
+        }
+    return result
+
+
+def _margin(line, line_suitability, index):
+    return {'value': round(float(line[index]), 6),
+            'suitability': suitability_engine.SUITABILITY_CODES[line_suitability[index]]}
+
+
+def run(parameters, axes):
+    """Evaluate the grid spanned by axes around the parameters of one sample."""
+    base = suitability_engine.evaluate_codes(parameters)
+
+    columns = _columns(parameters)
+    grids = np.meshgrid(*(values for _, values in axes), indexing='ij')
+    for (name, _), grid in zip(axes, grids):
+        columns[name] = grid
+    classification, suitability, _ = suitability_engine.evaluate_arrays(columns)
+
+    return {
+        'base': {'classification': base.classification, 'suitability': base.suitability, 'score': base.score},
+        'axes': [{'parameter': name, 'values': values.round(6).tolist()} for name, values in axes],
+        'classification_codes': list(suitability_engine.CLASSIFICATION_CODES),
+        'suitability_codes': list(suitability_engine.SUITABILITY_CODES),
+        'classification': hex_rows(classification),
+        'suitability': hex_rows(suitability),
+        'boundaries': {
+            'suitability': boundaries(suitability, axes, suitability_engine.SUITABILITY_CODES),
+            'classification': boundaries(classification, axes, suitability_engine.CLASSIFICATION_CODES)
+        },
+        'margins': margins(parameters, axes, base.suitability)
+    }
@@ -0,0 +1,6 @@
+"""Backend tests: rule engine checks and API tests on an in-process mongomock database.
+
+Run from the backend directory:
+    pip install -r tests/requirements.txt
+    python -m pytest tests
+"""
@@ -0,0 +1,35 @@
+import mongomock
+import pytest
+
+import app as backend
+
+SOIL = {'LL': 40, 'PL': 25, 'PI': 12, 'G': 5, 'CS': 10, 'MS': 10, 'FS': 10, 'F': 60,
+        'OMC%': 14, 'MDD (kN/m3)': 17.5, 'NMC (%)': 22}
+
+
+@pytest.fixture
+def client():
+    """Test client on a fresh mongomock database; the first request creates the indexes."""
+    backend.connect(mongomock.MongoClient())
+    backend.token_cache.clear()
+    backend.app.config.update(TESTING=True, BCRYPT_LOG_ROUNDS=4)
+    yield backend.app.test_client()
+    backend._client = None
+
+
+@pytest.fixture
+def auth(client):
+    """Authorization headers for a newly registered user."""
+    client.post('/api/register', json={'name': 'Tester', 'email': 'tester@example.com', 'password': 'secret'})
+    token = client.post('/api/login', json={'email': 'tester@example.com', 'password': 'secret'}).get_json()['token']
+    return {'Authorization': f'Bearer {token}'}
+
+
+def soil(**changes):
+    return {**SOIL, **changes}
+
+
+def analyze(client, auth, soil_data, key=None, **extra):
+    """POST one sample to /api/analyze-suitability, with an Idempotency-Key if given."""
+    headers = {**auth, 'Idempotency-Key': key} if key else auth
+    return client.post('/api/analyze-suitability', json={'soil_data': soil_data, **extra}, headers=headers)
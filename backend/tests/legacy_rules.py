@@ -0,0 +1,148 @@
+"""The suitability rules as originally written in analyze_suitability, kept as a test oracle.
+
+suitability_engine replaced this if/elif chain with decision tables; the
+tests check that both give the same answers. Do not edit these rules to
+match a new engine version: change the engine's RULESET_VERSION instead and
+update the tests deliberately.
+"""
+
+
+def evaluate(LL, PI, G, CS, F, OMC, MDD, NMC):
+    # 1. SOIL CLASSIFICATION (USCS/IS)
+    classification = ""
+    if F < 50:  # Coarse-grained
+        if G > CS:
+            if F < 5:
+                classification = "GW/GP - Well/Poorly graded Gravel"
+            elif PI < 4:
+                classification = "GM - Silty Gravel"
+            else:
+                classification = "GC - Clayey Gravel"
+        else:
+            if F < 5:
+                classification = "SW/SP - Well/Poorly graded Sand"
+            elif PI < 4:
+                classification = "SM - Silty Sand"
+            else:
+                classification = "SC - Clayey Sand"
+    else:  # Fine-grained
+        if LL < 35:
+            if PI < 7:
+                classification = "ML - Silt of Low Plasticity"
+            else:
+                classification = "CL - Clay of Low Plasticity"
+        elif LL < 50:
+            if PI < 7:
+                classification = "MI - Silt of Medium Plasticity"
+            else:
+                classification = "CI - Clay of Medium Plasticity"
+        else:
+            if PI < 7:
+                classification = "MH - Silt of High Plasticity"
+            else:
+                classification = "CH - Clay of High Plasticity"
+
+    # 2. SOIL BEHAVIOR ANALYSIS
+    behavior = []
+    if PI > 17:
+        behavior.append("Highly plastic - prone to volume changes with moisture")
+    elif PI > 7:
+        behavior.append("Medium plasticity - moderate volume change potential")
+    else:
+        behavior.append("Low plasticity - minimal volume change")
+
+    if F > 50:
+        behavior.append("Fine-grained soil - susceptible to moisture sensitivity")
+    else:
+        behavior.append("Coarse-grained soil - good drainage characteristics")
+
+    if MDD > 18:
+        behavior.append("High density achievable - good compaction potential")
+    elif MDD > 16:
+        behavior.append("Moderate density - adequate compaction")
+
+    # 3. SUITABILITY ASSESSMENT
+    suitability_score = 0
+    risks = []
+
+    # Bearing capacity assessment
+    if PI < 12 and F < 50:
+        suitability_score += 3
+    elif PI < 20:
+        suitability_score += 2
+        risks.append("Moderate bearing capacity - may require deeper foundations")
+    else:
+        suitability_score += 0
+        risks.append("Low bearing capacity - deep foundations recommended")
+
+    # Compressibility check
+    if LL > 50 or PI > 30:
+        risks.append("High compressibility - significant settlement expected")
+        suitability_score -= 2
+    elif LL > 35 or PI > 17:
+        risks.append("Moderate compressibility - monitor settlement")
+        suitability_score -= 1
+
+    # Expansive soil check
+    if PI > 35 and F > 50:
+        risks.append("Highly expansive soil - severe swelling/shrinkage risk")
+        suitability_score -= 3
+    elif PI > 25 and F > 40:
+        risks.append("Moderately expansive - foundation movement possible")
+        suitability_score -= 2
+
+    # Moisture sensitivity
+    if abs(NMC - OMC) > 4:
+        risks.append(f"Moisture content ({NMC}%) deviates from OMC ({OMC}%) - compaction issues")
+        suitability_score -= 1
+
+    # Drainage assessment
+    if F > 50 and PI > 15:
+        risks.append("Poor drainage - waterlogging risk, drainage system essential")
+
+    # Final suitability
+    if suitability_score >= 3:
+        suitability = "SUITABLE"
+        suitability_text = "Suitable for residential/light commercial construction"
+    elif suitability_score >= 0:
+        suitability = "MODERATELY SUITABLE"
+        suitability_text = "Moderately suitable - requires soil improvement measures"
+    else:
+        suitability = "UNSUITABLE"
+        suitability_text = "Not suitable without major ground improvement"
+
+    # 4. RECOMMENDATIONS
+    recommendations = []
+
+    if PI > 25:
+        recommendations.append("Use deep foundations (piles/piers) to reach stable strata")
+        recommendations.append("Provide moisture barrier around foundation perimeter")
+
+    if F > 50:
+        recommendations.append("Install proper drainage system to control groundwater")
+        recommendations.append("Consider soil stabilization with lime/cement")
+
+    if MDD < 16:
+        recommendations.append("Improve compaction through mechanical stabilization")
+
+    if LL > 50:
+        recommendations.append("Conduct consolidation tests for settlement analysis")
+        recommendations.append("Consider preloading or ground improvement techniques")
+
+    if suitability == "SUITABLE" and not recommendations:
+        recommendations.append("Proceed with standard foundation design as per IS codes")
+        recommendations.append("Maintain proper compaction at 95% of MDD")
+        recommendations.append("Ensure adequate drainage around structures")
+
+    if not recommendations:
+        recommendations.append("Consult geotechnical engineer for detailed investigation")
+        recommendations.append("Perform additional tests: triaxial, consolidation, CBR")
+
+    return {
+        'classification': classification,
+        'behavior': behavior,
+        'suitability': suitability,
+        'suitability_text': suitability_text,
+        'risks': risks if risks else ['No major risks identified'],
+        'recommendations': recommendations
+    }
@@ -0,0 +1,27 @@
+"""/api/analyze-suitability input validation."""
+from tests.conftest import analyze, soil
+
+
+def test_result_matches_the_rules(client, auth):
+    response = analyze(client, auth, soil())
+    result = response.get_json()
+
+    assert response.status_code == 200
+    assert result['classification'] == 'CI - Clay of Medium Plasticity'
+    assert result['parameters']['LL'] == 40
+    assert result['report_id']
+
+
+def test_invalid_soil_data_is_rejected(client, auth):
+    for soil_data in (['LL', 40], 'LL=40', 40):
+        response = analyze(client, auth, soil_data)
+        assert response.status_code == 400, soil_data
+        assert response.get_json()['error'] == 'soil_data must be an object'
+
+    for sample in (soil(LL='forty'), soil(PI=None), soil(**{'NMC (%)': [22]})):
+        response = analyze(client, auth, sample)
+        assert response.status_code == 400, sample
+        assert response.get_json()['error'] == 'All soil parameters must be numeric'
+
+    assert client.post('/api/analyze-suitability', headers=auth).status_code in (400, 415)
+    assert client.get('/api/my-reports', headers=auth).get_json()['reports'] == []
@@ -0,0 +1,31 @@
+"""Report submission dedupe (content hash, Idempotency-Key) and what the list exposes."""
+from tests.conftest import analyze, soil
+
+
+def test_same_content_returns_stored_report(client, auth):
+    first = analyze(client, auth, soil())
+    again = analyze(client, auth, soil())
+
+    assert first.status_code == again.status_code == 200
+    assert again.get_json()['report_id'] == first.get_json()['report_id']
+    assert again.headers.get('Idempotent-Replayed') == 'true'
+    assert 'Idempotent-Replayed' not in first.headers
+    assert len(client.get('/api/my-reports', headers=auth).get_json()['reports']) == 1
+
+
+def test_idempotency_key_replays_and_rejects_other_content(client, auth):
+    first = analyze(client, auth, soil(), key='retry-1')
+    replay = analyze(client, auth, soil(), key='retry-1')
+    conflict = analyze(client, auth, soil(LL=55), key='retry-1')
+
+    assert replay.get_json()['report_id'] == first.get_json()['report_id']
+    assert conflict.status_code == 422
+
+
+def test_list_hides_internal_fields(client, auth):
+    analyze(client, auth, soil(), key='k', location={'lat': 1.5, 'lon': 2.5})
+    report, = client.get('/api/my-reports', headers=auth).get_json()['reports']
+
+    assert not {'user_id', 'org_id', 'content_hash', 'idempotency_key', 'ruleset', 'catalog'} & set(report)
+    assert report['location'] == {'lat': 1.5, 'lon': 2.5}
+    assert report['classification'] == 'CI - Clay of Medium Plasticity'
@@ -0,0 +1,36 @@
+"""ETags, 304s and response compression."""
+import gzip
+
+from tests.conftest import analyze, soil
+
+
+def test_etag_changes_only_when_reports_change(client, auth):
+    analyze(client, auth, soil())
+    etag = client.get('/api/my-reports', headers=auth).headers['ETag']
+
+    assert client.get('/api/my-reports', headers={**auth, 'If-None-Match': etag}).status_code == 304
+    analyze(client, auth, soil(LL=30))
+    assert client.get('/api/my-reports', headers={**auth, 'If-None-Match': etag}).status_code == 200
+
+
+def test_pdf_etag_is_strong(client, auth):
+    report_id = analyze(client, auth, soil()).get_json()['report_id']
+    first = client.get(f'/api/reports/{report_id}/pdf', headers=auth)
+    etag = first.headers['ETag']
+
+    assert not etag.startswith('W/')
+    assert client.get(f'/api/reports/{report_id}/pdf', headers={**auth, 'If-None-Match': etag}).status_code == 304
+    # A weak validator does not match a strong ETag
+    weak = client.get(f'/api/reports/{report_id}/pdf', headers={**auth, 'If-None-Match': f'W/{etag}'})
+    assert weak.status_code == 200
+
+
+def test_large_json_is_gzipped(client, auth):
+    for ll in range(20, 30):
+        analyze(client, auth, soil(LL=ll))
+    plain = client.get('/api/my-reports', headers=auth)
+    packed = client.get('/api/my-reports', headers={**auth, 'Accept-Encoding': 'gzip'})
+
+    assert 'Content-Encoding' not in plain.headers
+    assert packed.headers['Content-Encoding'] == 'gzip'
+    assert gzip.decompress(packed.data) == plain.data
@@ -0,0 +1,52 @@
+"""Index setup on first database access."""
+import mongomock
+from pymongo.errors import ServerSelectionTimeoutError
+
+import app as backend
+
+
+def report_indexes():
+    return {index['name'] for index in backend.get_db()['reports'].list_indexes()}
+
+
+def test_first_access_creates_indexes():
+    backend.connect(mongomock.MongoClient())
+    try:
+        names = report_indexes()
+        assert 'user_id_1_content_hash_1' in names
+        assert 'user_id_1_idempotency_key_1' in names
+        assert 'created_at_1' in {index['name'] for index in backend.get_db()['report_jobs'].list_indexes()}
+    finally:
+        backend._client = None
+
+
+def test_failed_index_setup_is_retried(monkeypatch):
+    calls = []
+    ensure_indexes = backend.ensure_indexes
+
+    def flaky(db):
+        calls.append(db)
+        if len(calls) == 1:
+            raise ServerSelectionTimeoutError('no servers')
+        ensure_indexes(db)
+
+    monkeypatch.setattr(backend, 'ensure_indexes', flaky)
+    backend.connect(mongomock.MongoClient())
+    try:
+        backend.get_db()
+        assert 'user_id_1_content_hash_1' in report_indexes()
+        backend.get_db()
+        assert len(calls) == 2
+    finally:
+        backend._client = None
+
+
+def test_obsolete_indexes_are_only_dropped_on_request():
+    backend.connect(mongomock.MongoClient())
+    try:
+        reports = backend.get_db()['reports']
+        reports.create_index([('user_id', 1), ('ruleset', 1)])
+        assert backend.drop_obsolete_indexes(backend.get_db()) == ['user_id_1_ruleset_1']
+        assert 'user_id_1_ruleset_1' not in report_indexes()
+    finally:
+        backend._client = None
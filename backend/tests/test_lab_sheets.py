@@ -0,0 +1,87 @@
+"""Lab sheet uploads: header mapping, row errors and /api/upload-lab-sheet."""
+import io
+import re
+
+import pytest
+from openpyxl import Workbook
+
+import lab_sheets
+
+HEADER = 'Sample,Liquid Limit, PI ,Gravel,Fines,OMC (%),mdd,NMC\n'
+
+
+def read(text, filename='results.csv'):
+    return list(lab_sheets.read_samples(io.BytesIO(text.encode()), filename))
+
+
+def test_headers_map_by_alias():
+    rows = read(HEADER + 'S1,40,12,5,60,14,17.5,22\n')
+
+    assert rows == [(2, {'LL': 40, 'PI': 12, 'G': 5, 'F': 60, 'OMC%': 14, 'MDD (kN/m3)': 17.5, 'NMC (%)': 22}, None)]
+
+
+def test_row_errors_name_the_row_and_column():
+    rows = read(HEADER + 'S1,40,12,5,60,14,17.5,22\n'
+                         ',,,,,,,\n'
+                         'S3,forty,12,5,60,14,,22\n'
+                         'S4,40.0,12,5,60,14,17.5,22\n')
+
+    assert [row_number for row_number, _, _ in rows] == [2, 4, 5]
+    _, soil_data, error = rows[1]
+    assert soil_data is None
+    assert error == "LL is not a number ('forty'); MDD (kN/m3) is missing"
+    # "40.0" stays a float, "40" an int
+    assert rows[2][1]['LL'] == 40.0 and isinstance(rows[2][1]['LL'], float)
+
+
+def test_first_matching_column_wins():
+    rows = read('LL,Liquid Limit,PI,OMC,MDD,NMC\n40,99,12,14,17.5,22\n')
+    assert rows[0][1]['LL'] == 40
+
+
+@pytest.mark.parametrize('text, filename, message', [
+    ('LL,PI,OMC\n40,12,14\n', 'results.csv', 'Missing required columns: MDD (kN/m3), NMC (%)'),
+    ('', 'results.csv', 'Sheet is empty'),
+    (HEADER, 'results.txt', 'Unsupported file type'),
+    ('not a workbook', 'results.xlsx', 'Could not open workbook'),
+])
+def test_unusable_sheets_are_rejected(text, filename, message):
+    with pytest.raises(lab_sheets.SheetError, match=re.escape(message)):
+        read(text, filename)
+
+
+def test_workbook_rows_are_read():
+    workbook = Workbook()
+    sheet = workbook.active
+    sheet.append(['LL', 'PI', 'OMC%', 'MDD (kN/m3)', 'NMC (%)'])
+    sheet.append([40, 12, 14, 17.5, 22])
+    sheet.append([None, None, None, None, None])
+    sheet.append([41, True, 14, 17.5, 22])
+    buffer = io.BytesIO()
+    workbook.save(buffer)
+    buffer.seek(0)
+
+    rows = list(lab_sheets.read_samples(buffer, 'Results.XLSX'))
+    assert rows[0] == (2, {'LL': 40, 'PI': 12, 'OMC%': 14, 'MDD (kN/m3)': 17.5, 'NMC (%)': 22}, None)
+    assert rows[1][0] == 4 and rows[1][2] == 'PI is not a number (True)'
+
+
+def test_upload_saves_good_rows_and_reports_bad_ones(client, auth):
+    sheet = HEADER + 'S1,40,12,5,60,14,17.5,22\nS2,55,30,5,60,14,17.5,22\nS3,x,12,5,60,14,17.5,22\n'
+    response = client.post('/api/upload-lab-sheet', headers=auth, content_type='multipart/form-data',
+                           data={'file': (io.BytesIO(sheet.encode()), 'results.csv')})
+    summary = response.get_json()
+
+    assert response.status_code == 200
+    assert (summary['rows'], summary['inserted'], summary['failed']) == (3, 2, 1)
+    assert summary['errors'] == [{'row': 4, 'error': "LL is not a number ('x')"}]
+    assert sum(summary['suitability_counts'].values()) == 2
+    assert len(client.get('/api/my-reports', headers=auth).get_json()['reports']) == 2
+
+
+def test_upload_rejects_an_unusable_sheet(client, auth):
+    response = client.post('/api/upload-lab-sheet', headers=auth, content_type='multipart/form-data',
+                           data={'file': (io.BytesIO(b'LL,PI\n1,2\n'), 'results.csv')})
+    assert response.status_code == 400
+    assert response.get_json()['error'].startswith('Missing required columns')
+    assert client.post('/api/upload-lab-sheet', headers=auth).status_code == 400
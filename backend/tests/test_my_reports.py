@@ -0,0 +1,27 @@
+"""/api/my-reports keyset paging."""
+from tests.conftest import analyze, soil
+
+
+def test_pages_walk_every_report_once_newest_first(client, auth):
+    for ll in range(20, 27):
+        analyze(client, auth, soil(LL=ll))
+
+    seen, cursor = [], None
+    while True:
+        url = '/api/my-reports?limit=3' + (f'&cursor={cursor}' if cursor else '')
+        page = client.get(url, headers=auth).get_json()
+        assert len(page['reports']) <= 3
+        seen.extend(page['reports'])
+        cursor = page['next']
+        if not cursor:
+            break
+
+    assert [report['parameters']['LL'] for report in seen] == list(range(26, 19, -1))
+    assert len({report['_id'] for report in seen}) == 7
+
+
+def test_page_options_are_validated(client, auth):
+    assert client.get('/api/my-reports?cursor=nonsense', headers=auth).status_code == 400
+    assert client.get('/api/my-reports?limit=x', headers=auth).status_code == 400
+    assert client.get('/api/my-reports?fields=password', headers=auth).status_code == 400
+    assert client.get('/api/my-reports').status_code == 401
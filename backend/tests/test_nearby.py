@@ -0,0 +1,113 @@
+"""Site locations and /api/reports/nearby.
+
+mongomock has no $geoNear (nor $round), so the route tests stand in for the
+first stage with a plain distance filter and sort and run the rest of the
+pipeline as built.
+"""
+import copy
+import math
+
+import mongomock
+import pytest
+
+import app as backend
+import nearby
+from tests.conftest import analyze, soil
+
+CENTER = {'lat': 12.975, 'lon': 77.59}
+
+
+def distance_m(a, b):
+    (lon1, lat1), (lon2, lat2) = a['coordinates'], b['coordinates']
+    dlat, dlon = math.radians(lat2 - lat1), math.radians(lon2 - lon1)
+    h = math.sin(dlat / 2) ** 2 + math.cos(math.radians(lat1)) * math.cos(math.radians(lat2)) * math.sin(dlon / 2) ** 2
+    return 2 * 6378100 * math.asin(math.sqrt(h))
+
+
+@pytest.fixture
+def geo_near(monkeypatch):
+    """Run nearby pipelines on mongomock with $geoNear evaluated in Python."""
+    reports = backend.get_db()['reports']
+
+    def aggregate(pipeline, **options):
+        pipeline = copy.deepcopy(pipeline)
+        stage = pipeline.pop(0)['$geoNear']
+        scratch = mongomock.MongoClient().db.near
+        for report in reports.find({**stage['query'], 'location': {'$exists': True}}):
+            distance = distance_m(stage['near'], report['location'])
+            if distance <= stage['maxDistance']:
+                scratch.insert_one({**report, 'distance_m': distance})
+        by_classification = pipeline[-1]['$facet']['by_classification']
+        by_classification[2]['$project']['nearest_m'] = '$nearest_m'
+        return scratch.aggregate([{'$sort': {'distance_m': 1}}, *pipeline], **options)
+
+    # Not setattr: undoing that would pin this database's aggregate on the lazy proxy
+    monkeypatch.setitem(vars(backend.reports_collection), 'aggregate', aggregate)
+
+
+def near(client, auth, query=''):
+    return client.get(f'/api/reports/nearby?lat={CENTER["lat"]}&lon={CENTER["lon"]}&{query}', headers=auth)
+
+
+def test_pipeline_walks_the_scope_from_the_center():
+    center = nearby.point(12.975, 77.59)
+    geo, cap, project, facet = nearby.pipeline(center, 2500, {'org_id': 'o1'}, 7)
+
+    assert geo['$geoNear']['near'] == {'type': 'Point', 'coordinates': [77.59, 12.975]}
+    assert geo['$geoNear']['maxDistance'] == 2500
+    assert geo['$geoNear']['query'] == {'org_id': 'o1'}
+    assert geo['$geoNear']['key'] == 'location'
+    # Counting stops at the nearest NEARBY_COUNT_LIMIT samples
+    assert cap == {'$limit': nearby.NEARBY_COUNT_LIMIT}
+    assert 'user_id' not in project['$project']
+    assert facet['$facet']['samples'] == [{'$limit': 7}]
+
+
+def test_location_is_part_of_the_content(client, auth):
+    here = analyze(client, auth, soil(), location={'lat': 12.97, 'lon': 77.59})
+    there = analyze(client, auth, soil(), location={'lat': 12.98, 'lon': 77.59})
+    invalid = analyze(client, auth, soil(), location={'lat': 120, 'lon': 0})
+
+    assert here.get_json()['report_id'] != there.get_json()['report_id']
+    assert invalid.status_code == 400
+    assert analyze(client, auth, soil(), location=[12.97, 77.59]).status_code == 400
+
+
+def test_nearest_samples_and_counts(client, auth, geo_near):
+    # Roughly 110 m apart going north; the last is outside the radius
+    for step in range(6):
+        analyze(client, auth, soil(LL=30 + step * 5), location={'lat': CENTER['lat'] + step * 0.001,
+                                                                'lon': CENTER['lon']})
+    analyze(client, auth, soil(), location={'lat': 13.5, 'lon': 77.59})
+    analyze(client, auth, soil(LL=21))
+
+    result = near(client, auth, 'radius=1000&limit=3').get_json()
+
+    assert result['center'] == CENTER
+    assert result['total'] == 6
+    assert result['approximate'] is False
+    assert sum(group['count'] for group in result['by_classification']) == 6
+    assert all(sum(group['suitability'].values()) == group['count'] for group in result['by_classification'])
+    samples = result['samples']
+    assert [sample['parameters']['LL'] for sample in samples] == [30, 35, 40]
+    assert [sample['distance_m'] for sample in samples] == sorted(sample['distance_m'] for sample in samples)
+    assert samples[1]['distance_m'] == pytest.approx(111.3, abs=0.5)
+    assert samples[0]['location'] == CENTER
+    assert not {'user_id', 'content_hash', 'catalog'} & set(samples[0])
+
+
+def test_capped_counts_are_approximate(client, auth, geo_near, monkeypatch):
+    monkeypatch.setattr(nearby, 'NEARBY_COUNT_LIMIT', 2)
+    for step in range(4):
+        analyze(client, auth, soil(LL=30 + step), location={'lat': CENTER['lat'] + step * 0.001, 'lon': CENTER['lon']})
+
+    result = near(client, auth).get_json()
+    assert (result['total'], result['approximate']) == (2, True)
+
+
+def test_nearby_arguments_are_validated(client, auth):
+    assert client.get('/api/reports/nearby?lat=91&lon=0', headers=auth).status_code == 400
+    assert client.get('/api/reports/nearby?lon=0', headers=auth).status_code == 400
+    assert near(client, auth, 'radius=1e9').status_code == 400
+    assert near(client, auth, 'radius=abc').status_code == 400
+    assert near(client, auth, 'scope=org').status_code == 403
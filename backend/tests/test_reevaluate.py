@@ -0,0 +1,77 @@
+"""Bulk re-evaluation: checkpoints and reports that cannot be evaluated."""
+from datetime import datetime
+from types import SimpleNamespace
+
+import mongomock
+import pytest
+
+import app as backend
+import reevaluate
+import report_store
+import suitability_engine
+from tests.conftest import soil
+
+USER = SimpleNamespace(user_id='u1', email='u1@example.com', org_id=None)
+
+
+class Interrupted(Exception):
+    pass
+
+
+class FailingWrites:
+    """The reports collection, except that the given bulk_write call raises."""
+
+    def __init__(self, collection, fail_on):
+        self.collection = collection
+        self.fail_on = fail_on
+        self.written = []
+
+    def __getattr__(self, attr):
+        return getattr(self.collection, attr)
+
+    def bulk_write(self, operations, ordered=True):
+        if len(self.written) + 1 == self.fail_on:
+            self.fail_on = None
+            raise Interrupted()
+        self.written.append(len(operations))
+        return self.collection.bulk_write(operations, ordered=ordered)
+
+
+def outdated_reports(count):
+    reports = mongomock.MongoClient().db.reports
+    for index in range(count):
+        parameters = backend.extract_parameters(soil(LL=30 + index))
+        report = report_store.new_report(USER, suitability_engine.evaluate_codes(parameters), parameters,
+                                         datetime(2024, 1, 1))
+        report['ruleset'] = 0
+        reports.insert_one(report)
+    return reports
+
+
+def test_interrupted_run_resumes_from_the_checkpoint(tmp_path):
+    checkpoint = str(tmp_path / 'reevaluate.json')
+    reports = FailingWrites(outdated_reports(7), fail_on=3)
+
+    with pytest.raises(Interrupted):
+        reevaluate.run(reports, workers=1, batch_size=2, checkpoint_path=checkpoint, log=lambda line: None)
+    assert reports.count_documents({'ruleset': suitability_engine.RULESET_VERSION}) == 4
+
+    counts = reevaluate.run(reports, workers=1, batch_size=2, checkpoint_path=checkpoint, log=lambda line: None)
+
+    assert counts['processed'] == 7
+    assert counts['failed'] == 0
+    # Batches written before the interruption are not written again
+    assert reports.written == [2, 2, 2, 1]
+    assert reports.count_documents({'ruleset': suitability_engine.RULESET_VERSION}) == 7
+
+
+def test_non_numeric_parameters_fail_and_stay_outdated():
+    reports = outdated_reports(3)
+    broken = reports.find_one(sort=[('_id', 1)])['_id']
+    reports.update_one({'_id': broken}, {'$set': {'parameters.LL': 'n/a'}})
+
+    counts = reevaluate.run(reports, workers=1, batch_size=2, log=lambda line: None)
+
+    assert (counts['processed'], counts['failed']) == (3, 1)
+    assert reports.find_one(broken)['ruleset'] == 0
+    assert reports.count_documents({'ruleset': suitability_engine.RULESET_VERSION}) == 2
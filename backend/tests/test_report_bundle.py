@@ -0,0 +1,118 @@
+"""POST /api/reports/bundle: combined PDFs and streamed ZIPs."""
+import io
+import time
+import zipfile
+from datetime import datetime
+
+import app as backend
+import report_bundle
+from tests.conftest import soil
+
+
+def saved_reports(client, auth, count):
+    samples = [soil(LL=20 + i, PI=5 + i) for i in range(count)]
+    response = client.post('/api/analyze-suitability/batch', json={'soil_data': samples}, headers=auth)
+    return [result['report_id'] for result in response.get_json()['results']]
+
+
+def bundle(client, auth, report_ids, bundle_format='pdf', query=''):
+    return client.post(f'/api/reports/bundle{query}', json={'report_ids': report_ids, 'format': bundle_format},
+                       headers=auth)
+
+
+def test_combined_pdf(client, auth):
+    report_ids = saved_reports(client, auth, 3)
+    response = bundle(client, auth, report_ids)
+
+    assert response.status_code == 200
+    assert response.mimetype == 'application/pdf'
+    assert response.data.startswith(b'%PDF')
+    # Served from the PDF cache the second time
+    assert bundle(client, auth, report_ids).data == response.data
+
+
+def test_large_combined_pdf_becomes_a_job(client, auth, monkeypatch):
+    monkeypatch.setattr(report_bundle, 'BUNDLE_SYNC_LIMIT', 1)
+    queued = bundle(client, auth, saved_reports(client, auth, 2))
+    assert queued.status_code == 202
+
+    for _ in range(100):
+        job = client.get(queued.get_json()['status_url'], headers=auth)
+        if job.mimetype == 'application/pdf':
+            break
+        time.sleep(0.1)
+    assert job.data.startswith(b'%PDF')
+
+
+def test_zip_holds_one_pdf_per_report(client, auth):
+    report_ids = saved_reports(client, auth, 4)
+    # One already cached, so it is sent before the renders
+    single = client.get(f'/api/reports/{report_ids[2]}/pdf', headers=auth).data
+
+    response = bundle(client, auth, report_ids, 'zip')
+    archive = zipfile.ZipFile(io.BytesIO(response.data))
+
+    assert response.mimetype == 'application/zip'
+    assert archive.testzip() is None
+    assert archive.namelist()[0] == f'soil_report_{report_ids[2]}.pdf'
+    assert sorted(archive.namelist()) == sorted(f'soil_report_{report_id}.pdf' for report_id in report_ids)
+    assert archive.read(f'soil_report_{report_ids[2]}.pdf') == single
+
+
+def test_failed_render_becomes_an_error_entry(client, auth):
+    good, = saved_reports(client, auth, 1)
+    user_id = backend.reports_collection.find_one()['user_id']
+    # A legacy report whose behavior cannot be rendered
+    broken = str(backend.reports_collection.insert_one({
+        'user_id': user_id, 'classification': 'CL', 'suitability': 'SUITABLE', 'behavior': 5,
+        'created_at': datetime.utcnow()
+    }).inserted_id)
+
+    archive = zipfile.ZipFile(io.BytesIO(bundle(client, auth, [broken, good], 'zip').data))
+
+    assert archive.testzip() is None
+    assert sorted(archive.namelist()) == sorted([f'soil_report_{good}.pdf', f'soil_report_{broken}.error.txt'])
+
+
+def test_bundle_requests_are_validated(client, auth):
+    report_id, = saved_reports(client, auth, 1)
+
+    assert bundle(client, auth, []).status_code == 400
+    assert bundle(client, auth, ['not-an-id']).status_code == 400
+    assert bundle(client, auth, [report_id], 'tar').status_code == 400
+    missing = bundle(client, auth, [report_id, '0' * 24])
+    assert missing.status_code == 404
+    assert missing.get_json()['missing'] == ['0' * 24]
+
+
+def test_other_users_reports_are_missing(client, auth):
+    report_id, = saved_reports(client, auth, 1)
+    client.post('/api/register', json={'name': 'Other', 'email': 'other@example.com', 'password': 'secret'})
+    token = client.post('/api/login', json={'email': 'other@example.com', 'password': 'secret'}).get_json()['token']
+
+    response = bundle(client, {'Authorization': f'Bearer {token}'}, [report_id], 'zip')
+    assert response.status_code == 404
+    assert response.get_json()['missing'] == [report_id]
+
+
+def test_zip_stream_writes_each_entry_as_it_arrives():
+    def pdfs():
+        yield 'a', datetime(2024, 1, 2), b'%PDF-a', None
+        received.append('a')
+        yield 'b', datetime(2024, 1, 2), None, RuntimeError('boom')
+        received.append('b')
+
+    received = []
+    chunks = []
+    for chunk in report_bundle.zip_stream(pdfs()):
+        chunks.append((len(received), chunk))
+
+    # The first entry is sent before the next PDF is even requested
+    assert chunks[0][0] == 0 and b'soil_report_a.pdf' in chunks[0][1]
+    chunks = [chunk for _, chunk in chunks]
+
+    archive = zipfile.ZipFile(io.BytesIO(b''.join(chunks)))
+    assert archive.namelist() == ['soil_report_a.pdf', 'soil_report_b.error.txt']
+    assert archive.read('soil_report_a.pdf') == b'%PDF-a'
+    assert b'boom' in archive.read('soil_report_b.error.txt')
+
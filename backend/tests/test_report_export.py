@@ -0,0 +1,62 @@
+"""/api/my-reports/export: row shape of the text formats."""
+import csv
+import io
+import json
+
+import pytest
+
+import report_export
+from tests.conftest import analyze, soil
+
+HIDDEN = {'user_id', 'org_id', 'content_hash', 'idempotency_key', 'ruleset', 'catalog'}
+
+
+def export(client, auth, export_format):
+    return client.get(f'/api/my-reports/export?format={export_format}', headers=auth)
+
+
+@pytest.fixture
+def reports(client, auth):
+    """Two reports, the newer one with a location; returned newest first."""
+    older = analyze(client, auth, soil(LL=30), key='older').get_json()
+    newer = analyze(client, auth, soil(LL=50), location={'lat': 12.5, 'lon': 77.25}).get_json()
+    return [newer, older]
+
+
+def test_ndjson_rows_match_the_report_list(client, auth, reports):
+    response = export(client, auth, 'ndjson')
+    rows = [json.loads(line) for line in response.data.decode().splitlines()]
+    listed = client.get('/api/my-reports', headers=auth).get_json()['reports']
+
+    assert response.mimetype == 'application/x-ndjson'
+    assert 'attachment; filename=soil_reports_' in response.headers['Content-Disposition']
+    assert [row['_id'] for row in rows] == [report['report_id'] for report in reports]
+    assert rows == listed
+    assert not HIDDEN & set(rows[0])
+    assert rows[0]['location'] == {'lat': 12.5, 'lon': 77.25}
+    assert 'location' not in rows[1]
+
+
+def test_csv_rows_follow_the_columns(client, auth, reports):
+    response = export(client, auth, 'csv')
+    header, *rows = csv.reader(io.StringIO(response.data.decode()))
+
+    assert response.mimetype == 'text/csv'
+    assert tuple(header) == report_export.COLUMNS
+    assert len(rows) == 2 and all(len(row) == len(header) for row in rows)
+    newer, older = (dict(zip(header, row)) for row in rows)
+    assert newer['report_id'] == reports[0]['report_id']
+    assert (newer['LL'], newer['lat'], newer['lon']) == ('50', '12.5', '77.25')
+    assert (older['LL'], older['lat'], older['lon']) == ('30', '', '')
+    assert newer['classification'] == reports[0]['classification']
+    assert newer['risks'] == '; '.join(reports[0]['risks'])
+
+
+def test_text_exports_send_the_first_row_alone(monkeypatch):
+    monkeypatch.setattr(report_export, 'EXPORT_CHUNK_ROWS', 2)
+    lines = [f'{n}\n' for n in range(5)]
+    assert list(report_export._chunked_text(lines)) == ['0\n', '1\n2\n', '3\n4\n']
+
+
+def test_unknown_format_is_rejected(client, auth):
+    assert export(client, auth, 'pdf').status_code == 400
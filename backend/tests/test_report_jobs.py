@@ -0,0 +1,37 @@
+"""The report render pool: recovery from dead workers and failed submits."""
+import os
+from datetime import datetime
+from concurrent.futures.process import BrokenProcessPool
+
+import pytest
+
+import app as backend
+import report_jobs
+from tests.conftest import SOIL
+
+
+def crash(submitted_at):
+    os._exit(1)
+
+
+def test_pool_is_replaced_after_a_worker_dies(client, auth):
+    queue = report_jobs.ReportJobQueue(workers=1)
+    with pytest.raises(BrokenProcessPool):
+        queue._submit(crash, ()).result(timeout=60)
+
+    result = client.post('/api/analyze-suitability', json={'soil_data': SOIL}, headers=auth).get_json()
+    pdf = queue.render_bundle([(result, 'r1', datetime.now())])
+    assert pdf.startswith(b'%PDF')
+    assert queue.stats()['failed'] == 1
+    assert queue.stats()['queue_depth'] == 0
+
+
+def test_failed_submit_drops_the_job(client, auth, monkeypatch):
+    def refuse(*args):
+        raise RuntimeError('pool is down')
+
+    monkeypatch.setattr(backend.job_queue, '_submit', refuse)
+    response = client.post('/api/generate-report?async=1', json={'result': {}}, headers=auth)
+
+    assert response.status_code == 503
+    assert backend.report_jobs_collection.count_documents({}) == 0
@@ -0,0 +1,55 @@
+"""/api/reports/search: filter validation, filtering and cursor paging."""
+from tests.conftest import analyze, soil
+
+
+def search(client, auth, query=''):
+    return client.get(f'/api/reports/search?{query}', headers=auth)
+
+
+def seed(client, auth):
+    """Ten reports with LL 20..65; the high ones classify as CH."""
+    return {ll: analyze(client, auth, soil(LL=ll, PI=ll // 2)).get_json() for ll in range(20, 70, 5)}
+
+
+def test_filters_are_validated(client, auth):
+    for query in ('owner=someone', 'suitability=GREAT', 'LL_min=soft', 'from=yesterday', 'limit=many',
+                  'scope=team', 'cursor=nonsense'):
+        response = search(client, auth, query)
+        assert response.status_code == 400, query
+        assert response.get_json()['error']
+    assert 'Supported:' in search(client, auth, 'owner=someone').get_json()['error']
+    # A user outside any organization has no org scope
+    assert search(client, auth, 'scope=org').status_code == 403
+
+
+def test_filters_narrow_the_results(client, auth):
+    reports = seed(client, auth)
+
+    found = search(client, auth, 'LL_min=30&LL_max=45').get_json()
+    assert sorted(report['parameters']['LL'] for report in found['reports']) == [30, 35, 40, 45]
+    assert found['counts']['total'] == 4
+
+    high = search(client, auth, 'classification=CH').get_json()['reports']
+    assert high and all(report['classification'].startswith('CH') for report in high)
+
+    suitability = reports[60]['suitability']
+    matching = search(client, auth, f'suitability={suitability}').get_json()
+    assert {report['suitability'] for report in matching['reports']} == {suitability}
+    assert matching['counts']['suitability'] == {suitability: len(matching['reports'])}
+
+
+def test_cursor_pages_cover_every_match_once(client, auth):
+    seed(client, auth)
+
+    first = search(client, auth, 'LL_min=25&limit=4').get_json()
+    seen, page = list(first['reports']), first
+    while page['next']:
+        page = search(client, auth, f'LL_min=25&limit=4&cursor={page["next"]}').get_json()
+        # Totals come with the first page only
+        assert page['counts'] is None
+        seen.extend(page['reports'])
+
+    assert first['counts']['total'] == 9
+    assert [report['parameters']['LL'] for report in seen] == list(range(65, 20, -5))
+    assert len({report['_id'] for report in seen}) == 9
+    assert not {'user_id', 'content_hash', 'ruleset'} & set(seen[0])
@@ -0,0 +1,61 @@
+"""Statistics rollups: rebuild() against the incremental record()."""
+import random
+
+import mongomock
+import pytest
+
+import report_stats
+
+
+def sample_reports(count, seed=7):
+    rng = random.Random(seed)
+    reports = []
+    for index in range(count):
+        classification = rng.choice(['CH', 'CI', 'SC', 'ML'])
+        if index % 5 == 0:
+            # Legacy reports store the full classification text
+            classification += ' - Legacy text'
+        parameters = {'LL': rng.randint(15, 90), 'PI': rng.randint(0, 50), 'MDD': round(rng.uniform(14, 21), 2),
+                      'NMC': rng.uniform(5, 40), 'Sand': rng.randint(0, 60)}
+        if index % 7 == 0:
+            parameters['LL'] = 'n/a'
+        reports.append({'user_id': f'u{index % 3}', 'classification': classification,
+                        'suitability': rng.choice(['SUITABLE', 'MODERATELY SUITABLE', 'NOT SUITABLE']),
+                        'parameters': parameters})
+    return reports
+
+
+def rollups(stats_collection):
+    docs = {}
+    for doc in stats_collection.find():
+        doc.pop('modified_at')
+        docs[doc.pop('_id')] = doc
+    return docs
+
+
+def test_rebuild_matches_incremental_record():
+    db = mongomock.MongoClient().db
+    reports = sample_reports(60)
+    db.reports.insert_many([dict(report) for report in reports])
+    for start in range(0, len(reports), 8):
+        report_stats.record(db.incremental, reports[start:start + 8])
+
+    assert report_stats.rebuild(db.reports, db.rebuilt) == 4
+    incremental, rebuilt = rollups(db.incremental), rollups(db.rebuilt)
+
+    assert incremental.keys() == rebuilt.keys()
+    for key in incremental:
+        for part in ('count', 'classification', 'suitability'):
+            assert rebuilt[key][part] == incremental[key][part]
+        assert rebuilt[key]['parameters'].keys() == incremental[key]['parameters'].keys()
+        for name, stats in incremental[key]['parameters'].items():
+            other = rebuilt[key]['parameters'][name]
+            assert other['hist'] == stats['hist']
+            assert (other['n'], other['min'], other['max']) == (stats['n'], stats['min'], stats['max'])
+            assert other['sum'] == pytest.approx(stats['sum'])
+            assert other['sumsq'] == pytest.approx(stats['sumsq'])
+        # Both give the same /api/stats response, up to the rounding of sums added in another order
+        summary, expected = report_stats.summarize(rebuilt[key]), report_stats.summarize(incremental[key])
+        for name, values in expected.pop('parameters').items():
+            assert summary['parameters'][name] == pytest.approx(values, abs=0.002)
+        assert {part: summary[part] for part in expected} == expected
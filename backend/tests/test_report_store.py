@@ -0,0 +1,59 @@
+"""Compact report storage: to_api() and migrating legacy text reports."""
+import copy
+from datetime import datetime
+from types import SimpleNamespace
+
+import mongomock
+
+import app as backend
+import report_store
+import suitability_engine
+from tests.conftest import soil
+
+USER = SimpleNamespace(user_id='u1', email='u1@example.com', org_id=None)
+SAMPLES = [
+    soil(),  # parameterized moisture risk
+    soil(LL=25, PI=5, F=20, G=40, CS=30, **{'NMC (%)': 14}),  # "No major risks identified"
+    soil(LL=55, PI=30),
+    soil(LL=30, PI=8, F=10, G=50, CS=30, **{'NMC (%)': 14, 'MDD (kN/m3)': 19}),
+    soil(**{'NMC (%)': 30}),
+]
+
+
+def legacy_report(sample):
+    """A report as stored before the compact schema: the API text itself."""
+    parameters = backend.extract_parameters(sample)
+    outcome = suitability_engine.evaluate_codes(parameters)
+    report = report_store.to_api(report_store.new_report(USER, outcome, parameters, datetime(2024, 1, 1)))
+    del report['ruleset']
+    return report
+
+
+def test_migrate_keeps_the_api_output():
+    reports = mongomock.MongoClient().db.reports
+    reports.insert_many([legacy_report(sample) for sample in SAMPLES])
+    before = {report['_id']: copy.deepcopy(report) for report in reports.find()}
+    texts = [risk for report in before.values() for risk in report['risks']]
+    assert "Moisture content (22%) deviates from OMC (14%) - compaction issues" in texts
+    assert "No major risks identified" in texts
+
+    assert report_store.migrate(reports, batch_size=2) == (len(SAMPLES), 0)
+
+    for report in reports.find():
+        assert report['catalog'] == suitability_engine.CATALOG_VERSION
+        assert 'suitability_text' not in report
+        assert report_store.to_api(report) == before[report['_id']]
+
+
+def test_unknown_text_is_skipped():
+    reports = mongomock.MongoClient().db.reports
+    known = reports.insert_one(legacy_report(SAMPLES[0])).inserted_id
+    odd = legacy_report(SAMPLES[1])
+    odd['recommendations'].append('Consult the site engineer')
+    odd_id = reports.insert_one(odd).inserted_id
+
+    assert report_store.migrate(reports) == (1, 1)
+    assert reports.find_one(known)['catalog'] == suitability_engine.CATALOG_VERSION
+    assert reports.find_one(odd_id) == odd
+    # Rerunning only meets the report it cannot convert
+    assert report_store.migrate(reports) == (0, 1)
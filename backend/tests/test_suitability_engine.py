@@ -0,0 +1,74 @@
+"""The decision-table engine against the original if/elif rules (tests/legacy_rules.py)."""
+import random
+
+import pytest
+
+import suitability_engine
+from tests import legacy_rules
+
+SAMPLES = 20000
+
+# Every threshold the rules compare against, so boundary values are hit exactly
+THRESHOLDS = {
+    'LL': (35, 50), 'PI': (4, 7, 12, 15, 17, 20, 25, 30, 35),
+    'Fines': (5, 40, 50), 'MDD': (16, 18),
+}
+
+
+def _value(rng, low, high, thresholds=()):
+    choice = rng.random()
+    if thresholds and choice < 0.3:
+        return rng.choice(thresholds) + rng.choice((-1, 0, 0, 1))
+    if choice < 0.7:
+        return rng.randint(low, high)
+    return round(rng.uniform(low, high), 2)
+
+
+def _sample(rng):
+    omc = _value(rng, 8, 25)
+    return {
+        'LL': _value(rng, 10, 90, THRESHOLDS['LL']),
+        'PL': _value(rng, 5, 40),
+        'PI': _value(rng, 0, 50, THRESHOLDS['PI']),
+        'Gravel': _value(rng, 0, 60),
+        'Sand': _value(rng, 0, 90),
+        'Fines': _value(rng, 0, 100, THRESHOLDS['Fines']),
+        'OMC': omc,
+        'MDD': _value(rng, 14, 21, THRESHOLDS['MDD']) if rng.random() < 0.8 else rng.uniform(14, 21),
+        # Often exactly 4 away from OMC, the moisture threshold
+        'NMC': omc + rng.choice((-4, 4)) if rng.random() < 0.2 else _value(rng, 4, 35),
+    }
+
+
+def _legacy(params):
+    return legacy_rules.evaluate(params['LL'], params['PI'], params['Gravel'], params['Sand'],
+                                 params['Fines'], params['OMC'], params['MDD'], params['NMC'])
+
+
+@pytest.fixture(scope='module')
+def samples():
+    rng = random.Random(20240206)
+    return [_sample(rng) for _ in range(SAMPLES)]
+
+
+def test_evaluate_matches_legacy_rules(samples):
+    for params in samples:
+        assert suitability_engine.evaluate(params) == _legacy(params), params
+
+
+def test_evaluate_many_matches_legacy_rules(samples):
+    for params, result in zip(samples, suitability_engine.evaluate_many(samples)):
+        assert result == _legacy(params), params
+
+
+def test_evaluate_arrays_matches_legacy_rules(samples):
+    import numpy as np
+
+    columns = {key: np.array([float(params[key]) for params in samples])
+               for key in suitability_engine.PARAMETER_KEYS}
+    classification, suitability, _ = suitability_engine.evaluate_arrays(columns)
+    for params, class_index, suit_index in zip(samples, classification, suitability):
+        legacy = _legacy(params)
+        code = suitability_engine.CLASSIFICATION_CODES[class_index]
+        assert suitability_engine.message(code) == legacy['classification'], params
+        assert suitability_engine.SUITABILITY_CODES[suit_index] == legacy['suitability'], params
@@ -0,0 +1,97 @@
+"""What-if sweeps: grids, boundaries and margins against evaluate_codes."""
+import pytest
+
+import app as backend
+import sweep
+import suitability_engine
+from tests.conftest import soil
+
+PARAMETERS = backend.extract_parameters(soil())
+
+
+def evaluate(**changes):
+    return suitability_engine.evaluate_codes({**PARAMETERS, **changes})
+
+
+def decode(rows, codes):
+    return [[codes[int(digit, 16)] for digit in row] for row in rows]
+
+
+def test_grid_matches_evaluate_codes():
+    axes = sweep.parse_axes({'LL': {'min': 15, 'max': 85, 'steps': 36}, 'PI': {'min': 0, 'max': 45, 'steps': 16}})
+    result = sweep.run(PARAMETERS, axes)
+    suitability = decode(result['suitability'], result['suitability_codes'])
+    classification = decode(result['classification'], result['classification_codes'])
+
+    ll_values, pi_values = (axis['values'] for axis in result['axes'])
+    assert (len(ll_values), len(pi_values)) == (36, 16)
+    for i, ll in enumerate(ll_values):
+        for j, pi in enumerate(pi_values):
+            outcome = evaluate(LL=ll, PI=pi)
+            assert (classification[i][j], suitability[i][j]) == (outcome.classification, outcome.suitability)
+
+
+def test_boundaries_lie_between_differing_cells():
+    # Steps of 0.5 keep every midpoint off the rule thresholds
+    axes = sweep.parse_axes({'LL': {'min': 10.25, 'max': 90.25, 'steps': 161}})
+    result = sweep.run(PARAMETERS, axes)
+
+    found = result['boundaries']['suitability']
+    assert found
+    for boundary in found:
+        for ll, in boundary['points']:
+            assert evaluate(LL=ll - 0.25).suitability == boundary['from']
+            assert evaluate(LL=ll + 0.25).suitability == boundary['to']
+
+
+@pytest.mark.parametrize('sample', [soil(), soil(LL=55), soil(PI=25)])
+def test_margins_are_the_nearest_changes(sample):
+    parameters = backend.extract_parameters(sample)
+    axes = sweep.parse_axes({'LL': {'min': 0, 'max': 100}, 'PI': {'min': 0, 'max': 50}})
+    result = sweep.run(parameters, axes)
+    base = result['base']['suitability']
+    assert base == suitability_engine.evaluate_codes(parameters).suitability
+
+    step = {'LL': 100 / (sweep.MARGIN_STEPS - 1), 'PI': 50 / (sweep.MARGIN_STEPS - 1)}
+    checked = 0
+    for name, margin in result['margins'].items():
+        assert margin['value'] == parameters[name]
+        for side, towards_base in (('below', 1), ('above', -1)):
+            if margin[side] is None:
+                continue
+            checked += 1
+            value = margin[side]['value']
+            changed = suitability_engine.evaluate_codes({**parameters, name: value}).suitability
+            assert changed == margin[side]['suitability'] != base
+            # One step back towards the sample still has its suitability
+            back = suitability_engine.evaluate_codes({**parameters, name: value + towards_base * step[name]})
+            assert back.suitability == base
+    assert checked
+
+
+@pytest.mark.parametrize('spec', [
+    {'LL': {'min': 0, 'max': 100, 'steps': 10 ** 12}},
+    {'LL': {'min': 0, 'max': 100, 'steps': 1001}, 'PI': {'min': 0, 'max': 50, 'steps': 1001}},
+    {'LL': {'min': 0, 'max': 100, 'steps': 1e400}},
+    {'LL': {'min': 0, 'max': float('inf')}},
+    {'LL': {'min': 50, 'max': 10}},
+    {'Colour': {'min': 0, 'max': 1}},
+    {'LL': {'min': 0, 'max': 1}, 'PI': {'min': 0, 'max': 1}, 'NMC': {'min': 0, 'max': 1}},
+])
+def test_invalid_sweeps_are_rejected(spec):
+    with pytest.raises(sweep.SweepError):
+        sweep.parse_axes(spec)
+
+
+def test_sweep_route(client, auth):
+    response = client.post('/api/analyze-suitability/sweep', headers=auth,
+                           json={'soil_data': soil(), 'sweep': {'PI': {'min': 0, 'max': 40, 'steps': 41}}})
+    assert response.status_code == 200
+    assert len(response.get_json()['suitability']) == 41
+
+    too_big = client.post('/api/analyze-suitability/sweep', headers=auth,
+                          json={'soil_data': soil(), 'sweep': {'PI': {'min': 0, 'max': 40, 'steps': 10 ** 12}}})
+    assert too_big.status_code == 400
+    not_numeric = client.post('/api/analyze-suitability/sweep', headers=auth,
+                              json={'soil_data': soil(LL='high'), 'sweep': {'PI': {'min': 0, 'max': 40}}})
+    assert not_numeric.status_code == 400
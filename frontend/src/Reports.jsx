@@ -5,6 +5,8 @@ import { Download, Calendar, FileText, ClipboardList, GitCompare, X } from 'luci
 function Reports() {
   const [reports, setReports] = useState([]);
   const [loading, setLoading] = useState(true);
+  const [nextCursor, setNextCursor] = useState(null);
+  const [loadingMore, setLoadingMore] = useState(false);
   const [selectedReports, setSelectedReports] = useState([]);
   const [compareMode, setCompareMode] = useState(false);
 
@@ -17,12 +19,25 @@ function Reports() {
     try {
       const res = await getMyReports();
       setReports(res.data.reports);
+      setNextCursor(res.data.next);
     } catch (error) {
       alert('Failed to load reports: ' + (error.response?.data?.error || error.message));
     }
     setLoading(false);
   };
 
+  const loadMoreReports = async () => {
+    setLoadingMore(true);
+    try {
+      const res = await getMyReports({ cursor: nextCursor });
+      setReports([...reports, ...res.data.reports]);
+      setNextCursor(res.data.next);
+    } catch (error) {
+      alert('Failed to load reports: ' + (error.response?.data?.error || error.message));
+    }
+    setLoadingMore(false);
+  };
+
   const handleDownload = async (report) => {
     try {
       const res = await generateReport({ result: report });
@@ -232,6 +247,14 @@ function Reports() {
           )})}
         </div>
       )}
+
+      {!loading && nextCursor && (
+        <div className="load-more">
+          <button onClick={loadMoreReports} disabled={loadingMore} className="clear-btn">
+            {loadingMore ? 'Loading...' : 'Load more reports'}
+          </button>
+        </div>
+      )}
     </div>
   );
 }
@@ -22,7 +22,13 @@ export const getHealth = () => api.get('/health');
 export const register = (data) => api.post('/register', data);
 export const login = (data) => api.post('/login', data);
 export const analyzeSuitability = (data) => api.post('/analyze-suitability', data);
+export const analyzeSuitabilityBatch = (data) => api.post('/analyze-suitability/batch', data);
+export const uploadLabSheet = (file) => {
+  const form = new FormData();
+  form.append('file', file);
+  return api.post('/upload-lab-sheet', form, { headers: { 'Content-Type': 'multipart/form-data' } });
+};
 export const generateReport = (data) => api.post('/generate-report', data, { responseType: 'blob' });
-export const getMyReports = () => api.get('/my-reports');
+export const getMyReports = (params) => api.get('/my-reports', { params });
 
 export default api;